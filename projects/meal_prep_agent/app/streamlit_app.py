@@ -18,6 +18,15 @@ import asyncio
 import streamlit as st
 
 from meal_prep_agent.agents.orchestrator import run_pipeline
+from meal_prep_agent.agents.events import TokenChunk
+from meal_prep_agent import retriever_pool
+
+# Open the vectorstore once per server process (no-op on Streamlit reruns)
+@st.cache_resource
+def _warm_up_retriever():
+    return retriever_pool.warm_up()
+
+_warm_up_retriever()
 
 # Define UI
 st.set_page_config(page_title="Meal Prep RAG Pipeline", page_icon="🍽️")
@@ -31,10 +40,30 @@ if st.button("Search") and query:   # If button clicked and query is populated
 
     async def _runner() -> None:
         chat_placehoder = st.container()
-        async for frame in run_pipeline(query, n_recipes):
-            role, *rest = frame.split(":", 1)
-            content = rest[0].strip() if rest else ""
+        streaming = {}   # role -> (placeholder, text so far) for replies still arriving
+
+        async for event in run_pipeline(query, n_recipes, stream=True):
             with chat_placehoder:
+                # Token chunks: grow the reply in place as it is generated
+                if isinstance(event, TokenChunk):
+                    if event.role not in streaming:
+                        streaming[event.role] = (st.chat_message("assistant").empty(), "")
+                    placeholder, text = streaming[event.role]
+                    text += event.delta
+                    streaming[event.role] = (placeholder, text)
+                    placeholder.markdown(f"**{event.role}**: {text}▌")
+                    continue
+
+                role, content = event.role, event.content
+                if role in ("TIMINGS", "GROUNDING REPORT"):
+                    with st.expander("Stage timings" if role == "TIMINGS" else "Grounding report"):
+                        st.json(content)
+                    continue
+                if role in streaming:
+                    # Stage finished - replace the streamed text with the final reply
+                    placeholder, _ = streaming.pop(role)
+                    placeholder.markdown(f"**{role}**: {content}")
+                    continue
                 with st.chat_message("assistant"):
                     st.markdown(f"**{role}**: {content}")
 
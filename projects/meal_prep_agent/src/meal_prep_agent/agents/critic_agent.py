@@ -5,18 +5,7 @@ Responsible for:
 - Reviewing the writer output
 - Ensure that ouput follows retrieved context
 """
-from autogen_agentchat.agents import AssistantAgent
-from autogen_ext.models.openai import OpenAIChatCompletionClient
-
-from meal_prep_agent.config import API_KEY, AGENT_MODEL
-
-model_client = OpenAIChatCompletionClient(model=AGENT_MODEL, api_key=API_KEY)
-
-critic = AssistantAgent( 
-    name="critic",
-    model_client=model_client,
-    system_message=(
-        """
+SYSTEM_MESSAGE = """
         You are the Critic agent in a multi-agent recipe retrieval system.
         You receive two inputs:
         1. The Writer agent’s human-readable output.
@@ -56,12 +45,26 @@ critic = AssistantAgent(
         - call tools
         - perform research
         - add or invent any details
-        """     
-    ),
-)
+        """
+
+def build_critic():
+    """
+    A new Critic agent. Each review gets its own: an agent keeps its chat history
+    between runs, and a Critic cancelled mid-run would leave a stale draft in it.
+    Only the model client is shared.
+    """
+    from autogen_agentchat.agents import AssistantAgent
+
+    from meal_prep_agent.agents.model_client import get_model_client
+
+    return AssistantAgent(
+        name="critic",
+        model_client=get_model_client(),
+        system_message=SYSTEM_MESSAGE,
+    )
 
 # Define task
 task = "Check the writer ouput against the retrieved context"
 
 async def run_critic(message: str):
-    return await critic.run(task=message)
\ No newline at end of file
+    return await build_critic().run(task=message)
\ No newline at end of file
@@ -0,0 +1,27 @@
+"""
+Typed events yielded by `orchestrator.run_pipeline`.
+
+`StageOutput` is a finished stage's output; with `stream=True` the Writer's reply
+also arrives as `TokenChunk`s while it is generated, so a UI can render it before
+the stage completes. `str(event)` gives the "ROLE: content" text frames the
+pipeline used to yield.
+"""
+from dataclasses import dataclass
+
+
+@dataclass
+class StageOutput:
+    role: str      # "RESEARCHER RAW OUTPUT", "WRITER OUTPUT", "FINAL", "TIMINGS", ...
+    content: str
+
+    def __str__(self) -> str:
+        return f"{self.role}: {self.content}"
+
+
+@dataclass
+class TokenChunk:
+    role: str      # role of the StageOutput this chunk is part of
+    delta: str
+
+    def __str__(self) -> str:
+        return self.delta
@@ -0,0 +1,259 @@
+"""
+Deterministic grounding checker for the Writer's output.
+
+Parses the Writer's markdown into recipe sections (title + ingredient items) and
+fuzzy-matches them (difflib) against the retrieved recipes, producing a
+`GroundingReport` of missing / extra recipes, missing / extra ingredients and
+quantity mismatches - the same things the Critic agent is asked to look for.
+
+Each comparison is either a clear match, a clear mismatch, or in between; anything
+in between (or output that can't be parsed) makes the report "uncertain", and only
+then does the orchestrator pay for the LLM Critic.
+"""
+import ast
+import json
+import re
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+
+from meal_prep_agent.ingredient_index import ingredient_tokens
+
+# Similarity thresholds: >= MATCH is the same item, < MISMATCH is a different item
+TITLE_MATCH = 0.85
+TITLE_MISMATCH = 0.6
+INGREDIENT_MATCH = 0.8
+INGREDIENT_MISMATCH = 0.5
+
+GROUNDED_MESSAGE = "The Writer's output is fully grounded in the retrieved context."
+
+_WHITESPACE = re.compile(r"\s+")
+_MARKDOWN = re.compile(r"[*_`#>]+")
+_NUMBER = re.compile(r"\d+(?:[./]\d+)?|[½¼¾⅓⅔⅛]")
+_JSON_BLOCK = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+
+_HEADING = re.compile(r"^#{1,6}\s+(.+)$")
+_NUMBERED = re.compile(r"^\d+[.)]\s+(.+)$")
+_BOLD_LINE = re.compile(r"^\*\*(.+?)\*\*:?\s*$")
+_BULLET = re.compile(r"^[-*•]\s+(.+)$")
+# Headings that organise the answer rather than name a recipe
+_GENERIC_HEADING = re.compile(r"^(summary|overview|conclusion|notes?|tips?|enjoy|recipes?|here are|results?)\b")
+_LABEL = re.compile(r"^(ingredients|instructions|directions|method|steps|notes?|tips?)\s*:?\s*(.*)$")
+
+
+def _normalise(text: str) -> str:
+    return _WHITESPACE.sub(" ", _MARKDOWN.sub("", text).lower()).strip(" :-")
+
+
+def _similarity(a: str, b: str) -> float:
+    return SequenceMatcher(None, _normalise(a), _normalise(b)).ratio()
+
+
+def parse_recipes(retrieved) -> list[dict]:
+    """
+    Recipe dicts ({"title", "ingredients"}) from retrieved data - a list of recipes,
+    a {query: [recipes]} mapping, or the JSON text of either (optionally in a code
+    fence). Anything else (e.g. free-text researcher output) gives an empty list.
+    """
+    if isinstance(retrieved, str):
+        fenced = _JSON_BLOCK.search(retrieved)
+        text = fenced.group(1) if fenced else retrieved
+        try:
+            retrieved = json.loads(text)
+        except ValueError:
+            # Tool results are stringified Python values (single-quoted dicts)
+            try:
+                retrieved = ast.literal_eval(text)
+            except (ValueError, SyntaxError):
+                return []
+
+    if isinstance(retrieved, dict):
+        retrieved = [recipe for recipes in retrieved.values() if isinstance(recipes, list) for recipe in recipes]
+    if not isinstance(retrieved, list):
+        return []
+
+    return [recipe for recipe in retrieved if isinstance(recipe, dict) and "title" in recipe]
+
+
+def parse_writer_output(text: str) -> list[dict]:
+    """
+    Split the Writer's markdown into [{"title", "ingredients": [item, ...]}] sections.
+
+    Titles are headings, numbered lines and bold-only lines; ingredients are the
+    bullet (or numbered, after an "Ingredients:" label) lines under a title, or an
+    inline "Ingredients: a, b, c" list.
+    """
+    sections = []
+    block = None   # label of the block we're in under the current title ("ingredients", "instructions", ...)
+
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+        current = sections[-1] if sections else None
+
+        label = _LABEL.match(_normalise(line))
+        if label and current is not None:
+            block = label.group(1)
+            if block == "ingredients" and label.group(2):
+                current["ingredients"].extend(item.strip() for item in label.group(2).split(",") if item.strip())
+            continue
+
+        bullet = _BULLET.match(line)
+        numbered = _NUMBERED.match(line)
+        if current is not None and (bullet or (numbered and block is not None)):
+            item = (bullet or numbered).group(1)
+            inline = _LABEL.match(_normalise(item))
+            if inline and inline.group(1) == "ingredients":
+                current["ingredients"].extend(i.strip() for i in inline.group(2).split(",") if i.strip())
+            elif block in (None, "ingredients") and not inline:
+                current["ingredients"].append(item)
+            # Items under instructions / notes are not checked
+            continue
+
+        title = _HEADING.match(line) or numbered or _BOLD_LINE.match(line)
+        if title:
+            # "1. **Chicken Rice** - quick and easy" -> "Chicken Rice"
+            name = re.sub(r"^\d+[.)]\s*", "", title.group(1))
+            bold = re.match(r"^\*\*(.+?)\*\*\s*[-–:]?\s*(.*)$", name)
+            name, rest = (bold.group(1), bold.group(2)) if bold else (re.split(r"\s+[-–:]\s+", name) + [""])[:2]
+            # "**Chicken Rice** - chicken, rice, soy sauce": an inline ingredient list
+            inline_items = [item.strip() for item in re.split(r",|\band\b", rest) if item.strip()] if "," in rest else []
+            sections.append({"title": _normalise(name), "ingredients": inline_items})
+            block = None
+
+    return sections
+
+
+@dataclass
+class GroundingReport:
+    status: str = "grounded"   # "grounded", "ungrounded" or "uncertain"
+    missing_recipes: list = field(default_factory=list)
+    extra_recipes: list = field(default_factory=list)
+    missing_ingredients: dict = field(default_factory=dict)   # title -> [retrieved ingredient]
+    extra_ingredients: dict = field(default_factory=dict)     # title -> [writer item]
+    quantity_mismatches: dict = field(default_factory=dict)   # title -> [(writer item, retrieved ingredient)]
+    uncertain: list = field(default_factory=list)             # reasons the checker couldn't decide
+
+    @property
+    def is_grounded(self) -> bool:
+        return self.status == "grounded"
+
+    def to_dict(self) -> dict:
+        return {
+            "status": self.status,
+            "missing_recipes": self.missing_recipes,
+            "extra_recipes": self.extra_recipes,
+            "missing_ingredients": self.missing_ingredients,
+            "extra_ingredients": self.extra_ingredients,
+            "quantity_mismatches": self.quantity_mismatches,
+            "uncertain": self.uncertain,
+        }
+
+    def to_text(self) -> str:
+        # Same shape as the Critic's reply, so it can drive the Writer's revision
+        if self.is_grounded:
+            return GROUNDED_MESSAGE
+        lines = []
+        lines += [f"- Missing recipe: {title}" for title in self.missing_recipes]
+        lines += [f"- Recipe not in the retrieved data: {title}" for title in self.extra_recipes]
+        for title, items in self.missing_ingredients.items():
+            lines.append(f"- {title}: missing ingredients {', '.join(items)}")
+        for title, items in self.extra_ingredients.items():
+            lines.append(f"- {title}: ingredients not in the retrieved data {', '.join(items)}")
+        for title, pairs in self.quantity_mismatches.items():
+            lines += [f"- {title}: '{written}' should be '{retrieved}'" for written, retrieved in pairs]
+        lines += [f"- Unclear: {reason}" for reason in self.uncertain]
+        return "\n".join(lines)
+
+
+def _ingredient_score(item: str, ingredient: str) -> float:
+    # Writers often shorten "2 tablespoons fresh lemon juice" to "lemon juice" -
+    # count that as a match when the item's tokens are all in the ingredient
+    item_tokens = ingredient_tokens(item)
+    containment = len(item_tokens & ingredient_tokens(ingredient)) / len(item_tokens) if item_tokens else 0.0
+    return max(_similarity(item, ingredient), containment)
+
+
+def _check_ingredients(title: str, items: list[str], ingredients: list[str], section_text: str,
+                       report: GroundingReport) -> None:
+    if not items:
+        report.uncertain.append(f"no ingredients listed for {title}")
+        return
+
+    # Every writer item should correspond to a retrieved ingredient
+    for item in items:
+        scores = [(_ingredient_score(item, ingredient), ingredient) for ingredient in ingredients]
+        best, best_ingredient = max(scores) if scores else (0.0, "")
+        if best >= INGREDIENT_MATCH:
+            written_numbers = _NUMBER.findall(item)
+            if written_numbers and written_numbers != _NUMBER.findall(best_ingredient):
+                report.quantity_mismatches.setdefault(title, []).append((item, best_ingredient))
+        elif best < INGREDIENT_MISMATCH:
+            report.extra_ingredients.setdefault(title, []).append(item)
+        else:
+            report.uncertain.append(f"'{item}' in {title} only loosely matches '{best_ingredient}'")
+
+    # Every retrieved ingredient should be mentioned somewhere in the section
+    for ingredient in ingredients:
+        if any(_ingredient_score(item, ingredient) >= INGREDIENT_MATCH for item in items):
+            continue
+        tokens = ingredient_tokens(ingredient)
+        if tokens and all(token in section_text for token in tokens):
+            continue
+        report.missing_ingredients.setdefault(title, []).append(ingredient)
+
+
+def check_grounding(writer_output: str, recipes: list[dict]) -> GroundingReport:
+    """
+    Compare the Writer's output with the retrieved `recipes` (dicts or `Recipe`s).
+    """
+    report = GroundingReport()
+    recipes = [recipe if isinstance(recipe, dict) else recipe.model_dump() for recipe in recipes]
+    sections = parse_writer_output(writer_output)
+    full_text = _normalise(writer_output)
+
+    if not recipes:
+        report.uncertain.append("no structured retrieved data to compare against")
+    if not sections:
+        report.uncertain.append("could not find recipe sections in the writer output")
+    if report.uncertain:
+        report.status = "uncertain"
+        return report
+
+    matched_sections = set()
+    for recipe in recipes:
+        title = recipe["title"]
+        scores = [(_similarity(title, section["title"]), i) for i, section in enumerate(sections)]
+        best, best_i = max(scores)
+
+        if best >= TITLE_MATCH:
+            matched_sections.add(best_i)
+            section = sections[best_i]
+            section_text = " ".join([section["title"]] + [_normalise(item) for item in section["ingredients"]])
+            _check_ingredients(title, section["ingredients"], recipe.get("ingredients", []), section_text, report)
+        elif _normalise(title) in full_text:
+            report.uncertain.append(f"{title} is mentioned but not as its own section")
+        elif best >= TITLE_MISMATCH:
+            matched_sections.add(best_i)
+            report.uncertain.append(f"'{sections[best_i]['title']}' may or may not be {title}")
+        else:
+            report.missing_recipes.append(title)
+
+    # Sections that matched no retrieved recipe
+    for i, section in enumerate(sections):
+        if i in matched_sections or _GENERIC_HEADING.match(section["title"]):
+            continue
+        best = max(_similarity(section["title"], recipe["title"]) for recipe in recipes)
+        if best >= TITLE_MISMATCH:
+            continue
+        if section["ingredients"]:
+            report.extra_recipes.append(section["title"])
+        else:
+            report.uncertain.append(f"'{section['title']}' is not a retrieved recipe, but lists no ingredients")
+
+    if report.uncertain:
+        report.status = "uncertain"
+    elif (report.missing_recipes or report.extra_recipes or report.missing_ingredients
+          or report.extra_ingredients or report.quantity_mismatches):
+        report.status = "ungrounded"
+    return report
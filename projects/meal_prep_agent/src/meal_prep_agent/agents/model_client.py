@@ -0,0 +1,52 @@
+"""
+Chat completion client shared by the Researcher, Writer and Critic.
+
+One client per model for the whole process, wrapped in `CachedChatCompletionClient`
+when `LLM_CACHE_ENABLED` - sharing it lets identical prompts from different agents
+(or concurrent pipeline runs) hit the same cache and coalesce in flight. Requests go
+through the shared keep-alive pool in `http_pool`.
+"""
+import threading
+
+from meal_prep_agent.config import AGENT_MODEL, LLM_CACHE_ENABLED, LLM_CACHE_SIZE, LLM_CACHE_PATH, require_api_key
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_model_client(model: str = AGENT_MODEL):
+    client = _clients.get(model)
+    if client is None:
+        with _lock:
+            client = _clients.get(model)
+            if client is None:
+                # autogen-ext / openai / httpx are only imported once a client is needed
+                from autogen_ext.models.openai import OpenAIChatCompletionClient
+
+                from meal_prep_agent.http_pool import chat_timeout, get_async_http_client
+                from meal_prep_agent.models.cached_chat_client import CachedChatCompletionClient
+
+                client = OpenAIChatCompletionClient(
+                    model=model, api_key=require_api_key(), http_client=get_async_http_client(),
+                    timeout=chat_timeout(),
+                )
+                if LLM_CACHE_ENABLED:
+                    client = CachedChatCompletionClient(
+                        client, model, max_entries=LLM_CACHE_SIZE, cache_path=LLM_CACHE_PATH
+                    )
+                _clients[model] = client
+    return client
+
+
+def llm_cache_stats() -> dict:
+    # model -> hit / miss / coalesced counts, for clients that are cached
+    return {model: client.cache_stats() for model, client in _clients.items() if hasattr(client, "cache_stats")}
+
+
+def usage_by_model() -> dict:
+    # model -> tokens actually sent to the API so far (cache hits add nothing)
+    usage = {}
+    for model, client in _clients.items():
+        total = client.total_usage()
+        usage[model] = {"prompt_tokens": total.prompt_tokens, "completion_tokens": total.completion_tokens}
+    return usage
@@ -1,19 +1,222 @@
 import asyncio
 import json
+import time
+from contextlib import suppress
 
+from meal_prep_agent.config import PIPELINE_MODE, RESPONSE_CACHE_ENABLED
 from meal_prep_agent.agents.researcher_agent import run_researcher
-from meal_prep_agent.agents.writer_agent import run_writer
+from meal_prep_agent.agents.writer_agent import build_writer, run_writer, run_writer_stream
 from meal_prep_agent.agents.critic_agent import run_critic
+from meal_prep_agent.agents.tools import prefetched_retrieval, retrieve_recipes
+from meal_prep_agent.agents.grounding import parse_recipes, check_grounding
+from meal_prep_agent.ingredient_index import is_plain_ingredient_list
+from meal_prep_agent.agents.timing import StageTimer
+from meal_prep_agent.agents.events import StageOutput, TokenChunk
+from meal_prep_agent.tracing import span, text_attributes, usage_attributes
 
-async def run_pipeline(user_query:str, n_recipes: int = 5):
+def _critic_input(writer_content: str, researcher_content: str) -> str:
+    # Critic input must be str, not dict
+    return f"""
+    Writer Output:
+    {writer_content}
+
+    Retrieved Data:
+    {researcher_content}
+    """
+
+
+def retrieved_recipes(researcher_result) -> list[dict]:
+    # Structured recipes from the Researcher's tool calls - its final message is free text
+    from autogen_agentchat.messages import ToolCallExecutionEvent
+
+    recipes = []
+    for message in researcher_result.messages:
+        if isinstance(message, ToolCallExecutionEvent):
+            for result in message.content:
+                recipes += parse_recipes(result.content)
+    return recipes
+
+
+async def _run_critic(message: str):
+    # Runs as a task that may be cancelled, so it gets its own span instead of a timer stage
+    with span("pipeline.critic") as critic_span:
+        result = await run_critic(message)
+        critic_span.set_attributes(usage_attributes(result.messages))
+    return result
+
+
+async def _review(writer_content: str, researcher_content: str, recipes: list[dict], timer: StageTimer,
+                  critic_in_parallel: bool) -> tuple:
+    """
+    Deterministic grounding check, with the LLM Critic only as the tie-breaker.
+
+    Returns (grounding report, critique) - the critique is the Critic's reply when
+    the checker was uncertain, otherwise the checker's own report text. With
+    `critic_in_parallel` the Critic is started before the check and cancelled if
+    the check is conclusive, so an uncertain result costs no extra latency; the
+    check runs in a thread meanwhile so the Critic's request is actually in flight.
+    """
+    critic_start = time.perf_counter()
+    critic_task = None
+    if critic_in_parallel:
+        critic_task = asyncio.create_task(_run_critic(_critic_input(writer_content, researcher_content)))
+
+    with timer.stage("grounding_check") as check_span:
+        report = await asyncio.to_thread(check_grounding, writer_content, recipes)
+        check_span.set_attribute("grounding_status", report.status)
+
+    if report.status != "uncertain":
+        if critic_task is not None:
+            critic_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await critic_task
+            timer.record("critic (cancelled)", critic_start, time.perf_counter())
+        return report, report.to_text()
+
+    if critic_task is None:
+        critic_start = time.perf_counter()
+        critic_task = asyncio.create_task(_run_critic(_critic_input(writer_content, researcher_content)))
+    critic_result = await critic_task
+    timer.record("critic", critic_start, time.perf_counter())
+    return report, critic_result.messages[-1].content
+
+
+def _revision_prompt(critic_content: str, writer_content: str) -> str:
+    return f"""
+        Revise your answer based on this critique: "
+        {critic_content}
+
+        Original answer:
+        {writer_content}
+        """
+
+
+async def _write(writer, message: str, role: str, stage: str, timer: StageTimer, stream: bool):
+    """
+    Run the run's Writer agent on `message`. With `stream`, yields a TokenChunk per model chunk
+    as it arrives; the last item yielded is always the complete reply text.
+    """
+    from autogen_agentchat.base import TaskResult
+    from autogen_agentchat.messages import ModelClientStreamingChunkEvent
+
+    with timer.stage(stage) as stage_span:
+        if not stream:
+            result = await run_writer(message, writer)
+            stage_span.set_attributes(usage_attributes(result.messages))
+            yield result.messages[-1].content
+            return
+
+        async for event in run_writer_stream(message, writer):
+            if isinstance(event, ModelClientStreamingChunkEvent):
+                timer.mark(f"{stage}_first_token")
+                yield TokenChunk(role, event.content)
+            elif isinstance(event, TaskResult):
+                stage_span.set_attributes(usage_attributes(event.messages))
+                yield event.messages[-1].content
+
+
+async def _write_and_review(researcher_content: str, recipes: list[dict], timer: StageTimer, stream: bool,
+                            critic_in_parallel: bool):
+    """
+    The stages after research, shared by both modes: Writer, review (`_review`),
+    then a revision unless the review found the answer fully grounded. Yields
+    WRITER OUTPUT, GROUNDING REPORT, CRITC OUTPUT and FINAL, with the Writer's
+    TokenChunks first when streaming.
+    """
+    writer = build_writer()
+    async for item in _write(writer, researcher_content, "WRITER OUTPUT", "writer", timer, stream):
+        if isinstance(item, TokenChunk):
+            yield item
+        else:
+            writer_content = item
+    yield StageOutput("WRITER OUTPUT", writer_content)
+
+    report, critic_content = await _review(writer_content, researcher_content, recipes, timer, critic_in_parallel)
+    yield StageOutput("GROUNDING REPORT", json.dumps(report.to_dict()))
+    yield StageOutput("CRITC OUTPUT", critic_content)
+
+    final_answer = writer_content
+    if "fully grounded" not in critic_content.lower():
+        revision_prompt = _revision_prompt(critic_content, writer_content)
+        async for item in _write(writer, revision_prompt, "FINAL", "revision", timer, stream):
+            if isinstance(item, TokenChunk):
+                yield item
+            else:
+                final_answer = item
+    yield StageOutput("FINAL", final_answer)
+
+
+async def run_pipeline(user_query:str, n_recipes: int = 5, mode: str = PIPELINE_MODE, stream: bool = False,
+                       use_cache: bool = RESPONSE_CACHE_ENABLED, retrieved: list = None):
     """
     Full multi-agent RAG workflow:
     1. Retrieve context from user query
     2. Researcher analyzes quesion + context to retrieve relevant recipes
     3. Writer summarizes output from Researcher into human-readable format
-    4. Critic evaluates Writer output 
+    4. Critic evaluates Writer output
     5. Writer revises
+
+    The Critic only runs when the deterministic grounding checker
+    (`agents/grounding.py`) is uncertain; otherwise the checker's report decides
+    whether the Writer revises.
+
+    mode="serial" runs the stages one after another. mode="speculative" skips the
+    Researcher for plain ingredient lists (retrieval feeds the Writer directly) and
+    starts the Critic alongside the grounding check, cancelling it when the check
+    is conclusive. Both end with a TIMINGS frame.
+
+    Yields `StageOutput` events; with `stream=True` the Writer's replies (WRITER OUTPUT
+    and a revised FINAL) also arrive token by token as `TokenChunk` events first.
+
+    With `use_cache`, a repeat (or near-duplicate) query whose retrieval returns the
+    same recipes replays the cached frames instead of running any agent, after a
+    CACHED RESPONSE frame saying so.
+
+    `retrieved` is the result of `retrieve_recipes(user_query, n_recipes)` when the
+    caller already has it (e.g. batch mode, which retrieves many queries at once);
+    it is then used for the cache key, the speculative path and the Researcher's own
+    tool call for the same query instead of retrieving again.
     """
+    with span("pipeline.run", **text_attributes("query", user_query), n_recipes=n_recipes, mode=mode, stream=stream,
+              use_cache=use_cache) as run_span:
+        pipeline = _run_speculative if mode == "speculative" else _run_serial
+        if not use_cache:
+            async for event in pipeline(user_query, n_recipes, stream, retrieved):
+                yield event
+            return
+
+        # The cache key needs the retrieved recipe ids - one (batched, embedding-cached) retrieval
+        from meal_prep_agent.agents.response_cache import get_response_cache
+
+        timer = StageTimer()
+        cache = get_response_cache()
+        with timer.stage("cache_lookup"):
+            recipes = retrieved if retrieved is not None else await retrieve_recipes(user_query, n_recipes)
+            frames, tier = await asyncio.to_thread(cache.lookup, user_query, n_recipes, recipes, mode)
+        run_span.set_attribute("response_cache", tier or "miss")
+
+        if frames is not None:
+            # A semantic hit's frames were produced for a different (near-duplicate) query
+            source = "an identical query" if tier == "exact" else "a near-duplicate query"
+            yield StageOutput("CACHED RESPONSE",
+                              f"Replayed from the response cache ({source}), not generated for this request.")
+            for role, content in frames:
+                yield StageOutput(role, content)
+            yield StageOutput("TIMINGS", json.dumps(dict(timer.report(), cache=tier)))
+            return
+
+        frames = []
+        async for event in pipeline(user_query, n_recipes, stream, recipes):
+            if isinstance(event, StageOutput) and event.role != "TIMINGS":
+                frames.append((event.role, event.content))
+            yield event
+        if not any(recipe.get("fallback") for recipe in recipes):
+            # Answers built on degraded retrieval aren't worth replaying
+            await asyncio.to_thread(cache.store, user_query, n_recipes, recipes, frames, mode)
+
+
+async def _run_serial(user_query: str, n_recipes: int, stream: bool, retrieved: list = None):
+    timer = StageTimer()
 
     # Step 1: Researcher retrieves structured data
     researcher_input = json.dumps({
@@ -21,49 +224,54 @@ async def run_pipeline(user_query:str, n_recipes: int = 5):
         "n_recipes": n_recipes
     })
 
-    yield f"RESEARCHER INPUT: {researcher_input}"
-    researcher_result = await run_researcher(researcher_input)
+    yield StageOutput("RESEARCHER INPUT", researcher_input)
+    with timer.stage("researcher") as stage_span, prefetched_retrieval(user_query, n_recipes, retrieved):
+        researcher_result = await run_researcher(researcher_input)
+        stage_span.set_attributes(usage_attributes(researcher_result.messages))
     researcher_content = researcher_result.messages[-1].content
-    yield f"RESEARCHER RAW OUTPUT: {researcher_content}" 
-
-    # Step 2: Writer generates human-readable output
-    writer_result = await run_writer(researcher_content)
-    writer_content = writer_result.messages[-1].content
-    yield f"WRITER OUTPUT: {writer_content}" 
-
-    # Step 3: Critic evalutes grounding (must be str, not dict)
-    critic_input = f""" 
-    Writer Output: 
-    {writer_content} 
-    
-    Retrieved Data: 
-    {researcher_content} 
-    """
-    critic_result = await run_critic(str(critic_input))
-    critic_content = critic_result.messages[-1].content
-    yield f"CRITC OUTPUT: {critic_content}"
+    recipes = retrieved_recipes(researcher_result)
+    yield StageOutput("RESEARCHER RAW OUTPUT", researcher_content)
 
-    # Step 4: Writer takes in Critic feedback
-    if "fully grounded" not in critic_content.lower():
-        writer_revise_result = await run_writer(
-            f"""
-            Revise your answer based on this critique: " 
-            {critic_content}
-
-            Original answer:
-            {writer_content}
-            """
-        )
-        final_answer = writer_revise_result.messages[-1].content
+    # Steps 2-4: Writer, grounding check (Critic only if the check can't decide), revision
+    async for event in _write_and_review(researcher_content, recipes, timer, stream, critic_in_parallel=False):
+        yield event
+    yield StageOutput("TIMINGS", json.dumps(timer.report()))
+
+
+async def _run_speculative(user_query: str, n_recipes: int, stream: bool, retrieved: list = None):
+    timer = StageTimer()
+
+    researcher_input = json.dumps({
+        "query": user_query,
+        "n_recipes": n_recipes
+    })
+    yield StageOutput("RESEARCHER INPUT", researcher_input)
+
+    # Step 1: a plain ingredient list needs no interpretation - hand the retrieval
+    # results straight to the Writer instead of waiting on the Researcher's LLM turns
+    if is_plain_ingredient_list(user_query):
+        with timer.stage("retrieval") as stage_span:
+            # Already retrieved for the response cache key, if caching is on
+            recipes = retrieved if retrieved is not None else await retrieve_recipes(user_query, n_recipes)
+            stage_span.set_attribute("result_count", len(recipes))
+        researcher_content = json.dumps(recipes)
     else:
-        final_answer = writer_content
+        with timer.stage("researcher") as stage_span, prefetched_retrieval(user_query, n_recipes, retrieved):
+            researcher_result = await run_researcher(researcher_input)
+            stage_span.set_attributes(usage_attributes(researcher_result.messages))
+        researcher_content = researcher_result.messages[-1].content
+        recipes = retrieved_recipes(researcher_result)
+    yield StageOutput("RESEARCHER RAW OUTPUT", researcher_content)
 
-    # Final Output
-    yield f"FINAL: {final_answer}"
+    # Steps 2-4: the Critic starts right after the Writer; the deterministic check runs
+    # meanwhile and, if it is conclusive, the Critic is cancelled
+    async for event in _write_and_review(researcher_content, recipes, timer, stream, critic_in_parallel=True):
+        yield event
+    yield StageOutput("TIMINGS", json.dumps(timer.report()))
 
 if __name__ == "__main__":
     async def main():
-        async for frame in run_pipeline("Find recipes with chicken and brocoli", n_recipes=5):
-            print(frame)
+        async for event in run_pipeline("Find recipes with chicken and brocoli", n_recipes=5):
+            print(event)
 
     asyncio.run(main())
@@ -7,22 +7,9 @@ Responsible for:
 - returning structured recipe data
 - avoiding synthesis or final answers
 """
-from autogen_agentchat.agents import AssistantAgent
-from autogen_ext.models.openai import OpenAIChatCompletionClient
-from autogen_core.tools import FunctionTool
+from meal_prep_agent.agents.tools import retrieve_recipes, retrieve_recipes_many
 
-from meal_prep_agent.config import API_KEY, AGENT_MODEL
-from meal_prep_agent.agents.tools import retrieve_recipes
-
-model_client = OpenAIChatCompletionClient(model=AGENT_MODEL, api_key=API_KEY)
-
-# Register the custom function as a tool
-retriever_tool = FunctionTool(retrieve_recipes, description='A tool to retrieve recipes')
-
-researcher = AssistantAgent(
-    name="researcher",
-    model_client=model_client,
-    system_message=("""
+SYSTEM_MESSAGE = """
         You are the Researcher agent in a multi-agent recipe retrieval system.  
         Your job is to analyze the user's query and gather factual information. 
 
@@ -36,19 +23,48 @@ researcher = AssistantAgent(
         When calling this tool:
         - Pass query=<query>
         - Pass n=<n_recipes> if provided, otherwise default to 5
+
+        If the request needs several separate searches (e.g. one per meal or ingredient group),
+        call retrieve_recipes_many(queries: list[str], n: int = 5) ONCE with all of them
+        instead of calling retrieve_recipes repeatedly.
         
         When recipe information is needed, ALWAYS call the `retrieve_recipes` tool. 
         Do not guess or fabricate information. 
         Return your findings as structured data, not narrative text. 
         Do not write final answers or summaries — that is the Writer agent's job.
         """
-    ),
-    tools=[retriever_tool],
-    reflect_on_tool_use=True,
-)
+
+def build_researcher():
+    """
+    A new Researcher agent - autogen and the model client are only imported /
+    created here, not when this module is imported.
+
+    An agent keeps its chat history between runs, so each pipeline run builds its
+    own; sharing one would mix concurrent requests' recipes into each other's
+    prompts. Only the model client is shared.
+    """
+    from autogen_agentchat.agents import AssistantAgent
+    from autogen_core.tools import FunctionTool
+
+    from meal_prep_agent.agents.model_client import get_model_client
+
+    # Register the custom function as a tool
+    retriever_tool = FunctionTool(retrieve_recipes, description='A tool to retrieve recipes')
+    retriever_many_tool = FunctionTool(
+        retrieve_recipes_many,
+        description='A tool to retrieve recipes for several queries at once, returned per query',
+    )
+
+    return AssistantAgent(
+        name="researcher",
+        model_client=get_model_client(),
+        system_message=SYSTEM_MESSAGE,
+        tools=[retriever_tool, retriever_many_tool],
+        reflect_on_tool_use=True,
+    )
 
 # Define task
 task = "Find recipes that match criteria"
 
 async def run_researcher(query: str):
-    return await researcher.run(task=query)
+    return await build_researcher().run(task=query)
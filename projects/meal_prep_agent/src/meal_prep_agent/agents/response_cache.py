@@ -0,0 +1,237 @@
+"""
+Response cache for `orchestrator.run_pipeline`.
+
+Entries are keyed by normalised query + `n_recipes` + pipeline mode + the set of
+recipe IDs a plain retrieval returns for the query, and hold the pipeline's output
+frames so a hit can replay them without any LLM call. Two lookup tiers:
+- exact: same normalised query, same retrieved recipes
+- semantic (optional): same retrieved recipes, and the query's embedding is within
+  `similarity` (cosine) of a cached query's, e.g. "chicken and rice" vs "rice, chicken"
+
+Entries expire after `ttl_seconds`, the least recently used are evicted past
+`max_entries`, and every entry records the vectorstore's index version - once
+`embed.py` re-indexes (bumping the manifest version) older entries are ignored.
+Like `CachedEmbeddingFunction`, there is an in-memory LRU and an optional SQLite tier.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from meal_prep_agent.index_manifest import MANIFEST_FILENAME, recipe_id
+from meal_prep_agent.models.cached_embedding import normalise_text
+
+
+def retrieved_ids_key(recipes: list[dict]) -> str:
+    # Order-insensitive: the same recipes ranked differently still give the same answer
+    return ",".join(sorted(recipe_id(r["title"], r["ingredients"]) for r in recipes))
+
+
+class ResponseCache:
+    def __init__(self, store_path, max_entries: int = 512, ttl_seconds: float = 86400,
+                 similarity: float = None, embedding_fn=None, cache_path=None):
+        self.manifest_path = Path(store_path) / MANIFEST_FILENAME
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        self.embedding_fn = embedding_fn   # only needed for the semantic tier
+
+        self._lru = OrderedDict()   # key -> entry dict
+        self._lock = threading.Lock()
+        self._version = (None, 0)   # (manifest mtime, index version)
+        self.stats = {"hits": 0, "semantic_hits": 0, "misses": 0, "evictions": 0, "expired": 0, "stale": 0}
+
+        self._db = None
+        if cache_path is not None:
+            Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(cache_path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, group_key TEXT, "
+                "vector BLOB, frames TEXT, index_version INTEGER, created REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_group ON responses (group_key)")
+            self._db.commit()
+
+    def index_version(self) -> int:
+        # Re-read the manifest only when embed.py has rewritten it
+        try:
+            mtime = self.manifest_path.stat().st_mtime
+        except FileNotFoundError:
+            return 0
+        if mtime != self._version[0]:
+            self._version = (mtime, json.loads(self.manifest_path.read_text())["version"])
+        return self._version[1]
+
+    @staticmethod
+    def _keys(query: str, n_recipes: int, recipes: list[dict], mode: str) -> tuple[str, str]:
+        # The modes emit different frames (serial always runs the Researcher), so they never share entries
+        group_key = f"{mode}\0{n_recipes}\0{retrieved_ids_key(recipes)}"
+        key = hashlib.sha256(f"{normalise_text(query)}\0{group_key}".encode("utf-8")).hexdigest()
+        return key, hashlib.sha256(group_key.encode("utf-8")).hexdigest()
+
+    def _query_vector(self, query: str):
+        if self.embedding_fn is None or not self.similarity:
+            return None
+        vector = np.asarray(self.embedding_fn([query])[0], dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _valid(self, entry: dict, version: int) -> bool:
+        if entry["index_version"] != version:
+            self.stats["stale"] += 1
+            return False
+        if time.time() - entry["created"] > self.ttl_seconds:
+            self.stats["expired"] += 1
+            return False
+        return True
+
+    def _lru_put(self, key: str, entry: dict) -> None:
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _row_to_entry(self, row) -> dict:
+        key, group_key, vector, frames, index_version, created = row
+        return {
+            "key": key,
+            "group_key": group_key,
+            "vector": np.frombuffer(vector, dtype=np.float32) if vector is not None else None,
+            "frames": [tuple(frame) for frame in json.loads(frames)],
+            "index_version": index_version,
+            "created": created,
+        }
+
+    def _group_entries(self, group_key: str) -> list[dict]:
+        entries = {key: entry for key, entry in self._lru.items() if entry["group_key"] == group_key}
+        if self._db is not None:
+            rows = self._db.execute("SELECT * FROM responses WHERE group_key = ?", (group_key,)).fetchall()
+            for row in rows:
+                entries.setdefault(row[0], self._row_to_entry(row))
+        return list(entries.values())
+
+    def lookup(self, query: str, n_recipes: int, recipes: list[dict], mode: str):
+        """
+        Cached frames [(role, content), ...] and the tier that hit ("exact" or
+        "semantic"), or (None, None) on a miss.
+        """
+        if not recipes:
+            return None, None
+        key, group_key = self._keys(query, n_recipes, recipes, mode)
+        version = self.index_version()
+
+        with self._lock:
+            # Exact tier - memory, then disk
+            entry = self._lru.get(key)
+            if entry is None and self._db is not None:
+                row = self._db.execute("SELECT * FROM responses WHERE key = ?", (key,)).fetchone()
+                entry = self._row_to_entry(row) if row is not None else None
+            if entry is not None and self._valid(entry, version):
+                self._lru_put(key, entry)
+                self.stats["hits"] += 1
+                return entry["frames"], "exact"
+
+        # Semantic tier - embedding call (usually an embedding-cache hit) outside the lock
+        vector = self._query_vector(query)
+        if vector is not None:
+            with self._lock:
+                candidates = [
+                    entry for entry in self._group_entries(group_key)
+                    if entry["vector"] is not None and len(entry["vector"]) == len(vector)
+                ]
+                best = max(candidates, key=lambda entry: float(entry["vector"] @ vector), default=None)
+                if best is not None and float(best["vector"] @ vector) >= self.similarity and self._valid(best, version):
+                    self._lru_put(best["key"], best)
+                    self.stats["semantic_hits"] += 1
+                    return best["frames"], "semantic"
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None, None
+
+    def store(self, query: str, n_recipes: int, recipes: list[dict], frames: list[tuple[str, str]],
+              mode: str) -> None:
+        if not recipes:
+            return
+        key, group_key = self._keys(query, n_recipes, recipes, mode)
+        vector = self._query_vector(query)
+        entry = {
+            "key": key,
+            "group_key": group_key,
+            "vector": vector,
+            "frames": [tuple(frame) for frame in frames],
+            "index_version": self.index_version(),
+            "created": time.time(),
+        }
+
+        with self._lock:
+            self._lru_put(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, group_key, vector.tobytes() if vector is not None else None,
+                     json.dumps(entry["frames"]), entry["index_version"], entry["created"]),
+                )
+                # Size and TTL bounds for the disk tier too
+                self._db.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl_seconds,))
+                self._db.execute(
+                    "DELETE FROM responses WHERE key NOT IN "
+                    "(SELECT key FROM responses ORDER BY created DESC LIMIT ?)",
+                    (self.max_entries,),
+                )
+                self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._lru.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def cache_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_entries"] = len(self._lru)
+        return stats
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """
+    Process-wide cache configured from `config`, created on first use.
+    """
+    global _shared_cache
+    if _shared_cache is None:
+        from meal_prep_agent import retriever_pool
+        from meal_prep_agent.config import (
+            VECTORSTORE_PATH,
+            RESPONSE_CACHE_SIZE,
+            RESPONSE_CACHE_TTL_SECONDS,
+            RESPONSE_CACHE_SIMILARITY,
+            RESPONSE_CACHE_PATH,
+        )
+
+        with _shared_lock:
+            if _shared_cache is None:
+                _shared_cache = ResponseCache(
+                    VECTORSTORE_PATH,
+                    max_entries=RESPONSE_CACHE_SIZE,
+                    ttl_seconds=RESPONSE_CACHE_TTL_SECONDS,
+                    similarity=RESPONSE_CACHE_SIMILARITY,
+                    embedding_fn=retriever_pool.get_embedding_function() if RESPONSE_CACHE_SIMILARITY else None,
+                    cache_path=RESPONSE_CACHE_PATH,
+                )
+    return _shared_cache
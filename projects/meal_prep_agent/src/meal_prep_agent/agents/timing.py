@@ -0,0 +1,55 @@
+"""
+Stage timings for the agent pipeline.
+
+Stages may overlap (e.g. the critic runs alongside the grounding check), so besides
+per-stage durations the report gives the critical path: the chain of stages the
+final answer actually waited on. Each stage is also a `pipeline.<name>` tracing span.
+"""
+import time
+from contextlib import contextmanager
+
+from meal_prep_agent.tracing import span
+
+
+class StageTimer:
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.stages = []   # (name, start, end) in seconds since `origin`
+        self.marks = {}    # name -> seconds since `origin`, e.g. time to first token
+
+    @contextmanager
+    def stage(self, name: str):
+        # Yields the stage's span, for attributes such as token usage
+        start = time.perf_counter() - self.origin
+        try:
+            with span(f"pipeline.{name}") as stage_span:
+                yield stage_span
+        finally:
+            self.stages.append((name, start, time.perf_counter() - self.origin))
+
+    def record(self, name: str, start: float, end: float) -> None:
+        # For stages timed outside a `with` block (e.g. a background task)
+        self.stages.append((name, start - self.origin, end - self.origin))
+
+    def mark(self, name: str) -> None:
+        self.marks.setdefault(name, time.perf_counter() - self.origin)
+
+    def critical_path(self) -> list[str]:
+        # Walk back from the last stage to finish, each time to the latest stage that
+        # ended before the current one started
+        remaining = sorted(self.stages, key=lambda s: s[2])
+        path = []
+        while remaining:
+            name, start, _ = remaining.pop()
+            path.append(name)
+            remaining = [s for s in remaining if s[2] <= start + 1e-6]
+        return path[::-1]
+
+    def report(self) -> dict:
+        return {
+            "stages": {name: round(end - start, 3) for name, start, end in self.stages},
+            "critical_path": self.critical_path(),
+            "marks": {name: round(at, 3) for name, at in self.marks.items()},
+            "wall_seconds": round(time.perf_counter() - self.origin, 3),
+            "serial_seconds": round(sum(end - start for _, start, end in self.stages), 3),
+        }
@@ -1,6 +1,72 @@
-from meal_prep_agent.retriever import Retriever
+import asyncio
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, List
 
-def retrieve_recipes(query: str, n: int = 5):
-    retr = Retriever()
-    recipes = retr.retrieve(query, n)
-    return [r.model_dump() for r in recipes]
\ No newline at end of file
+from meal_prep_agent.ingredient_index import is_plain_ingredient_list
+from meal_prep_agent.tracing import span, text_attributes
+
+def _retrieval_mode(query: str):
+    # Plain ingredient lists are ranked by ingredient overlap (inverted index) first,
+    # anything else by the default retrieval mode
+    return "ingredients" if is_plain_ingredient_list(query) else None
+
+
+# {(query, n): recipes} the pipeline already retrieved, served to the Researcher's tool calls
+_prefetched = contextvars.ContextVar("prefetched_retrievals", default=None)
+
+
+@contextmanager
+def prefetched_retrieval(query: str, n: int, recipes: list = None):
+    """
+    Inside the block, `retrieve_recipes(query, n)` returns `recipes` instead of
+    querying again (no-op when `recipes` is None). Keep the block free of `yield`s:
+    the context variable belongs to whichever task runs it.
+    """
+    if recipes is None:
+        yield
+        return
+    token = _prefetched.set({(query.strip(), n): recipes})
+    try:
+        yield
+    finally:
+        _prefetched.reset(token)
+
+
+async def retrieve_recipes(query: str, n: int = 5):
+    # Shared retriever - chroma + openai clients are opened once per process.
+    # Concurrent calls are coalesced into one batched lookup by the batcher.
+    # Imported here so loading the agents doesn't import chroma
+    from meal_prep_agent.retriever_pool import aget_retriever
+    from meal_prep_agent.query_batcher import get_batcher
+
+    with span("tool.retrieve_recipes", **text_attributes("query", query), n=n) as tool_span:
+        prefetched = (_prefetched.get() or {}).get((query.strip(), n))
+        if prefetched is not None:
+            tool_span.set_attributes({"prefetched": True, "result_count": len(prefetched)})
+            return list(prefetched)
+        retr = await aget_retriever()
+        mode = _retrieval_mode(query)
+        recipes = await get_batcher(retr).retrieve(query, n, mode)
+        tool_span.set_attributes({"mode": mode, "result_count": len(recipes)})
+    return [r.model_dump(exclude_none=True) for r in recipes]
+
+async def retrieve_recipes_many(queries: List[str], n: int = 5) -> Dict[str, List[dict]]:
+    # Several queries in one call: one embedding request + one chroma query (per retrieval
+    # mode) - each query is ranked exactly as `retrieve_recipes` would rank it
+    from meal_prep_agent.retriever_pool import aget_retriever
+
+    with span("tool.retrieve_recipes_many", queries=len(queries), n=n) as tool_span:
+        retr = await aget_retriever()
+        by_mode = {}
+        for query in queries:
+            by_mode.setdefault(_retrieval_mode(query), []).append(query)
+        found = {}
+        for mode, mode_queries in by_mode.items():
+            results = await asyncio.to_thread(retr.retrieve_many, mode_queries, n, mode)
+            found.update(zip(mode_queries, results))
+        tool_span.set_attribute("result_count", sum(len(recipes) for recipes in found.values()))
+    return {
+        query: [r.model_dump(exclude_none=True) for r in found[query]]
+        for query in queries
+    }
@@ -5,29 +5,40 @@ Responsible for:
 - Receiving structured recipe data
 - Turning data into polished repsponse
 """
-from autogen_agentchat.agents import AssistantAgent
-from autogen_ext.models.openai import OpenAIChatCompletionClient
+SYSTEM_MESSAGE = (
+    "You are the Writer agent in a multi-agent recipe retrieval system. " 
+    "Your receive structured recipe data from the Researcher agent. " 
+    "Your job is to transform that data into a clear, helpful, human-readable answer. " 
+    "Do not call tools. " 
+    "Do not perform reserach. " 
+    "Do not invent details that are not present in the provided data. "
+    "Do not critique or evaluate - that is the Critic agent's job"
+)
 
-from meal_prep_agent.config import API_KEY, AGENT_MODEL
+def build_writer():
+    """
+    A new Writer agent, one per pipeline run (see `researcher_agent.build_researcher`).
+    The run's draft and revision share it, so the revision sees the draft's context.
+    """
+    from autogen_agentchat.agents import AssistantAgent
 
-model_client = OpenAIChatCompletionClient(model=AGENT_MODEL, api_key=API_KEY)
+    from meal_prep_agent.agents.model_client import get_model_client
 
-writer = AssistantAgent(
-    name="writer",
-    model_client=model_client,
-    system_message=(
-       "You are the Writer agent in a multi-agent recipe retrieval system. " 
-       "Your receive structured recipe data from the Researcher agent. " 
-       "Your job is to transform that data into a clear, helpful, human-readable answer. " 
-       "Do not call tools. " 
-       "Do not perform reserach. " 
-       "Do not invent details that are not present in the provided data. "
-       "Do not critique or evaluate - that is the Critic agent's job" 
-    ),
-)
+    return AssistantAgent(
+        name="writer",
+        model_client=get_model_client(),
+        model_client_stream=True,   # token chunks from `run_stream`; `run` is unaffected
+        system_message=SYSTEM_MESSAGE,
+    )
 
 # Define task
 task = "Write a clear, grounded answer using the retrieved context explicitly"
 
-async def run_writer(message: str):
-    return await writer.run(task=message)
\ No newline at end of file
+async def run_writer(message: str, writer=None):
+    # `writer`: the run's agent from `build_writer`, else a new one
+    return await (writer or build_writer()).run(task=message)
+
+async def run_writer_stream(message: str, writer=None):
+    # Yields ModelClientStreamingChunkEvent per token chunk, the messages, then the TaskResult
+    async for event in (writer or build_writer()).run_stream(task=message):
+        yield event
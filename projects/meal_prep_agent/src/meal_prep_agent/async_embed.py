@@ -0,0 +1,152 @@
+# async_embed.py
+"""
+Concurrent embedding engine used by `embed.py`.
+
+Embeddings for many batches are computed concurrently (bounded by an in-flight limit),
+paced by token buckets on both requests and tokens per minute, and retried with jittered
+exponential backoff on 429 / 5xx / connection errors. Precomputed vectors are then
+written to Chroma with `collection.upsert(embeddings=...)`, so ingest time scales with the
+concurrency limit rather than the number of batches.
+"""
+import asyncio
+import random
+import time
+
+import openai
+
+from meal_prep_agent.batching import BatchStats
+
+MAX_RETRIES = 6
+BASE_BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 60.0
+
+
+class TokenBucket:
+    """
+    Async token bucket refilled continuously at `rate_per_minute`.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: float = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1) -> None:
+        # A single request larger than the bucket would never fit - cap it at capacity
+        amount = min(amount, self.capacity)
+
+        # Lock held while waiting so callers are served in arrival order
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+
+
+class RateLimiter:
+    """
+    Paces calls against both a requests-per-minute and a tokens-per-minute budget.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    async def acquire(self, n_tokens: int) -> None:
+        await self.requests.acquire(1)
+        await self.tokens.acquire(n_tokens)
+
+
+def is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code >= 500
+    return False
+
+
+async def embed_with_retry(embed_batch, texts: list[str], max_retries: int = MAX_RETRIES):
+    """
+    Call `embed_batch(texts)`, retrying retryable errors with full-jitter backoff.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return await embed_batch(texts)
+        except Exception as exc:
+            if attempt == max_retries or not is_retryable(exc):
+                raise
+            delay = random.uniform(0, min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * 2 ** attempt))
+            print(f"Embedding call failed ({type(exc).__name__}), retry {attempt + 1}/{max_retries} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+def openai_embed_batch(client: openai.AsyncOpenAI, model: str):
+    """
+    Build an async `embed_batch(texts)` callable on top of an `AsyncOpenAI` client.
+    """
+    async def embed_batch(texts: list[str]) -> list[list[float]]:
+        response = await client.embeddings.create(model=model, input=texts)
+        return [item.embedding for item in response.data]
+
+    return embed_batch
+
+
+def local_embed_batch(embedding_fn):
+    """
+    Async `embed_batch(texts)` for a blocking (local, CPU) embedding function - runs
+    it in a worker thread so concurrent batches still overlap with chroma writes.
+    """
+    async def embed_batch(texts: list[str]) -> list[list[float]]:
+        return await asyncio.to_thread(embedding_fn, texts)
+
+    return embed_batch
+
+
+async def embed_and_store(batches, embed_batch, collection, max_in_flight: int,
+                          limiter: RateLimiter = None, on_commit=None):
+    """
+    Embed every batch concurrently and upsert the vectors into `collection`.
+
+    `batches` is a list of (docs, ids, metadatas, n_tokens) tuples. `on_commit(ids)`
+    is called once a batch has been written (used to checkpoint). `limiter=None`
+    disables rate limiting (local embedding backends). Returns a
+    `BatchStats` per batch, in batch order.
+    """
+    semaphore = asyncio.Semaphore(max_in_flight)
+    write_lock = asyncio.Lock()   # chroma writes are serialised, embedding calls are not
+    num_batches = len(batches)
+
+    async def run_batch(batch_idx, docs_batch, ids_batch, meta_batch, n_tokens):
+        async with semaphore:
+            if limiter is not None:
+                await limiter.acquire(n_tokens)
+            start = time.time()
+            embeddings = await embed_with_retry(embed_batch, docs_batch)
+            embed_seconds = time.time() - start
+
+        async with write_lock:
+            await asyncio.to_thread(
+                collection.upsert,
+                documents=docs_batch,
+                ids=ids_batch,
+                metadatas=meta_batch,
+                embeddings=embeddings,
+            )
+            if on_commit is not None:
+                on_commit(ids_batch)
+
+        print(f"Embedding Batch {batch_idx + 1}/{num_batches} ({len(docs_batch)} docs, {n_tokens} tokens) took {embed_seconds:.2f}s")
+        return BatchStats(batch_idx, len(docs_batch), n_tokens, embed_seconds)
+
+    return await asyncio.gather(*(
+        run_batch(batch_idx, *batch)
+        for batch_idx, batch in enumerate(batches)
+    ))
@@ -0,0 +1,256 @@
+"""
+Batch / offline mode for `orchestrator.run_pipeline`, e.g. weekly plans for many users.
+
+- requests come from a JSONL file: {"id": ..., "query": ..., "n_recipes": ...}
+  (`id` defaults to the line number, `n_recipes` to --n-recipes)
+- identical queries (same normalised text, n_recipes and mode) run the pipeline
+  once; every request gets its own output record
+- retrieval is done ahead of the agents, `QUERY_BATCH_MAX_SIZE` queries per
+  `retrieve_many` call (one embedding request + one chroma query), and handed to
+  `run_pipeline`; the queue between retrieval and the workers is bounded, so
+  retrieval pauses when the workers fall behind
+- `BATCH_WORKERS` pipeline runs at once, each with its own agents (only the model
+  client is shared, so one request never sees another's prompts) and a time limit
+- results are appended to the output JSONL as they finish (flushed and fsynced);
+  re-running with the same output file skips requests that already succeeded
+
+Ends with a summary: requests/minute, latency percentiles, tokens and cost per request.
+
+Run:
+    python -m meal_prep_agent.batch_pipeline requests.jsonl --out plans.jsonl --workers 8
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+from meal_prep_agent.config import (
+    BATCH_WORKERS, BATCH_QUEUE_SIZE, BATCH_REQUEST_TIMEOUT_SECONDS, MODEL_PRICES_PER_1M_TOKENS,
+    PIPELINE_MODE, QUERY_BATCH_MAX_SIZE, RESPONSE_CACHE_ENABLED,
+)
+from meal_prep_agent.models.cached_embedding import normalise_text
+
+
+def read_requests(path, n_recipes: int = 5) -> list[dict]:
+    requests = []
+    for line_no, line in enumerate(Path(path).read_text(encoding="utf-8").splitlines(), start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        record = json.loads(line)
+        if not record.get("query"):
+            raise ValueError(f"{path}:{line_no}: request has no 'query'")
+        requests.append({
+            "id": str(record.get("id", line_no)),
+            "query": record["query"],
+            "n_recipes": int(record.get("n_recipes", n_recipes)),
+        })
+    return requests
+
+
+def request_key(query: str, n_recipes: int, mode: str) -> str:
+    return hashlib.sha1(f"{normalise_text(query)}\0{n_recipes}\0{mode}".encode("utf-8")).hexdigest()[:16]
+
+
+def completed_ids(out_path) -> set:
+    # Request ids already answered in `out_path` - a line cut short by a crash is ignored
+    done = set()
+    if not os.path.exists(out_path):
+        return done
+    with open(out_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("status") == "ok":
+                done.add(record["id"])
+    return done
+
+
+def request_cost(usage: dict) -> float:
+    # USD for {model: {"prompt_tokens", "completion_tokens"}}; unpriced models count as 0
+    cost = 0.0
+    for model, tokens in usage.items():
+        prompt_price, completion_price = MODEL_PRICES_PER_1M_TOKENS.get(model, (0.0, 0.0))
+        cost += (tokens["prompt_tokens"] * prompt_price + tokens["completion_tokens"] * completion_price) / 1e6
+    return cost
+
+
+def _usage_delta(before: dict, after: dict) -> dict:
+    zero = {"prompt_tokens": 0, "completion_tokens": 0}
+    return {
+        model: {name: tokens[name] - before.get(model, zero)[name] for name in zero}
+        for model, tokens in after.items()
+    }
+
+
+async def _retrieve_ahead(jobs: list[dict], queue: asyncio.Queue, workers: int) -> None:
+    from meal_prep_agent.agents.tools import retrieve_recipes_many
+
+    for start in range(0, len(jobs), QUERY_BATCH_MAX_SIZE):
+        chunk = jobs[start:start + QUERY_BATCH_MAX_SIZE]
+        for n in {job["n_recipes"] for job in chunk}:
+            queries = [job["query"] for job in chunk if job["n_recipes"] == n]
+            try:
+                results = await retrieve_recipes_many(queries, n)
+            except Exception as exc:
+                # The pipeline retrieves for itself when `retrieved` is None
+                print(f"!! Batched retrieval failed ({type(exc).__name__}: {exc}), retrieving per request")
+                continue
+            for job in chunk:
+                if job["n_recipes"] == n:
+                    job["retrieved"] = results[job["query"]]
+        for job in chunk:
+            await queue.put(job)   # blocks while the queue is full
+    for _ in range(workers):
+        await queue.put(None)
+
+
+async def _run_job(job: dict, mode: str, use_cache: bool) -> dict:
+    from meal_prep_agent.agents.events import StageOutput
+    from meal_prep_agent.agents.orchestrator import run_pipeline
+
+    frames = {}
+    async for event in run_pipeline(job["query"], job["n_recipes"], mode=mode, stream=False,
+                                    use_cache=use_cache, retrieved=job.get("retrieved")):
+        if isinstance(event, StageOutput):
+            frames[event.role] = event.content
+    timings = json.loads(frames.pop("TIMINGS", "{}"))
+    return {"final": frames.get("FINAL"), "frames": frames, "timings": timings}
+
+
+async def run_batch(requests: list[dict], out_path, mode: str = PIPELINE_MODE, workers: int = BATCH_WORKERS,
+                    queue_size: int = BATCH_QUEUE_SIZE, timeout: float = BATCH_REQUEST_TIMEOUT_SECONDS,
+                    use_cache: bool = RESPONSE_CACHE_ENABLED) -> dict:
+    """
+    Run the pipeline for every request not already answered in `out_path`, appending
+    one JSON record per request: id, query, n_recipes, status ("ok", "timeout" or
+    "error"), final, frames, timings, seconds, error and `shared` (how many requests
+    the run answered).
+
+    Returns the summary printed by `main`.
+    """
+    from meal_prep_agent.agents.model_client import llm_cache_stats, usage_by_model
+
+    done = completed_ids(out_path)
+    jobs = {}   # key -> job, in first-seen order
+    for request in requests:
+        if request["id"] in done:
+            continue
+        key = request_key(request["query"], request["n_recipes"], mode)
+        job = jobs.setdefault(key, {"key": key, "query": request["query"],
+                                    "n_recipes": request["n_recipes"], "requests": []})
+        job["requests"].append(request)
+    jobs = list(jobs.values())
+    pending = sum(len(job["requests"]) for job in jobs)
+    print(f"++ {len(requests)} requests: {len(requests) - pending} already done, "
+          f"{pending} to run as {len(jobs)} unique pipeline runs")
+
+    counts = {"ok": 0, "timeout": 0, "error": 0}
+    latencies = []
+    usage_before = usage_by_model()
+    start = time.perf_counter()
+
+    Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(out_path, "a+b") as tail:
+        # A crash mid-write leaves a partial last line - end it so the next record starts cleanly
+        if tail.tell() and (tail.seek(-1, os.SEEK_END), tail.read(1))[1] != b"\n":
+            tail.write(b"\n")
+
+    with open(out_path, "a", encoding="utf-8") as out:
+
+        def write(job: dict, result: dict) -> None:
+            # Called from the event loop only, so lines never interleave
+            for request in job["requests"]:
+                record = dict(request, **result, shared=len(job["requests"]))
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                counts[result["status"]] += 1
+            out.flush()
+            os.fsync(out.fileno())
+
+        async def worker(queue: asyncio.Queue) -> None:
+            while (job := await queue.get()) is not None:
+                run_start = time.perf_counter()
+                result = {"status": "ok", "final": None, "frames": {}, "timings": {}, "error": None}
+                try:
+                    result.update(await asyncio.wait_for(_run_job(job, mode, use_cache), timeout))
+                except asyncio.TimeoutError:
+                    result.update(status="timeout", error=f"no result after {timeout}s")
+                except Exception as exc:
+                    result.update(status="error", error=f"{type(exc).__name__}: {exc}")
+                result["seconds"] = round(time.perf_counter() - run_start, 3)
+                latencies.append(result["seconds"])
+
+                write(job, result)
+                print(f"[{sum(counts.values())}/{pending}] {result['status']:<7} {result['seconds']:>7.1f}s  "
+                      f"{job['query'][:60]}")
+
+        queue = asyncio.Queue(maxsize=queue_size)
+        await asyncio.gather(
+            _retrieve_ahead(jobs, queue, workers),
+            *(worker(queue) for _ in range(workers)),
+        )
+
+    wall = time.perf_counter() - start
+    usage = _usage_delta(usage_before, usage_by_model())
+    cost = request_cost(usage)
+    answered = sum(counts.values())
+    return {
+        **counts,
+        "skipped": len(requests) - pending,
+        "pipeline_runs": len(jobs),
+        "wall_seconds": round(wall, 1),
+        "requests_per_minute": round(counts["ok"] / wall * 60, 2) if wall else None,
+        "p50_seconds": round(float(np.percentile(latencies, 50)), 2) if latencies else None,
+        "p95_seconds": round(float(np.percentile(latencies, 95)), 2) if latencies else None,
+        "tokens": usage,
+        "cost_usd": round(cost, 4),
+        "cost_per_request_usd": round(cost / answered, 6) if answered else None,
+        "llm_cache": llm_cache_stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the meal-prep pipeline for a JSONL file of requests")
+    parser.add_argument("requests", help='JSONL, one {"id", "query", "n_recipes"} per line')
+    parser.add_argument("--out", default="plans.jsonl", help="JSONL results file (appended to, and resumed from)")
+    parser.add_argument("--n-recipes", type=int, default=5, help="recipes per request unless the request sets it")
+    parser.add_argument("--mode", choices=["serial", "speculative"], default=PIPELINE_MODE)
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="pipeline runs at once")
+    parser.add_argument("--queue-size", type=int, default=BATCH_QUEUE_SIZE,
+                        help="requests retrieved ahead of the workers")
+    parser.add_argument("--timeout", type=float, default=BATCH_REQUEST_TIMEOUT_SECONDS,
+                        help="seconds before a request is abandoned")
+    parser.add_argument("--cache", action=argparse.BooleanOptionalAction, default=RESPONSE_CACHE_ENABLED,
+                        help="replay and store answers in the pipeline response cache")
+    args = parser.parse_args()
+
+    async def run():
+        from meal_prep_agent.http_pool import aclose_async_http_client
+
+        try:
+            return await run_batch(
+                read_requests(args.requests, args.n_recipes),
+                args.out,
+                mode=args.mode,
+                workers=args.workers,
+                queue_size=args.queue_size,
+                timeout=args.timeout,
+                use_cache=args.cache,
+            )
+        finally:
+            await aclose_async_http_client()
+
+    summary = asyncio.run(run())
+    print("---")
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# batching.py
+"""
+Token-aware batching for embedding requests.
+
+Instead of slicing a fixed number of rows, requests are packed as close to the
+embedding endpoint's per-request token limit as possible (and never above its
+per-request input count), so ingest uses fewer, fuller requests.
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+
+from meal_prep_agent.config import (
+    EMBEDDING_MODEL,
+    EMBEDDING_REQUEST_TOKEN_LIMIT,
+    EMBEDDING_INPUT_TOKEN_LIMIT,
+    EMBEDDING_MAX_INPUTS_PER_REQUEST,
+)
+from meal_prep_agent.models.embedding_function import is_local_model
+
+try:
+    import tiktoken
+except ImportError:  # optional - fall back to a character based estimate
+    tiktoken = None
+
+# Leave headroom for estimation error; the char estimate is much rougher than tiktoken
+TIKTOKEN_SAFETY = 0.95
+ESTIMATE_SAFETY = 0.75
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    # None (cached like a hit) means "estimate from characters": tiktoken is missing, the
+    # backend is local (no OpenAI tokenizer involved), or the encoding can't be loaded -
+    # tiktoken downloads it on first use, which fails offline
+    if tiktoken is None or is_local_model(model):
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as exc:
+        print(f"WARNING: tiktoken encoding unavailable ({type(exc).__name__}), estimating tokens from characters")
+        return None
+
+
+def count_tokens(text: str, model: str = EMBEDDING_MODEL) -> int:
+    """
+    Local token count for `text` - exact with tiktoken, ~4 chars/token otherwise.
+    """
+    encoding = _encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4)
+
+
+def default_token_budget(model: str = EMBEDDING_MODEL) -> int:
+    safety = TIKTOKEN_SAFETY if _encoding(model) is not None else ESTIMATE_SAFETY
+    return int(EMBEDDING_REQUEST_TOKEN_LIMIT * safety)
+
+
+@dataclass
+class BatchStats:
+    batch_idx: int
+    size: int
+    tokens: int
+    seconds: float = 0.0
+
+
+def token_batches(docs: list[str], max_tokens: int = None,
+                  max_items: int = EMBEDDING_MAX_INPUTS_PER_REQUEST):
+    """
+    Greedily pack `docs` (in order) into batches under `max_tokens` and `max_items`.
+
+    Yields (start, end, n_tokens) so callers can slice any parallel lists
+    (ids, metadatas) the same way.
+    """
+    if max_tokens is None:
+        max_tokens = default_token_budget()
+
+    start = 0
+    batch_tokens = 0
+    for i, doc in enumerate(docs):
+        n_tokens = count_tokens(doc)
+        if n_tokens > EMBEDDING_INPUT_TOKEN_LIMIT:
+            print(f"WARNING: doc {i} has ~{n_tokens} tokens, above the per-input limit of {EMBEDDING_INPUT_TOKEN_LIMIT}")
+
+        # Close the current batch if this doc would overflow it
+        if i > start and (batch_tokens + n_tokens > max_tokens or i - start >= max_items):
+            yield start, i, batch_tokens
+            start = i
+            batch_tokens = 0
+
+        batch_tokens += n_tokens
+
+    if start < len(docs):
+        yield start, len(docs), batch_tokens
+
+
+def summarise_batch_stats(stats: list[BatchStats]) -> str:
+    if not stats:
+        return "No batches sent"
+
+    sizes = [s.size for s in stats]
+    tokens = [s.tokens for s in stats]
+    seconds = [s.seconds for s in stats]
+
+    return (
+        f"{len(stats)} batches | "
+        f"size min/avg/max {min(sizes)}/{sum(sizes) / len(stats):.0f}/{max(sizes)} | "
+        f"tokens min/avg/max {min(tokens)}/{sum(tokens) / len(stats):.0f}/{max(tokens)} | "
+        f"latency min/avg/max {min(seconds):.2f}/{sum(seconds) / len(stats):.2f}/{max(seconds):.2f}s"
+    )
@@ -11,19 +11,121 @@ BASE_DIR = CURRENT_FILE.parents[2]
 # data paths
 RAW_DATA_PATH = BASE_DIR / "data" / "raw" / "13k-recipes.csv"
 PROCESSED_DATA_PATH = BASE_DIR / "data" / "processed" / "recipes_clean.csv"
+PROCESSED_ARROW_PATH = BASE_DIR / "data" / "processed" / "recipes_clean.arrow"
 
 # Vectorstore path
 VECTORSTORE_PATH = BASE_DIR / "vectorstore"
+CHROMA_DB_NAME = "chroma_db_rag_recipes"
+COLLECTION_NAME = "rag_recipes"
 
-# Embedding Model
+# Embedding Model: an OpenAI model name, "local:<sentence-transformers model>"
+# (e.g. "local:all-MiniLM-L6-v2", CPU inference) or "hashing" (deterministic, for tests/offline).
+# Changing it needs `embed.py --rebuild`
 EMBEDDING_MODEL = "text-embedding-3-small"
 
+# Local embedding backend
+LOCAL_EMBEDDING_BATCH_SIZE = 64
+LOCAL_EMBEDDING_THREADS = 4
+LOCAL_EMBEDDING_BACKEND = "torch"   # or "onnx"
+
+# Embeddings endpoint limits (used to pack ingest batches by token count)
+EMBEDDING_REQUEST_TOKEN_LIMIT = 300_000
+EMBEDDING_INPUT_TOKEN_LIMIT = 8191
+EMBEDDING_MAX_INPUTS_PER_REQUEST = 2048
+
+# Ingest embedding concurrency + rate limits (per minute)
+EMBEDDING_MAX_IN_FLIGHT = 8
+EMBEDDING_REQUESTS_PER_MINUTE = 3000
+EMBEDDING_TOKENS_PER_MINUTE = 1_000_000
+
+# Query embedding cache (in-memory LRU + optional on-disk tier, set path to None to disable)
+EMBEDDING_CACHE_SIZE = 4096
+EMBEDDING_CACHE_PATH = VECTORSTORE_PATH / "embedding_cache.sqlite"
+EMBEDDING_CACHE_DISK_SIZE = 50_000   # rows kept on disk, oldest evicted first (~6 KB each at 1536 dims)
+
+# Retrieval mode: "dense" (chroma only), "hybrid" (BM25 + chroma, fused) or "lexical" (BM25 only)
+RETRIEVAL_MODE = "hybrid"
+# Hybrid falls back to lexical-only results if the dense search times out or can't connect (other
+# errors are raised), or takes longer than this many seconds - None waits, running the search
+# inline, so a cold start (model load, first connection) isn't mistaken for an outage. A search
+# past the limit still finishes in its worker thread
+DENSE_TIMEOUT_SECONDS = None
+
+# Dense search backend: "chroma", or "matrix" (memory-mapped embedding matrix exported by embed.py)
+RETRIEVER_BACKEND = "chroma"
+# Stored row format: "float32", "float16", "int8" or "binary" (sign bits + float rescoring).
+# Compact formats cut disk and page cache but exact scoring pays a per-query dequantise; pair them with IVF
+MATRIX_QUANTIZATION = "float32"
+MATRIX_DIMENSIONS = None    # Matryoshka truncation, e.g. 512 of text-embedding-3-small's 1536 (None = full)
+MATRIX_IVF_LISTS = 0        # > 0 builds an IVF index with this many clusters at embed time
+MATRIX_NPROBE = None        # clusters scored per query when an IVF index exists (None = exact)
+
+# Concurrent single-query retrievals arriving within this window share one batched lookup
+QUERY_BATCH_WINDOW_SECONDS = 0.01
+QUERY_BATCH_MAX_SIZE = 32
+
+# Shared HTTP connection pool for every OpenAI call (agents, retriever, embed.py)
+HTTP_MAX_CONNECTIONS = 20
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 10
+HTTP_KEEPALIVE_EXPIRY_SECONDS = 30
+HTTP_CONNECT_TIMEOUT_SECONDS = 5
+HTTP_TIMEOUT_SECONDS = 60   # read / write / waiting for a pooled connection
+HTTP_CHAT_TIMEOUT_SECONDS = 600   # the same for chat completions - long streamed / revision replies
+HTTP2 = True                # only when `h2` is installed (pip install meal_prep_agent[http2])
+
 # Agent Model
 AGENT_MODEL = 'gpt-4o-mini'
 
+# LLM completion cache shared by the agents: keyed by model + messages + tools, concurrent
+# identical prompts share one request. The SQLite file lets a recorded run replay offline.
+# Off by default - a hit replays an earlier completion however old it is
+LLM_CACHE_ENABLED = False
+LLM_CACHE_SIZE = 1024
+LLM_CACHE_PATH = VECTORSTORE_PATH / "llm_cache.sqlite"
+
+# Orchestrator: "serial" (researcher -> writer -> critic -> revise) or "speculative"
+# (researcher skipped for plain ingredient lists, critic cancelled when grounding checks pass).
+# Speculative is opt-in
+PIPELINE_MODE = "serial"
+
+# Pipeline response cache: keyed by query + n_recipes + mode + retrieved recipe ids, invalidated
+# on re-index. Off by default - a hit replays an earlier answer (labelled CACHED RESPONSE)
+RESPONSE_CACHE_ENABLED = False
+RESPONSE_CACHE_SIZE = 512
+RESPONSE_CACHE_TTL_SECONDS = 24 * 3600
+RESPONSE_CACHE_SIMILARITY = 0.95    # cosine threshold for near-duplicate queries (None = exact matches only)
+RESPONSE_CACHE_PATH = VECTORSTORE_PATH / "response_cache.sqlite"
+
+# Batch mode (`batch_pipeline.py`): pipeline runs in parallel, requests retrieved ahead of the
+# workers (the queue blocks retrieval when they fall behind) and the per-request time limit
+BATCH_WORKERS = 4
+BATCH_QUEUE_SIZE = 16
+BATCH_REQUEST_TIMEOUT_SECONDS = 300
+
+# USD per 1M (prompt, completion) tokens, for the batch cost report
+MODEL_PRICES_PER_1M_TOKENS = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+}
+
+# Tracing (`tracing.py`), off by default: "jsonl" appends spans to TRACE_PATH, "console" prints
+# them to stderr, "otel" sends them through the OpenTelemetry API (pip install meal_prep_agent[tracing])
+TRACE_EXPORTER = None
+TRACE_PATH = BASE_DIR / "traces" / "spans.jsonl"
+# The JSONL file moves to TRACE_PATH.1 (replacing the previous one) once it grows past this
+TRACE_MAX_BYTES = 50 * 1024 * 1024
+# Put the user's query text on spans; otherwise only its length and a short hash are recorded
+TRACE_QUERY_TEXT = False
+
 # Load .env once, at ocnfig import time
 load_dotenv()
 
+# Checked when an OpenAI client is built (`require_api_key`), not at import, so local
+# backends, scripts and the app's startup don't need it
 API_KEY = os.getenv("OPENAI_API_KEY")
-if not API_KEY:
-    raise ValueError("OPENAI_API_KEY not found in environment variables.")
\ No newline at end of file
+
+
+def require_api_key() -> str:
+    if not API_KEY:
+        raise ValueError("OPENAI_API_KEY not found in environment variables.")
+    return API_KEY
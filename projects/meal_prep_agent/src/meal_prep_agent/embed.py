@@ -1,17 +1,47 @@
 # embed.py
+import argparse
+import asyncio
 import pandas as pd
 import chromadb
 import time
-import ast
 import json
 
 from chromadb.config import Settings
 from chromadb.api.models import Collection
-from openai import OpenAI
+from openai import AsyncOpenAI
 
-from meal_prep_agent.config import PROCESSED_DATA_PATH, VECTORSTORE_PATH, EMBEDDING_MODEL, API_KEY
-from meal_prep_agent.models.openai_embedding import OpenAIEmbeddingFunction
+from meal_prep_agent.config import (
+    PROCESSED_DATA_PATH,
+    VECTORSTORE_PATH,
+    EMBEDDING_MODEL,
+    EMBEDDING_MAX_IN_FLIGHT,
+    EMBEDDING_REQUESTS_PER_MINUTE,
+    EMBEDDING_TOKENS_PER_MINUTE,
+    MATRIX_QUANTIZATION,
+    MATRIX_DIMENSIONS,
+    MATRIX_IVF_LISTS,
+    MATRIX_NPROBE,
+    require_api_key,
+)
+from meal_prep_agent.http_pool import get_async_http_client, aclose_async_http_client, http_pool_stats
+from meal_prep_agent.models.embedding_function import create_embedding_function, is_local_model
+from meal_prep_agent.async_embed import RateLimiter, embed_and_store, openai_embed_batch, local_embed_batch
+from meal_prep_agent.batching import BatchStats, count_tokens, token_batches, summarise_batch_stats
+from meal_prep_agent.index_manifest import IndexManifest, MANIFEST_FILENAME, recipe_id
+from meal_prep_agent.stream_ingest import build_doc_series, build_metadata_list, CHUNK_SIZE
+from meal_prep_agent.processed_store import read_processed, iter_processed_chunks
+from meal_prep_agent.ingredient_index import IngredientIndexBuilder
+from meal_prep_agent.lexical_index import LexicalIndexBuilder
+from meal_prep_agent.matrix_index import (
+    MatrixIndex,
+    QUANTIZATIONS,
+    collection_vectors,
+    write_matrix,
+    recall_at_k,
+    MATRIX_FILENAME,
+)
 
+# Fixed rows per batch for `--batch-size`; by default batches are packed by token count
 EMBEDDING_BATCH_SIZE = 200
      
 def create_vectorstore(store_path):
@@ -25,16 +55,10 @@ def create_vectorstore(store_path):
     return client
 
 
-def load_clean_data(csv_path: str):
-    print("++ Load Clean CSV")
-    df = pd.read_csv(csv_path)
-
-    # Convert list-looking string back into real lists
-    df["ingredients"] = df["ingredients"].apply(
-        lambda x: ast.literal_eval(x) if isinstance(x, str) else x
-    )
-
-    return df
+def load_clean_data(csv_path: str = PROCESSED_DATA_PATH):
+    # Prefers the memory-mapped Arrow file (ingredients already lists), falls back to CSV
+    print("++ Load Clean Data")
+    return read_processed(csv_path=csv_path)
 
 def apply_doc_format(row:dict) -> str:
     title = row['title'].lower()
@@ -46,7 +70,7 @@ def apply_doc_format(row:dict) -> str:
 
 def generate_doc_col(df):
     print("++ Apply doc column format")
-    df['doc'] = df.apply(apply_doc_format, axis=1)
+    df['doc'] = build_doc_series(df['title'], df['ingredients'])   # vectorised `apply_doc_format`
     df.head(5)
 
     return df
@@ -60,56 +84,198 @@ def apply_metadata_col(row: dict) -> dict:
 
 def generate_metadata_col(df):
     print("++ Apply metadata column")
-    df['metadata'] = df.apply(apply_metadata_col, axis=1)
+    df['metadata'] = build_metadata_list(df['title'], df['ingredients'])   # same as `apply_metadata_col`
     df.head(5)
 
     return df
 
+def generate_id_col(df):
+    print("++ Apply content-hash id column")
+    df['id'] = [recipe_id(t, i) for t, i in zip(df['title'], df['ingredients'])]
+
+    # Identical recipes hash to the same id - keep one
+    before = len(df)
+    df = df.drop_duplicates(subset='id').reset_index(drop=True)
+    if len(df) < before:
+        print(f"Dropped {before - len(df)} duplicate recipes")
+
+    return df
+
+def load_indexed_ids(collection: Collection, manifest: IndexManifest) -> set:
+    """
+    Snapshot of the IDs already indexed, from the manifest checkpoint.
+    """
+    if not manifest.exists:
+        # No checkpoint yet (first run, or a store built before manifests) - ask chroma
+        manifest.ids = set(collection.get(include=[])['ids'])
+
+    return set(manifest.ids)
+
+def delete_stale(collection: Collection, stale_ids: list, manifest: IndexManifest, batch_size: int = 5000):
+    print(f"++ Delete {len(stale_ids)} recipes no longer in the dataset")
+    for ids_batch in batch(stale_ids, batch_size):
+        collection.delete(ids=ids_batch)
+        manifest.mark_deleted(ids_batch)
+
 # Batch helper function
 def batch(iterable, batch_size): 
     for i in range(0, len(iterable), batch_size): 
         yield iterable[i:i + batch_size]
 
-def generate_openai_embeddings(df: pd.DataFrame, batch_size: int, collection:Collection):
-    # Add documents to chroma in batches
-    print("++ Generate embedding and add to Chroma DB")
-    
-    # Convert elements to embed into lists
+def make_batches(df: pd.DataFrame, batch_size: int = None) -> list:
+    """
+    Split the doc/id/metadata columns into (docs, ids, metadatas, n_tokens) batches.
+
+    With `batch_size=None` batches are packed by token count up to the embedding
+    request limit; otherwise a fixed number of rows is used per batch.
+    """
     docs = df['doc'].tolist()
     ids = df['id'].tolist()
     metas = df['metadata'].tolist()
+
+    if batch_size:
+        slices = [
+            (i, min(i + batch_size, len(docs)), sum(count_tokens(d) for d in docs[i:i + batch_size]))
+            for i in range(0, len(docs), batch_size)
+        ]
+    else:
+        slices = token_batches(docs)
+
+    return [
+        (docs[start:end], ids[start:end], metas[start:end], n_tokens)
+        for start, end, n_tokens in slices
+    ]
+
+def generate_openai_embeddings(df: pd.DataFrame, batch_size: int, collection:Collection, on_commit=None):
+    # Add documents to chroma in batches
+    print("++ Generate embedding and add to Chroma DB")
     
-    # Stats - get total df length to calculate total batches
-    total = len(df)
-    num_batches = (total // batch_size) + 1
+    # NOTE: Executed this way, as can't send whole df elements in one api call (limit on tokens)
+    batches = make_batches(df, batch_size)
+    num_batches = len(batches)
+    stats = []
 
     # For each batch, send to openai to embed
-    # NOTE: Executed this way, as can't send whole df elements in one api call (limit on tokens)
-    for batch_idx, (docs_batch, ids_batch, meta_batch) in enumerate(
-        zip(
-            batch(docs, batch_size),
-            batch(ids, batch_size),
-            batch(metas, batch_size),
-        )
-    ):
+    for batch_idx, (docs_batch, ids_batch, meta_batch, n_tokens) in enumerate(batches):
         # Add to chroma collection
         start = time.time()
-        collection.add(
+        collection.upsert(
             documents=docs_batch,
             ids=ids_batch,
             metadatas=meta_batch        
         )
-        print(f"Embedding Batch {batch_idx + 1}/{num_batches} took {time.time() - start:.2f}s")
+        if on_commit is not None:
+            on_commit(ids_batch)
+        stats.append(BatchStats(batch_idx, len(docs_batch), n_tokens, time.time() - start))
+        print(f"Embedding Batch {batch_idx + 1}/{num_batches} ({len(docs_batch)} docs, {n_tokens} tokens) took {stats[-1].seconds:.2f}s")
     
     print(f"Completed embedding {len(df)} recipes across {num_batches} batches")
+    print(summarise_batch_stats(stats))
+
+def generate_openai_embeddings_async(
+    df: pd.DataFrame,
+    batch_size: int,
+    collection: Collection,
+    max_in_flight: int = EMBEDDING_MAX_IN_FLIGHT,
+    requests_per_minute: int = EMBEDDING_REQUESTS_PER_MINUTE,
+    tokens_per_minute: int = EMBEDDING_TOKENS_PER_MINUTE,
+    on_commit=None,
+    embedding_fn=None,
+):
+    # Same batches as `generate_openai_embeddings`, but embedded concurrently and
+    # written to chroma as precomputed vectors
+    print(f"++ Generate embeddings concurrently ({max_in_flight} in flight) and add to Chroma DB")
+
+    batches = make_batches(df, batch_size)
+
+    async def _run():
+        if embedding_fn is not None and is_local_model(EMBEDDING_MODEL):
+            # Local CPU backend - no API, so no rate limits; threads bound by max_in_flight
+            return await embed_and_store(
+                batches,
+                embed_batch=local_embed_batch(embedding_fn),
+                collection=collection,
+                max_in_flight=max_in_flight,
+                on_commit=on_commit,
+            )
+
+        # Retries are handled by the engine (with jitter), not the client
+        async_client = AsyncOpenAI(api_key=require_api_key(), max_retries=0, http_client=get_async_http_client())
+        try:
+            return await embed_and_store(
+                batches,
+                embed_batch=openai_embed_batch(async_client, EMBEDDING_MODEL),
+                collection=collection,
+                max_in_flight=max_in_flight,
+                limiter=RateLimiter(requests_per_minute, tokens_per_minute),
+                on_commit=on_commit,
+            )
+        finally:
+            # Closes this loop's connections in the shared async pool, before the loop ends
+            await aclose_async_http_client()
+
+    start = time.time()
+    stats = asyncio.run(_run())
+    print(f"Completed embedding {len(df)} recipes across {len(batches)} batches in {time.time() - start:.2f}s")
+    print(summarise_batch_stats(stats))
+    print(f"HTTP pool: {json.dumps(http_pool_stats())}")
+
+def matrix_format_changed(collection, quantization: str, dimensions: int) -> bool:
+    if not (VECTORSTORE_PATH / MATRIX_FILENAME).exists():
+        return True
+    current = MatrixIndex.load(VECTORSTORE_PATH)
+    if not dimensions:
+        # Full width requested - compare against the stored embeddings' width
+        sample = collection.get(limit=1, include=["embeddings"])["embeddings"]
+        dimensions = len(sample[0]) if len(sample) else current.dimensions
+    return current.quantization != quantization or current.dimensions != dimensions
+
+def export_embedding_matrix(collection, quantization: str, dimensions: int = None):
+    ids, titles, ingredients, vectors = collection_vectors(collection)
+    matrix_path = write_matrix(VECTORSTORE_PATH, ids, titles, ingredients, vectors, quantization, dimensions)
+    index = MatrixIndex.load(VECTORSTORE_PATH)
+    size_mb = matrix_path.stat().st_size / 1e6
+    print(f"++ Exported {quantization} embedding matrix ({index.dimensions} dims, {size_mb:.1f} MB) to `{matrix_path}`")
+
+    if MATRIX_IVF_LISTS:
+        ivf_path = index.build_ivf(VECTORSTORE_PATH, n_lists=MATRIX_IVF_LISTS)
+        if ivf_path is not None:
+            print(f"++ Built IVF index ({len(index.ivf['centroids'])} lists) at `{ivf_path}`")
+
+    # Compact formats lose some ranking precision - report how much against the float32 vectors
+    if len(vectors) and (quantization != "float32" or dimensions):
+        recall = recall_at_k(vectors, index, k=10, nprobe=MATRIX_NPROBE)
+        print(f"++ recall@10 vs full-precision search: {recall:.3f}")
 
 def main():
+    parser = argparse.ArgumentParser(description="Embed the processed recipes into Chroma")
+    parser.add_argument("--sequential", action="store_true", help="embed one batch at a time")
+    parser.add_argument("--max-in-flight", type=int, default=EMBEDDING_MAX_IN_FLIGHT)
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help=f"fixed rows per batch (e.g. {EMBEDDING_BATCH_SIZE}) instead of token packing")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="drop the collection and re-embed everything instead of indexing incrementally")
+    parser.add_argument("--stream", action="store_true",
+                        help="read and preprocess the CSV in chunks instead of loading the full frame")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--quantization", choices=QUANTIZATIONS, default=MATRIX_QUANTIZATION,
+                        help="row format of the exported embedding matrix")
+    parser.add_argument("--dimensions", type=int, default=MATRIX_DIMENSIONS,
+                        help="truncate exported embeddings to their first N dimensions (Matryoshka)")
+    args = parser.parse_args()
+
     # Create Vectorestore
     chroma_client = create_vectorstore(VECTORSTORE_PATH)
+    manifest_path = VECTORSTORE_PATH / MANIFEST_FILENAME
+    if args.rebuild:
+        print("++ Rebuild: drop existing collection and manifest")
+        if "rag_recipes" in [c.name for c in chroma_client.list_collections()]:
+            chroma_client.delete_collection("rag_recipes")
+        manifest_path.unlink(missing_ok=True)
 
-    # Create embedding function
-    openai_client = OpenAI(api_key=API_KEY)
-    embedding_fn = OpenAIEmbeddingFunction(openai_client, EMBEDDING_MODEL)
+    # Create embedding function - OpenAI or a local backend, per `config.EMBEDDING_MODEL`
+    embedding_fn = create_embedding_function(EMBEDDING_MODEL)
+    print(f"++ Embedding with `{embedding_fn.name()}`")
 
     # Create chroma collection
     collection = chroma_client.get_or_create_collection(
@@ -118,21 +284,80 @@ def main():
         metadata={"hnsw:space": "cosine"}   # Use cosine as standard metric for semantic embeddings
     )
 
-    # Load clean CSV
-    df = load_clean_data(PROCESSED_DATA_PATH)
+    # Load clean data - whole frame, or chunk by chunk with --stream
+    if args.stream:
+        frames = iter_processed_chunks(args.chunksize)
+    else:
+        df = load_clean_data(PROCESSED_DATA_PATH)
     
-    # Add additional columns
-    df = generate_doc_col(df)
-    df = generate_metadata_col(df)
-    df['id'] = df.index.astype(str)     # create unique IDs column     
+        # Add additional columns
+        df = generate_doc_col(df)
+        df = generate_metadata_col(df)
+        df = generate_id_col(df)     # create stable content-hash IDs column
+        frames = [df]
 
-    # Add documents to chroma in batches
-    generate_openai_embeddings(df=df, batch_size=EMBEDDING_BATCH_SIZE, collection=collection)
+    # Work out what changed since the last (possibly interrupted) run
+    manifest = IndexManifest.load(VECTORSTORE_PATH, EMBEDDING_MODEL)
+    indexed_ids = load_indexed_ids(collection, manifest)
+    seen_ids = set()
+    total_rows = 0
+    total_new = 0
+    index_builder = IngredientIndexBuilder()   # covers every current row, not just new ones
+    lexical_builder = LexicalIndexBuilder()
+
+    for df in frames:
+        total_rows += len(df)
+        seen_ids.update(df['id'])
+        index_builder.add(df['id'].tolist(), df['ingredients'].tolist())
+        lexical_builder.add(df['id'].tolist(), df['doc'].tolist(), df['metadata'].tolist())
+        df_new = df[~df['id'].isin(indexed_ids)]
+        total_new += len(df_new)
+        if not len(df_new):
+            continue
+
+        # Add documents to chroma in batches, checkpointing the manifest after each one
+        if args.sequential:
+            generate_openai_embeddings(df=df_new, batch_size=args.batch_size, collection=collection,
+                                       on_commit=manifest.mark_indexed)
+        else:
+            generate_openai_embeddings_async(
+                df=df_new,
+                batch_size=args.batch_size,
+                collection=collection,
+                max_in_flight=args.max_in_flight,
+                on_commit=manifest.mark_indexed,
+                embedding_fn=embedding_fn,
+            )
+
+    # Rows that vanished from the dataset (or changed, and so got a new content hash)
+    stale_ids = sorted(indexed_ids - seen_ids)
+    if stale_ids:
+        delete_stale(collection, stale_ids, manifest)
+
+    print(f"++ Incremental run: {total_new} embedded, {len(stale_ids)} deleted, "
+          f"{total_rows - total_new} unchanged")
+    if total_new or stale_ids:
+        manifest.bump_version()
+
+    # Local indexes are cheap to rebuild, so always write them from the full dataset
+    index_path = index_builder.build().save(VECTORSTORE_PATH)
+    print(f"++ Saved inverted ingredient index to `{index_path}`")
+    lexical_path = lexical_builder.build().save(VECTORSTORE_PATH)
+    print(f"++ Saved BM25 lexical index to `{lexical_path}`")
+
+    # Embedding matrix for the in-process search backend - re-exported when the index or format changed
+    if total_new or stale_ids or matrix_format_changed(collection, args.quantization, args.dimensions):
+        export_embedding_matrix(collection, args.quantization, args.dimensions)
 
     # Sanity Check stats
     print("---")
-    print(f"Ingested receipe dataframe rows: {len(df)}")
+    print(f"Ingested receipe dataframe rows: {total_rows}")
     print(f"Total embeddings stored: {collection.count()}")
+    print(f"Index version: {manifest.version}")
+    if not total_new:
+        # Nothing changed - skip the sample query so an unchanged re-run makes zero embedding calls
+        return
+
     sample = collection.query(
         query_texts = ["strawberry"],
         n_results=1
@@ -0,0 +1,244 @@
+# http_pool.py
+"""
+Process-wide HTTP connection pools for the OpenAI clients.
+
+Every OpenAI client in the package - the agents' chat client, the retriever's
+query embeddings and `embed.py`'s ingest client - is built on one of two shared
+keep-alive pools (sync and async) instead of its own, so connections and TLS
+sessions are reused across agents and stages. Limits and timeouts come from
+`config` (HTTP_*); chat completions use the longer `chat_timeout()`. HTTP/2 is
+used when `h2` is installed.
+
+The async client keeps one connection pool per event loop: connections belong to
+the loop that opened them, while the client - and the agents' model clients built
+on it - outlive loops (the Streamlit app runs every request in its own
+`asyncio.run`).
+
+`http_pool_stats()` reports requests, in-flight peak, new TCP connections and
+TLS handshakes per pool - `reuse_ratio` is the share of requests that rode an
+existing connection.
+"""
+import asyncio
+import threading
+import time
+import weakref
+
+import httpx
+from openai import DefaultHttpxClient, DefaultAsyncHttpxClient
+
+from meal_prep_agent.config import (
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    HTTP_CONNECT_TIMEOUT_SECONDS,
+    HTTP_TIMEOUT_SECONDS,
+    HTTP_CHAT_TIMEOUT_SECONDS,
+    HTTP2,
+)
+
+try:
+    import h2  # noqa: F401 - httpx needs it for http2=True
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+_lock = threading.Lock()
+_sync_client = None
+_async_client = None
+_async_transport = None   # the async client's `_LoopLocalAsyncTransport`
+_stats = {}   # "sync" / "async" -> counters
+
+
+def _new_stats() -> dict:
+    return {
+        "requests": 0,
+        "in_flight": 0,
+        "peak_in_flight": 0,
+        "connections_opened": 0,
+        "tls_handshakes": 0,
+        "errors": 0,
+        "request_seconds": 0.0,
+    }
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(HTTP_TIMEOUT_SECONDS, connect=HTTP_CONNECT_TIMEOUT_SECONDS)
+
+
+def chat_timeout() -> httpx.Timeout:
+    """
+    Timeout for chat completion clients on the async pool, e.g.
+    `OpenAIChatCompletionClient(timeout=chat_timeout(), ...)` - a long reply can take
+    minutes, well past the pool's `HTTP_TIMEOUT_SECONDS`.
+    """
+    return httpx.Timeout(HTTP_CHAT_TIMEOUT_SECONDS, connect=HTTP_CONNECT_TIMEOUT_SECONDS)
+
+
+def _on_trace(stats: dict, event: str) -> None:
+    # httpcore trace events, e.g. "connection.connect_tcp.complete" - the sync pool
+    # sends them from whichever thread makes the request
+    with _lock:
+        if event == "connection.connect_tcp.complete":
+            stats["connections_opened"] += 1
+        elif event == "connection.start_tls.complete":
+            stats["tls_handshakes"] += 1
+
+
+def _started(stats: dict) -> float:
+    with _lock:
+        stats["requests"] += 1
+        stats["in_flight"] += 1
+        stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+    return time.perf_counter()
+
+
+def _finished(stats: dict, start: float, failed: bool) -> None:
+    with _lock:
+        stats["in_flight"] -= 1
+        stats["request_seconds"] += time.perf_counter() - start   # until response headers
+        stats["errors"] += failed
+
+
+class _CountingTransport(httpx.BaseTransport):
+    def __init__(self, transport: httpx.BaseTransport, stats: dict):
+        self.transport = transport
+        self.stats = stats
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.extensions["trace"] = lambda event, info: _on_trace(self.stats, event)
+        start, failed = _started(self.stats), True
+        try:
+            response = self.transport.handle_request(request)
+            failed = response.status_code >= 400
+            return response
+        finally:
+            _finished(self.stats, start, failed)
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class _AsyncCountingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport: httpx.AsyncBaseTransport, stats: dict):
+        self.transport = transport
+        self.stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        async def trace(event, info):
+            _on_trace(self.stats, event)
+
+        request.extensions["trace"] = trace
+        start, failed = _started(self.stats), True
+        try:
+            response = await self.transport.handle_async_request(request)
+            failed = response.status_code >= 400
+            return response
+        finally:
+            _finished(self.stats, start, failed)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+class _LoopLocalAsyncTransport(httpx.AsyncBaseTransport):
+    # Routes each request to the running loop's own pool, opened on first use
+    def __init__(self, stats: dict):
+        self.stats = stats
+        self._transports = weakref.WeakKeyDictionary()   # event loop -> _AsyncCountingTransport
+
+    def _current(self) -> _AsyncCountingTransport:
+        loop = asyncio.get_running_loop()
+        with _lock:
+            transport = self._transports.get(loop)
+            if transport is None:
+                # Pools of loops that have ended can't be closed any more (their sockets are
+                # freed with them) - and their connections keep the loop alive, so drop them here
+                for old_loop in [old_loop for old_loop in self._transports if old_loop.is_closed()]:
+                    del self._transports[old_loop]
+                transport = _AsyncCountingTransport(
+                    httpx.AsyncHTTPTransport(limits=_limits(), http2=HTTP2 and HTTP2_AVAILABLE), self.stats
+                )
+                self._transports[loop] = transport
+        return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._current().handle_async_request(request)
+
+    async def aclose(self) -> None:
+        # Only the running loop's pool - other loops' connections can't be closed from here
+        with _lock:
+            transport = self._transports.pop(asyncio.get_running_loop(), None)
+        if transport is not None:
+            await transport.aclose()
+
+
+def get_http_client() -> httpx.Client:
+    """
+    Shared sync pool, e.g. for `OpenAI(http_client=...)`.
+    """
+    global _sync_client
+    if _sync_client is None:
+        with _lock:
+            if _sync_client is None:
+                transport = httpx.HTTPTransport(limits=_limits(), http2=HTTP2 and HTTP2_AVAILABLE)
+                _stats["sync"] = _new_stats()
+                _sync_client = DefaultHttpxClient(
+                    transport=_CountingTransport(transport, _stats["sync"]),
+                    timeout=_timeout(),
+                )
+    return _sync_client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    Shared async client, e.g. for `AsyncOpenAI(http_client=...)` and the agents'
+    `OpenAIChatCompletionClient`. Safe to use from any event loop - each loop gets
+    its own connection pool.
+    """
+    global _async_client, _async_transport
+    if _async_client is None:
+        with _lock:
+            if _async_client is None:
+                _stats["async"] = _new_stats()
+                _async_transport = _LoopLocalAsyncTransport(_stats["async"])
+                _async_client = DefaultAsyncHttpxClient(transport=_async_transport, timeout=_timeout())
+    return _async_client
+
+
+async def aclose_async_http_client() -> None:
+    """
+    Close the running event loop's connections in the async pool, e.g. at the end of
+    an `asyncio.run`. The client stays usable - clients built on it (the agents'
+    model clients) open a new pool on their next request.
+    """
+    if _async_transport is not None:
+        await _async_transport.aclose()
+
+
+def close_http_client() -> None:
+    global _sync_client
+    with _lock:
+        client, _sync_client = _sync_client, None
+    if client is not None:
+        client.close()
+
+
+def http_pool_stats() -> dict:
+    with _lock:
+        report = {}
+        for name, stats in _stats.items():
+            stats = dict(stats)
+            requests = stats["requests"]
+            stats["reuse_ratio"] = round(1 - stats["connections_opened"] / requests, 3) if requests else None
+            stats["mean_request_seconds"] = round(stats.pop("request_seconds") / requests, 3) if requests else None
+            report[name] = stats
+        report["http2"] = HTTP2 and HTTP2_AVAILABLE
+    return report
@@ -0,0 +1,86 @@
+# index_manifest.py
+"""
+Content-hash IDs and the checkpoint manifest used for incremental indexing.
+
+Every recipe gets a stable ID derived from its title + ingredients, so re-running
+`embed.py` only embeds rows whose content is new, and deletes rows that vanished
+from the dataset. The manifest is rewritten after every committed batch, which lets
+an interrupted run resume where it stopped.
+"""
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+MANIFEST_FILENAME = "index_manifest.json"
+
+
+def recipe_id(title: str, ingredients: list[str]) -> str:
+    """
+    Stable content hash for a recipe (case and surrounding whitespace are ignored).
+    """
+    content = json.dumps(
+        {
+            "title": title.strip().lower(),
+            "ingredients": [i.strip().lower() for i in ingredients],
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+class IndexManifest:
+    def __init__(self, path, embedding_model: str):
+        self.path = Path(path)
+        self.embedding_model = embedding_model
+        self.ids = set()
+        self.version = 0
+        self.exists = False
+
+    @classmethod
+    def load(cls, store_path, embedding_model: str) -> "IndexManifest":
+        manifest = cls(Path(store_path) / MANIFEST_FILENAME, embedding_model)
+        if not manifest.path.exists():
+            return manifest
+
+        data = json.loads(manifest.path.read_text())
+        if data["embedding_model"] != embedding_model:
+            raise ValueError(
+                f"Index was built with `{data['embedding_model']}`, not `{embedding_model}`. "
+                "Re-run embed.py with --rebuild."
+            )
+
+        manifest.ids = set(data["ids"])
+        manifest.version = data["version"]
+        manifest.exists = True
+        return manifest
+
+    def save(self) -> None:
+        data = {
+            "embedding_model": self.embedding_model,
+            "version": self.version,
+            "updated": time.time(),
+            "ids": sorted(self.ids),
+        }
+
+        # Write to a temp file and swap, so a crash never leaves a half-written manifest
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(data))
+        os.replace(tmp_path, self.path)
+        self.exists = True
+
+    def mark_indexed(self, ids: list[str]) -> None:
+        # Checkpoint - called after each batch has been written to chroma
+        self.ids.update(ids)
+        self.save()
+
+    def mark_deleted(self, ids: list[str]) -> None:
+        self.ids.difference_update(ids)
+        self.save()
+
+    def bump_version(self) -> None:
+        # Changes whenever the indexed content changes; consumers use it to invalidate caches
+        self.version += 1
+        self.save()
@@ -6,8 +6,10 @@ saving a cleaned CSV, adn converting rows into Pydantic Recipe models.
 import pandas as pd
 import ast
 
-from meal_prep_agent.config import RAW_DATA_PATH, PROCESSED_DATA_PATH
+from meal_prep_agent.config import RAW_DATA_PATH, PROCESSED_DATA_PATH, PROCESSED_ARROW_PATH
 from meal_prep_agent.models.pydantic_recipe import Recipe
+from meal_prep_agent.stream_ingest import parse_ingredient_series
+from meal_prep_agent.processed_store import write_processed
 
 # Load CSV
 def load_csv(input_path:str, keep_columns:list = []) -> pd.DataFrame:
@@ -31,7 +33,8 @@ def parse_ingredients(value):
 
 # Clean dataframe
 def clean_df(df:pd.DataFrame) -> pd.DataFrame:
-    df['ingredients'] = df['Cleaned_Ingredients'].apply(parse_ingredients)
+    # Vectorised equivalent of `.apply(parse_ingredients)`
+    df['ingredients'] = parse_ingredient_series(df['Cleaned_Ingredients']).set_axis(df.index)
     df.drop(columns='Cleaned_Ingredients', inplace=True)
     df.rename(columns={'Title': 'title'}, inplace=True)
 
@@ -61,9 +64,9 @@ def main():
     df = load_csv(RAW_DATA_PATH, keep_columns=['Title', 'Cleaned_Ingredients'])
     df = clean_df(df)
     
-    # export cleaned results to `data/processed`
-    print(f"++ Export cleaned results to: {PROCESSED_DATA_PATH}")
-    df.to_csv(PROCESSED_DATA_PATH, index=False)
+    # export cleaned results to `data/processed` (Arrow with native list column + CSV)
+    print(f"++ Export cleaned results to: {PROCESSED_ARROW_PATH} and {PROCESSED_DATA_PATH}")
+    write_processed(df)
 
     print("++ Create pydantic Recipe models++ ")
     recipes = create_pydantic_recipes(df)
@@ -0,0 +1,163 @@
+# ingredient_index.py
+"""
+Inverted ingredient index: normalised ingredient token -> posting list of recipes.
+
+Built once at embed time and saved next to the vectorstore, so the retriever can
+score ingredient overlap by intersecting posting lists instead of pulling and
+JSON-decoding every recipe's metadata from Chroma per query.
+
+Storage is CSR style: one sorted int32 `postings` array with `offsets` per token,
+plus the chroma `ids` each row number refers to (a `StringTable`, as is the vocab).
+"""
+import re
+from pathlib import Path
+
+import numpy as np
+
+from meal_prep_agent.string_table import StringTable
+
+INDEX_FILENAME = "ingredient_index.npz"
+
+# Quantities, units and preparation words that say nothing about *which* ingredient it is
+STOPWORDS = {
+    "a", "an", "and", "or", "of", "to", "for", "the", "with", "into", "in", "on", "at", "about",
+    "plus", "more", "as", "if", "such", "other", "optional", "divided", "taste", "serving",
+    "cup", "cups", "tablespoon", "tablespoons", "tbsp", "teaspoon", "teaspoons", "tsp",
+    "ounce", "ounces", "oz", "pound", "pounds", "lb", "lbs", "gram", "grams", "g", "kg",
+    "ml", "liter", "liters", "quart", "quarts", "pint", "pints", "pinch", "dash", "can", "cans",
+    "package", "packages", "stick", "sticks", "slice", "slices", "clove", "cloves", "bunch",
+    "large", "medium", "small", "whole", "fresh", "freshly", "finely", "coarsely", "thinly",
+    "chopped", "diced", "minced", "sliced", "grated", "peeled", "halved", "quartered",
+    "cut", "inch", "inches", "pieces", "piece", "room", "temperature", "ground", "plain",
+    "lightly", "very", "cold", "warm", "hot", "packed", "softened", "melted", "trimmed",
+    # words from free-text requests ("find recipes with chicken and broccoli")
+    "find", "recipe", "recipes", "want", "make", "using", "use", "have", "need", "some", "dish",
+}
+
+_WORD = re.compile(r"[a-z]+")
+_PARENTHETICAL = re.compile(r"\([^)]*\)")
+
+
+def singular(word: str) -> str:
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and word.endswith("oes"):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def ingredient_tokens(ingredient: str) -> set[str]:
+    """
+    "2 tablespoons fresh lemon juice" -> {"lemon", "juice"}
+    """
+    text = _PARENTHETICAL.sub(" ", ingredient.lower())
+    return {
+        singular(word) for word in _WORD.findall(text)
+        if len(word) > 1 and word not in STOPWORDS
+    }
+
+
+# Words that make a query a request the Researcher should interpret, not just an ingredient list
+_REQUEST_WORDS = {
+    "find", "recipe", "recipes", "want", "make", "cook", "without", "no", "not", "except", "for",
+    "under", "quick", "easy", "healthy", "vegan", "vegetarian", "meal", "meals", "dinner", "lunch",
+    "breakfast", "plan", "week", "how", "what", "which", "me", "i", "can", "should", "please",
+}
+
+
+def is_plain_ingredient_list(query: str) -> bool:
+    """
+    "chicken, broccoli and rice" -> True; "Find quick vegan dinners" -> False
+    """
+    words = re.findall(r"[a-z]+", query.lower())
+    if not words or re.search(r"[?.!:]", query) or set(words) & _REQUEST_WORDS:
+        return False
+    parts = [part for part in re.split(r",|;|&|\n|\band\b", query.lower()) if part.strip()]
+    return all(len(part.split()) <= 3 for part in parts)
+
+
+def query_tokens(ingredients) -> set[str]:
+    # Accepts a list of ingredients or a free-text ingredient string
+    if isinstance(ingredients, str):
+        ingredients = re.split(r"[,\n;]| and ", ingredients)
+    tokens = set()
+    for ingredient in ingredients:
+        tokens |= ingredient_tokens(ingredient)
+    return tokens
+
+
+class IngredientIndexBuilder:
+    def __init__(self):
+        self.ids = []
+        self.postings = {}  # token -> list of row numbers (appended in increasing order)
+
+    def add(self, ids: list[str], ingredient_lists: list[list[str]]) -> None:
+        for recipe_id, ingredients in zip(ids, ingredient_lists):
+            row = len(self.ids)
+            self.ids.append(recipe_id)
+            for token in query_tokens(ingredients):
+                self.postings.setdefault(token, []).append(row)
+
+    def build(self) -> "IngredientIndex":
+        vocab = sorted(self.postings)
+        lengths = [len(self.postings[token]) for token in vocab]
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        postings = np.fromiter(
+            (row for token in vocab for row in self.postings[token]),
+            dtype=np.int32,
+            count=int(offsets[-1]),
+        )
+        return IngredientIndex(StringTable.from_strings(self.ids), StringTable.from_strings(vocab), offsets, postings)
+
+
+class IngredientIndex:
+    def __init__(self, ids: StringTable, vocab: StringTable, offsets: np.ndarray, postings: np.ndarray):
+        self.ids = ids
+        self.vocab = vocab
+        self.offsets = offsets
+        self.postings = postings
+        self._token_to_col = {token: i for i, token in enumerate(vocab.tolist())}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def posting_list(self, token: str) -> np.ndarray:
+        col = self._token_to_col.get(token)
+        if col is None:
+            return self.postings[:0]
+        return self.postings[self.offsets[col]:self.offsets[col + 1]]
+
+    def top_overlap(self, ingredients, k: int = 50) -> list[tuple[str, int]]:
+        """
+        Top-k recipes by number of query ingredient tokens they contain.
+
+        Returns (chroma id, overlap count) pairs, best first; recipes with zero
+        overlap are never returned.
+        """
+        lists = [self.posting_list(token) for token in query_tokens(ingredients)]
+        lists = [p for p in lists if len(p)]
+        if not lists:
+            return []
+
+        counts = np.bincount(np.concatenate(lists), minlength=len(self.ids))
+        n_matched = int(np.count_nonzero(counts))
+        k = min(k, n_matched)
+
+        top = np.argpartition(-counts, k - 1)[:k]
+        top = top[np.argsort(-counts[top], kind="stable")]
+        return [(str(self.ids[row]), int(counts[row])) for row in top]
+
+    def save(self, store_path) -> Path:
+        path = Path(store_path) / INDEX_FILENAME
+        np.savez(path, **self.ids.arrays("ids"), **self.vocab.arrays("vocab"), offsets=self.offsets,
+                 postings=self.postings)
+        return path
+
+    @classmethod
+    def load(cls, store_path) -> "IngredientIndex":
+        with np.load(Path(store_path) / INDEX_FILENAME) as data:
+            return cls(StringTable.from_npz(data, "ids"), StringTable.from_npz(data, "vocab"),
+                       data["offsets"], data["postings"])
@@ -0,0 +1,168 @@
+# lexical_index.py
+"""
+Local BM25 index over the `doc` strings produced by `embed.apply_doc_format`.
+
+Built at embed time and saved next to the vectorstore. Scoring is a handful of
+NumPy ops over the query terms' posting lists, so lexical results need no embedding
+call at all; `Retriever` fuses them with Chroma's dense results via reciprocal rank
+fusion, and falls back to them alone when the embedding service is slow or down.
+
+Recipe titles and ingredient JSON are stored alongside (as `StringTable`s, like
+the ids and vocab), so lexical hits can be turned into `Recipe` objects without
+touching Chroma.
+"""
+import re
+from pathlib import Path
+
+import numpy as np
+
+from meal_prep_agent.ingredient_index import STOPWORDS, singular
+from meal_prep_agent.string_table import StringTable
+
+INDEX_FILENAME = "lexical_index.npz"
+
+# Standard BM25 parameters
+K1 = 1.2
+B = 0.75
+
+_WORD = re.compile(r"[a-z]+")
+
+
+def tokenize(text: str) -> list[str]:
+    return [
+        singular(word) for word in _WORD.findall(text.lower())
+        if len(word) > 1 and word not in STOPWORDS
+    ]
+
+
+def reciprocal_rank_fusion(rankings: list[list[str]], k: int = 60) -> list[str]:
+    """
+    Fuse several ranked id lists: score(id) = sum over lists of 1 / (k + rank).
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, recipe_id in enumerate(ranking, start=1):
+            scores[recipe_id] = scores.get(recipe_id, 0.0) + 1.0 / (k + rank)
+
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class LexicalIndexBuilder:
+    def __init__(self):
+        self.ids = []
+        self.titles = []
+        self.ingredients = []
+        self.doc_lengths = []
+        self.postings = {}  # term -> list of (row, term frequency)
+
+    def add(self, ids: list[str], docs: list[str], metadatas: list[dict]) -> None:
+        for recipe_id, doc, meta in zip(ids, docs, metadatas):
+            row = len(self.ids)
+            self.ids.append(recipe_id)
+            self.titles.append(meta["title"])
+            self.ingredients.append(meta["ingredients"])   # JSON string, as stored in chroma
+
+            terms = tokenize(doc)
+            self.doc_lengths.append(len(terms))
+            counts = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((row, tf))
+
+    def build(self) -> "LexicalIndex":
+        vocab = sorted(self.postings)
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum([len(self.postings[term]) for term in vocab], out=offsets[1:])
+
+        pairs = [pair for term in vocab for pair in self.postings[term]]
+        rows = np.array([row for row, _ in pairs], dtype=np.int32)
+        tfs = np.array([tf for _, tf in pairs], dtype=np.float32)
+
+        return LexicalIndex(
+            ids=StringTable.from_strings(self.ids),
+            titles=StringTable.from_strings(self.titles),
+            ingredients=StringTable.from_strings(self.ingredients),
+            doc_lengths=np.array(self.doc_lengths, dtype=np.float32),
+            vocab=StringTable.from_strings(vocab),
+            offsets=offsets,
+            rows=rows,
+            tfs=tfs,
+        )
+
+
+# Columns saved as string tables; the rest are plain arrays
+STRING_COLUMNS = ("ids", "titles", "ingredients", "vocab")
+
+
+class LexicalIndex:
+    def __init__(self, ids, titles, ingredients, doc_lengths, vocab, offsets, rows, tfs):
+        self.ids = ids
+        self.titles = titles
+        self.ingredients = ingredients
+        self.doc_lengths = doc_lengths
+        self.vocab = vocab
+        self.offsets = offsets
+        self.rows = rows
+        self.tfs = tfs
+
+        self._term_to_col = {term: i for i, term in enumerate(vocab.tolist())}
+        self._id_to_row = {recipe_id: i for i, recipe_id in enumerate(ids.tolist())}
+
+        # Per-document length normalisation is query independent - precompute it
+        avg_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+        self._length_norm = K1 * (1 - B + B * doc_lengths / max(avg_length, 1e-9))
+
+        n_docs = len(ids)
+        doc_freqs = np.diff(offsets).astype(np.float32)
+        self._idf = np.log(1 + (n_docs - doc_freqs + 0.5) / (doc_freqs + 0.5))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query: str, k: int = 10) -> list[tuple[str, float]]:
+        """
+        Top-k (id, BM25 score) pairs for `query`, best first.
+        """
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in set(tokenize(query)):
+            col = self._term_to_col.get(term)
+            if col is None:
+                continue
+            start, end = self.offsets[col], self.offsets[col + 1]
+            rows = self.rows[start:end]
+            tfs = self.tfs[start:end]
+            # Rows are unique within one posting list, so fancy-index += is safe
+            scores[rows] += self._idf[col] * tfs * (K1 + 1) / (tfs + self._length_norm[rows])
+
+        n_matched = int(np.count_nonzero(scores))
+        if n_matched == 0:
+            return []
+
+        k = min(k, n_matched)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(str(self.ids[row]), float(scores[row])) for row in top]
+
+    def metadatas(self, ids: list[str]) -> list[dict]:
+        # Same shape as chroma metadatas, so `Retriever` can convert them identically.
+        # One per id, in order - an id not in the index is a KeyError
+        rows = [self._id_to_row[recipe_id] for recipe_id in ids]
+        return [{"title": str(self.titles[row]), "ingredients": str(self.ingredients[row])} for row in rows]
+
+    def save(self, store_path) -> Path:
+        path = Path(store_path) / INDEX_FILENAME
+        strings = {}
+        for name in STRING_COLUMNS:
+            strings.update(getattr(self, name).arrays(name))
+        np.savez(
+            path, **strings,
+            doc_lengths=self.doc_lengths, offsets=self.offsets, rows=self.rows, tfs=self.tfs,
+        )
+        return path
+
+    @classmethod
+    def load(cls, store_path) -> "LexicalIndex":
+        with np.load(Path(store_path) / INDEX_FILENAME) as data:
+            arrays = {name: data[name] for name in ("doc_lengths", "offsets", "rows", "tfs")}
+            return cls(**arrays, **{name: StringTable.from_npz(data, name) for name in STRING_COLUMNS})
@@ -0,0 +1,305 @@
+# matrix_index.py
+"""
+In-process similarity search over a memory-mapped embedding matrix.
+
+For a corpus the size of the recipe set, exporting the embeddings once to a
+row-normalised `.npy` and scoring with a matrix product + `argpartition` is faster
+than a round trip through Chroma's SQLite + HNSW layers, and because the matrix is
+opened with `mmap_mode="r"` every worker process shares the same page-cache pages.
+
+An optional IVF index (spherical k-means coarse quantiser) restricts the exact
+scoring to the `nprobe` closest clusters for larger corpora.
+
+Rows can be stored compactly (see `QUANTIZATIONS`), optionally after Matryoshka
+truncation to the first `dimensions` components - text-embedding-3 vectors are
+trained so that a renormalised prefix is still a usable embedding:
+- "float16": half the size, scored after a blockwise cast back to float32
+- "int8": per-dimension min/max scalar quantisation, a quarter of the size
+- "binary": one sign bit per dimension (1/32 of the size); candidates are found by
+  Hamming distance and rescored against the float query
+"""
+from pathlib import Path
+
+import numpy as np
+
+from meal_prep_agent.string_table import StringTable
+
+MATRIX_FILENAME = "embeddings.npy"
+MATRIX_META_FILENAME = "embeddings_meta.npz"
+IVF_FILENAME = "embeddings_ivf.npz"
+
+EXPORT_PAGE_SIZE = 5000
+SCORE_BLOCK_ROWS = 8192   # rows dequantised to float32 at a time when scoring compact matrices
+
+QUANTIZATIONS = ("float32", "float16", "int8", "binary")
+
+# Binary search keeps this many Hamming candidates per result for float rescoring
+BINARY_RESCORE_MULTIPLIER = 10
+
+# Set bits per byte value, for Hamming distances over packed sign bits
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def normalise_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def collection_vectors(collection) -> tuple[list, list, list, np.ndarray]:
+    """
+    Page every (id, title, ingredients, embedding) out of `collection`.
+    """
+    ids, titles, ingredients, blocks = [], [], [], []
+    offset = 0
+    while True:
+        page = collection.get(include=["embeddings", "metadatas"], limit=EXPORT_PAGE_SIZE, offset=offset)
+        if not page["ids"]:
+            break
+        ids.extend(page["ids"])
+        titles.extend(meta["title"] for meta in page["metadatas"])
+        ingredients.extend(meta["ingredients"] for meta in page["metadatas"])
+        blocks.append(np.asarray(page["embeddings"], dtype=np.float32))
+        offset += len(page["ids"])
+
+    vectors = np.concatenate(blocks) if blocks else np.zeros((0, 0), dtype=np.float32)
+    return ids, titles, ingredients, vectors
+
+
+def truncate_dimensions(vectors: np.ndarray, dimensions: int = None) -> np.ndarray:
+    # Matryoshka truncation: keep the leading components, then renormalise
+    vectors = np.atleast_2d(vectors)
+    if dimensions:
+        vectors = vectors[:, :dimensions]
+    return normalise_rows(vectors)
+
+
+def quantise(vectors: np.ndarray, quantization: str) -> tuple[np.ndarray, dict]:
+    """
+    Compact form of (normalised) `vectors` plus the parameters needed to score it.
+    """
+    if quantization == "float32":
+        return vectors.astype(np.float32), {}
+    if quantization == "float16":
+        return vectors.astype(np.float16), {}
+    if quantization == "int8":
+        low = vectors.min(axis=0) if len(vectors) else np.zeros(vectors.shape[1], dtype=np.float32)
+        high = vectors.max(axis=0) if len(vectors) else np.ones(vectors.shape[1], dtype=np.float32)
+        scale = np.maximum(high - low, 1e-12) / 255
+        codes = np.clip(np.rint((vectors - low) / scale), 0, 255) - 128
+        return codes.astype(np.int8), {"scale": scale.astype(np.float32), "offset": (low + 128 * scale).astype(np.float32)}
+    if quantization == "binary":
+        return np.packbits(vectors > 0, axis=1), {}
+    raise ValueError(f"Unknown quantization {quantization!r}, expected one of {QUANTIZATIONS}")
+
+
+def write_matrix(store_path, ids, titles, ingredients, vectors: np.ndarray,
+                 quantization: str = "float32", dimensions: int = None) -> Path:
+    """
+    Write `vectors` as `embeddings.npy` (truncated, normalised and quantised) with
+    ids / titles / ingredients and the quantisation parameters in a sidecar file.
+    """
+    vectors = truncate_dimensions(vectors, dimensions) if len(vectors) else vectors
+    matrix, params = quantise(vectors, quantization)
+
+    path = Path(store_path) / MATRIX_FILENAME
+    np.save(path, matrix)
+    np.savez(
+        Path(store_path) / MATRIX_META_FILENAME,
+        **StringTable.from_strings(ids).arrays("ids"),
+        **StringTable.from_strings(titles).arrays("titles"),
+        **StringTable.from_strings(ingredients).arrays("ingredients"),
+        quantization=np.array(quantization),
+        dimensions=np.array(vectors.shape[1] if vectors.ndim == 2 else 0),
+        **params,
+    )
+    return path
+
+
+def export_matrix(collection, store_path, quantization: str = "float32", dimensions: int = None) -> Path:
+    """
+    Export every embedding in `collection` to `embeddings.npy` (cosine-normalised).
+    """
+    ids, titles, ingredients, vectors = collection_vectors(collection)
+    return write_matrix(store_path, ids, titles, ingredients, vectors, quantization, dimensions)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, len(scores))
+    if k == 0:
+        return np.zeros(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+class MatrixIndex:
+    def __init__(self, matrix: np.ndarray, ids: StringTable, titles: StringTable,
+                 ingredients: StringTable, ivf: dict = None, quantization: str = "float32",
+                 dimensions: int = None, scale: np.ndarray = None, offset: np.ndarray = None):
+        self.matrix = matrix
+        self.ids = ids
+        self.titles = titles
+        self.ingredients = ingredients
+        self.ivf = ivf
+        self.quantization = quantization
+        # Stored dimensions - binary rows are packed 8 per byte
+        self.dimensions = dimensions or matrix.shape[1]
+        self.scale = scale
+        self.offset = offset
+        self._id_to_row = {recipe_id: i for i, recipe_id in enumerate(ids.tolist())}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def load(cls, store_path, mmap: bool = True) -> "MatrixIndex":
+        store_path = Path(store_path)
+        matrix = np.load(store_path / MATRIX_FILENAME, mmap_mode="r" if mmap else None)
+        with np.load(store_path / MATRIX_META_FILENAME) as meta:
+            ids, titles, ingredients = (StringTable.from_npz(meta, name) for name in ("ids", "titles", "ingredients"))
+            # scale / offset are only saved for int8 matrices
+            params = {
+                "quantization": str(meta["quantization"]),
+                "dimensions": int(meta["dimensions"]),
+                "scale": meta["scale"] if "scale" in meta.files else None,
+                "offset": meta["offset"] if "offset" in meta.files else None,
+            }
+
+        ivf = None
+        if (store_path / IVF_FILENAME).exists():
+            with np.load(store_path / IVF_FILENAME) as data:
+                ivf = {name: data[name] for name in data.files}
+
+        return cls(matrix, ids, titles, ingredients, ivf, **params)
+
+    def _dequantise(self, block: np.ndarray) -> np.ndarray:
+        if self.quantization == "int8":
+            return block.astype(np.float32) * self.scale + self.offset
+        if self.quantization == "binary":
+            # Sign vectors scaled to unit length
+            signs = np.unpackbits(block, axis=1, count=self.dimensions).astype(np.float32)
+            return (2 * signs - 1) / np.sqrt(self.dimensions)
+        return np.asarray(block, dtype=np.float32)
+
+    def _score_rows(self, query: np.ndarray, rows: np.ndarray = None) -> np.ndarray:
+        # Cosine score = dot product, since both sides are normalised.
+        # `query` is (dim,) or (dim, n_queries) to score several queries in one pass
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        if matrix.dtype == np.float32:
+            return matrix @ query
+
+        if self.quantization == "int8":
+            # (codes * scale + offset) . q == codes . (scale * q) + offset . q - no dequantised copy
+            query, bias = query * (self.scale[:, None] if query.ndim == 2 else self.scale), self.offset @ query
+        else:
+            bias = 0.0
+
+        scores = np.empty((len(matrix),) + query.shape[1:], dtype=np.float32)
+        for start in range(0, len(matrix), SCORE_BLOCK_ROWS):
+            block = matrix[start:start + SCORE_BLOCK_ROWS]
+            block = block.astype(np.float32) if self.quantization == "int8" else self._dequantise(block)
+            scores[start:start + len(block)] = block @ query
+        return scores + bias
+
+    def _hamming_candidates(self, query: np.ndarray, n_candidates: int, rows: np.ndarray = None) -> np.ndarray:
+        # Rows whose sign bits disagree least with the query's
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        packed_query = np.packbits(query > 0)
+        distances = np.empty(len(matrix), dtype=np.int32)
+        for start in range(0, len(matrix), SCORE_BLOCK_ROWS):
+            block = matrix[start:start + SCORE_BLOCK_ROWS]
+            distances[start:start + len(block)] = _POPCOUNT[block ^ packed_query].sum(axis=1)
+        top = _top_k(-distances.astype(np.float32), n_candidates)
+        return top if rows is None else rows[top]
+
+    def _candidate_rows(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        centroid_scores = self.ivf["centroids"] @ query
+        lists = _top_k(centroid_scores, nprobe)
+        offsets, order = self.ivf["offsets"], self.ivf["order"]
+        return np.sort(np.concatenate([order[offsets[c]:offsets[c + 1]] for c in lists]))
+
+    def search(self, query_vectors, k: int = 10, nprobe: int = None) -> list[list[tuple[str, float]]]:
+        """
+        Top-k (id, cosine score) per query vector. With `nprobe` set and an IVF index
+        built, only the rows in the `nprobe` closest clusters are scored.
+        """
+        queries = truncate_dimensions(np.asarray(query_vectors, dtype=np.float32), self.dimensions)
+        use_ivf = bool(nprobe) and self.ivf is not None
+        results = []
+
+        if use_ivf or self.quantization == "binary":
+            for query in queries:
+                rows = self._candidate_rows(query, nprobe) if use_ivf else None
+                if self.quantization == "binary":
+                    rows = self._hamming_candidates(query, k * BINARY_RESCORE_MULTIPLIER, rows)
+                scores = self._score_rows(query, rows)
+                results.append([(str(self.ids[rows[i]]), float(scores[i])) for i in _top_k(scores, k)])
+            return results
+
+        # Exact search - one pass over the matrix for all queries
+        all_scores = self._score_rows(queries.T)
+        for j in range(len(queries)):
+            scores = all_scores[:, j]
+            results.append([(str(self.ids[i]), float(scores[i])) for i in _top_k(scores, k)])
+
+        return results
+
+    def metadatas(self, ids: list[str]) -> list[dict]:
+        rows = [self._id_to_row[recipe_id] for recipe_id in ids]
+        return [{"title": str(self.titles[row]), "ingredients": str(self.ingredients[row])} for row in rows]
+
+    def build_ivf(self, store_path, n_lists: int = None, iterations: int = 10, seed: int = 0):
+        """
+        Spherical k-means over the (normalised) rows; saves centroids and the rows of
+        each cluster in CSR form. At most one list per row; an empty matrix gets no
+        IVF index (any old one is removed) and returns None.
+        """
+        path = Path(store_path) / IVF_FILENAME
+        n_rows = len(self.matrix)
+        if n_rows == 0:
+            self.ivf = None
+            path.unlink(missing_ok=True)
+            return None
+        n_lists = min(n_lists or max(1, int(np.sqrt(n_rows))), n_rows)
+        rng = np.random.default_rng(seed)
+        data = np.concatenate([
+            self._dequantise(self.matrix[start:start + SCORE_BLOCK_ROWS])
+            for start in range(0, n_rows, SCORE_BLOCK_ROWS)
+        ])
+
+        centroids = data[rng.choice(n_rows, size=n_lists, replace=False)]
+        for _ in range(iterations):
+            assignment = np.argmax(data @ centroids.T, axis=1)
+            for c in range(n_lists):
+                members = data[assignment == c]
+                if len(members):
+                    centroids[c] = members.sum(axis=0)
+            centroids = normalise_rows(centroids)
+
+        assignment = np.argmax(data @ centroids.T, axis=1)
+        order = np.argsort(assignment, kind="stable").astype(np.int32)
+        offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignment, minlength=n_lists), out=offsets[1:])
+
+        self.ivf = {"centroids": centroids, "order": order, "offsets": offsets}
+        np.savez(path, **self.ivf)
+        return path
+
+
+def recall_at_k(reference: np.ndarray, index: MatrixIndex, k: int = 10, n_queries: int = 200,
+                seed: int = 0, nprobe: int = None) -> float:
+    """
+    Mean overlap between `index`'s top-k and exact full-precision top-k, using
+    `n_queries` stored rows of `reference` (same row order as the index) as queries.
+    """
+    reference = normalise_rows(reference)
+    rng = np.random.default_rng(seed)
+    queries = reference[rng.choice(len(reference), size=min(n_queries, len(reference)), replace=False)]
+
+    exact = reference @ queries.T
+    approximate = index.search(queries, k, nprobe=nprobe)
+    overlaps = [
+        len({int(i) for i in _top_k(exact[:, j], k)} & {index._id_to_row[recipe_id] for recipe_id, _ in hits}) / k
+        for j, hits in enumerate(approximate)
+    ]
+    return float(np.mean(overlaps)) if overlaps else 0.0
@@ -0,0 +1,220 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from autogen_core.models import ChatCompletionClient, CreateResult
+
+from meal_prep_agent.tracing import span
+
+
+def _total_tokens(result: CreateResult) -> int:
+    return result.usage.prompt_tokens + result.usage.completion_tokens
+
+
+class CachedChatCompletionClient(ChatCompletionClient):
+    """
+    Caching wrapper around an AutoGen chat completion client
+    (e.g. `OpenAIChatCompletionClient`).
+
+    Completions are keyed by model + messages + tools (+ tool choice, JSON mode and
+    extra create args) and kept in a bounded in-memory LRU and an optional SQLite
+    file, so repeat prompts return without a network call - and a load test run
+    once against the API can be replayed offline from the file.
+
+    Concurrent identical `create` calls share one in-flight request. Every call is
+    an `llm.create` tracing span with its cache outcome and token usage.
+    """
+
+    def __init__(self, client: ChatCompletionClient, model: str, max_entries: int = 1024, cache_path=None):
+        self.client = client
+        self.model = model
+        self.max_entries = max_entries
+
+        self._lru = OrderedDict()
+        self._inflight = {}   # key -> future of the request every identical caller awaits
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "tokens_saved": 0}
+
+        self._db = None
+        if cache_path is not None:
+            Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(cache_path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS completions (key TEXT PRIMARY KEY, result TEXT, created REAL)"
+            )
+            self._db.commit()
+
+    def cache_key(self, messages, tools=(), tool_choice="auto", json_output=None, extra_create_args=None) -> str:
+        payload = {
+            "model": self.model,
+            "messages": [message.model_dump(mode="json") for message in messages],
+            "tools": [tool if isinstance(tool, dict) else tool.schema for tool in tools],
+            "tool_choice": tool_choice if isinstance(tool_choice, str) else tool_choice.name,
+            "json_output": json_output if json_output in (None, True, False) else json_output.__name__,
+            "extra_create_args": dict(extra_create_args or {}),
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def _lru_put(self, key: str, result: CreateResult) -> None:
+        self._lru[key] = result
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _lookup(self, key: str):
+        with self._lock:
+            result = self._lru.get(key)
+            if result is not None:
+                self._lru.move_to_end(key)
+                self.stats["hits"] += 1
+            elif self._db is not None:
+                row = self._db.execute("SELECT result FROM completions WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    result = CreateResult.model_validate_json(row[0])
+                    self._lru_put(key, result)
+                    self.stats["disk_hits"] += 1
+
+            if result is None:
+                return None
+            self.stats["tokens_saved"] += result.usage.prompt_tokens + result.usage.completion_tokens
+            return result.model_copy(update={"cached": True})
+
+    def _store(self, key: str, result: CreateResult) -> None:
+        with self._lock:
+            self._lru_put(key, result)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO completions (key, result, created) VALUES (?, ?, ?)",
+                    (key, result.model_dump_json(), time.time()),
+                )
+                self._db.commit()
+
+    async def _fetch(self, key: str, messages, **kwargs) -> CreateResult:
+        try:
+            result = await self.client.create(messages, **kwargs)
+        finally:
+            self._inflight.pop(key, None)
+        self._store(key, result)
+        return result
+
+    async def create(self, messages, *, tools=[], tool_choice="auto", json_output=None,
+                     extra_create_args={}, cancellation_token=None) -> CreateResult:
+        with span("llm.create", model=self.model) as llm_span:
+            return await self._create(
+                llm_span, messages, tools=tools, tool_choice=tool_choice, json_output=json_output,
+                extra_create_args=extra_create_args, cancellation_token=cancellation_token,
+            )
+
+    async def _create(self, llm_span, messages, *, tools, tool_choice, json_output, extra_create_args,
+                      cancellation_token) -> CreateResult:
+        key = self.cache_key(messages, tools, tool_choice, json_output, extra_create_args)
+        cached = self._lookup(key)
+        if cached is not None:
+            llm_span.set_attributes({"cache": "hit", "tokens_saved": _total_tokens(cached)})
+            return cached
+
+        # The request runs as its own task that every identical caller on this loop
+        # awaits; it is only cancelled once all of them have been (by task cancellation
+        # or their own cancellation token)
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight.get(key)
+        made_request = False
+        if inflight is not None and inflight["task"].get_loop() is loop:
+            self.stats["coalesced"] += 1
+            llm_span.set_attribute("cache", "coalesced")
+        else:
+            self.stats["misses"] += 1
+            llm_span.set_attribute("cache", "miss")
+            made_request = True
+            # No caller's cancellation token - one caller cancelling must not fail the others
+            task = loop.create_task(self._fetch(
+                key, messages, tools=tools, tool_choice=tool_choice, json_output=json_output,
+                extra_create_args=extra_create_args,
+            ))
+            inflight = self._inflight[key] = {"task": task, "waiters": 0}
+
+        inflight["waiters"] += 1
+        waiter = asyncio.shield(inflight["task"])
+        if cancellation_token is not None:
+            # Cancelling the token stops this caller's wait (and the request, if it was the last waiter)
+            cancellation_token.link_future(waiter)
+        try:
+            result = await waiter
+        except asyncio.CancelledError:
+            if inflight["waiters"] == 1:
+                inflight["task"].cancel()
+            raise
+        finally:
+            inflight["waiters"] -= 1
+
+        # Only the caller that made the request spent the tokens
+        if made_request:
+            llm_span.set_attributes({"prompt_tokens": result.usage.prompt_tokens,
+                                     "completion_tokens": result.usage.completion_tokens})
+        else:
+            llm_span.set_attribute("tokens_saved", _total_tokens(result))
+        return result
+
+    async def create_stream(self, messages, *, tools=[], tool_choice="auto", json_output=None,
+                            extra_create_args={}, cancellation_token=None):
+        key = self.cache_key(messages, tools, tool_choice, json_output, extra_create_args)
+        with span("llm.create", model=self.model, stream=True) as llm_span:
+            cached = self._lookup(key)
+            if cached is not None:
+                llm_span.set_attributes({"cache": "hit", "tokens_saved": _total_tokens(cached)})
+                # Replay as a single chunk, then the result, as a streamed reply ends
+                if isinstance(cached.content, str):
+                    yield cached.content
+                yield cached
+                return
+
+            self.stats["misses"] += 1
+            llm_span.set_attribute("cache", "miss")
+            async for chunk in self.client.create_stream(
+                messages, tools=tools, tool_choice=tool_choice, json_output=json_output,
+                extra_create_args=extra_create_args, cancellation_token=cancellation_token,
+            ):
+                if isinstance(chunk, CreateResult):
+                    self._store(key, chunk)
+                    llm_span.set_attributes({"prompt_tokens": chunk.usage.prompt_tokens,
+                                             "completion_tokens": chunk.usage.completion_tokens})
+                yield chunk
+
+    def cache_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_entries"] = len(self._lru)
+        return stats
+
+    async def close(self) -> None:
+        await self.client.close()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    # Everything else is the wrapped client's
+    def actual_usage(self):
+        return self.client.actual_usage()
+
+    def total_usage(self):
+        return self.client.total_usage()
+
+    def count_tokens(self, messages, *, tools=[]) -> int:
+        return self.client.count_tokens(messages, tools=tools)
+
+    def remaining_tokens(self, messages, *, tools=[]) -> int:
+        return self.client.remaining_tokens(messages, tools=tools)
+
+    @property
+    def capabilities(self):
+        return self.client.capabilities
+
+    @property
+    def model_info(self):
+        return self.client.model_info
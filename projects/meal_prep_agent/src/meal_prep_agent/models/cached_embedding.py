@@ -0,0 +1,152 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+
+from meal_prep_agent.tracing import span
+
+
+def normalise_text(text: str) -> str:
+    # Case and whitespace differences should not cost another API call
+    return " ".join(text.lower().split())
+
+
+class CachedEmbeddingFunction:
+    """
+    Content-addressed cache in front of an embedding function
+    (e.g. `OpenAIEmbeddingFunction`).
+
+    Entries are keyed by model name + normalised text (the wrapped function still
+    gets the original text) and kept in two tiers:
+    - a bounded in-memory LRU
+    - an optional SQLite file that survives restarts, capped at `max_disk_entries`
+      rows (oldest dropped first)
+
+    Only texts missing from both tiers are sent to the wrapped function, in a single batch.
+    """
+
+    def __init__(self, embedding_fn, max_entries: int = 4096, cache_path=None, max_disk_entries: int = 50_000):
+        self.embedding_fn = embedding_fn
+        self.model = embedding_fn.model
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "disk_evictions": 0}
+
+        self._db = None
+        if cache_path is not None:
+            Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(cache_path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB, created REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_created ON embeddings (created)")
+            self._db.commit()
+
+    def cache_key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{text}".encode("utf-8")).hexdigest()
+
+    def _lru_put(self, key: str, vector: list[float]) -> None:
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _lookup(self, key: str):
+        # Memory tier
+        vector = self._lru.get(key)
+        if vector is not None:
+            self._lru.move_to_end(key)
+            self.stats["hits"] += 1
+            return vector
+
+        # Disk tier - promote into memory on hit
+        if self._db is not None:
+            row = self._db.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                vector = array("f", row[0]).tolist()
+                self._lru_put(key, vector)
+                self.stats["disk_hits"] += 1
+                return vector
+
+        return None
+
+    def _store(self, items: list[tuple[str, list[float]]]) -> None:
+        for key, vector in items:
+            self._lru_put(key, vector)
+
+        if self._db is not None:
+            created = time.time()
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, created) VALUES (?, ?, ?)",
+                [(key, array("f", vector).tobytes(), created) for key, vector in items],
+            )
+            # Size bound for the disk tier too - drop the oldest rows past the cap
+            (rows,) = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            if rows > self.max_disk_entries:
+                self._db.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY created LIMIT ?)",
+                    (rows - self.max_disk_entries,),
+                )
+                self.stats["disk_evictions"] += rows - self.max_disk_entries
+            self._db.commit()
+
+    def embed(self, input: list[str]) -> list[list[float]]:
+        # Normalised for the key only - the API embeds the text as given
+        keys = [self.cache_key(normalise_text(t)) for t in input]
+
+        with span("embedding.cached", model=self.model, inputs=len(input)) as cache_span:
+            results = {}
+            missing = {}    # key -> text, de-duplicated within the batch
+            with self._lock:
+                for key, text in zip(keys, input):
+                    if key in results or key in missing:
+                        continue
+                    vector = self._lookup(key)
+                    if vector is None:
+                        missing[key] = text
+                    else:
+                        results[key] = vector
+                self.stats["misses"] += len(missing)
+            cache_span.set_attributes({"cache_hits": len(results), "cache_misses": len(missing)})
+
+            # Network call happens outside the lock so other threads can keep hitting the cache
+            if missing:
+                vectors = self.embedding_fn(list(missing.values()))
+                new_items = list(zip(missing.keys(), vectors))
+                with self._lock:
+                    self._store(new_items)
+                results.update(new_items)
+
+        return [results[key] for key in keys]
+
+    # Chroma uses for embedding for embedding documents when adding to the collection
+    def __call__(self, input: list[str]) -> list[list[float]]:
+        return self.embed(input)
+
+    # Chroma uses for embedding queries when calling collection.query()
+    def embed_query(self, input: list[str]) -> list[list[float]]:
+        return self.embed(input)
+
+    # Same name as the wrapped function so chroma does not flag a conflict
+    def name(self) -> str:
+        return self.embedding_fn.name()
+
+    def cache_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_entries"] = len(self._lru)
+
+        return stats
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,68 @@
+from typing import Protocol, runtime_checkable
+
+from meal_prep_agent.config import (
+    EMBEDDING_MODEL,
+    LOCAL_EMBEDDING_BATCH_SIZE,
+    LOCAL_EMBEDDING_THREADS,
+    LOCAL_EMBEDDING_BACKEND,
+)
+
+# `config.EMBEDDING_MODEL` values that select a local backend:
+# - "local:<sentence-transformers model>", e.g. "local:all-MiniLM-L6-v2"
+# - "hashing" or "hashing:<dims>" - deterministic, dependency free (tests / offline)
+LOCAL_PREFIX = "local:"
+HASHING_PREFIX = "hashing"
+
+
+@runtime_checkable
+class EmbeddingFunction(Protocol):
+    """
+    What chroma, `CachedEmbeddingFunction` and the ingest engine need from an
+    embedding backend.
+    """
+    model: str
+
+    # Chroma uses for embedding documents when adding to the collection
+    def __call__(self, input: list[str]) -> list[list[float]]: ...
+
+    # Chroma uses for embedding queries when calling collection.query()
+    def embed_query(self, input: list[str]) -> list[list[float]]: ...
+
+    # chroma requires `name` for conflict detection
+    def name(self) -> str: ...
+
+
+def is_local_model(model: str = EMBEDDING_MODEL) -> bool:
+    # Local backends make no network calls, so need no API key or rate limiting
+    return model.startswith(LOCAL_PREFIX) or model.startswith(HASHING_PREFIX)
+
+
+def create_embedding_function(model: str = EMBEDDING_MODEL, openai_client=None) -> EmbeddingFunction:
+    """
+    Embedding function for `model` - OpenAI unless `model` names a local backend.
+    """
+    if model.startswith(HASHING_PREFIX):
+        from meal_prep_agent.models.local_embedding import HashingEmbeddingFunction
+
+        _, _, dims = model.partition(":")
+        return HashingEmbeddingFunction(dims=int(dims)) if dims else HashingEmbeddingFunction()
+
+    if model.startswith(LOCAL_PREFIX):
+        from meal_prep_agent.models.local_embedding import SentenceTransformerEmbeddingFunction
+
+        return SentenceTransformerEmbeddingFunction(
+            model[len(LOCAL_PREFIX):],
+            batch_size=LOCAL_EMBEDDING_BATCH_SIZE,
+            max_workers=LOCAL_EMBEDDING_THREADS,
+            backend=LOCAL_EMBEDDING_BACKEND,
+        )
+
+    from meal_prep_agent.models.openai_embedding import OpenAIEmbeddingFunction
+
+    if openai_client is None:
+        from openai import OpenAI
+        from meal_prep_agent.config import require_api_key
+        from meal_prep_agent.http_pool import get_http_client
+
+        openai_client = OpenAI(api_key=require_api_key(), http_client=get_http_client())
+    return OpenAIEmbeddingFunction(openai_client, model)
@@ -0,0 +1,82 @@
+import hashlib
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # optional dependency - only needed for "local:<model>" embeddings
+    SentenceTransformer = None
+
+
+class SentenceTransformerEmbeddingFunction:
+    """
+    CPU embeddings from a sentence-transformers model, no network round trip.
+
+    Inputs are split into `batch_size` chunks and encoded on a thread pool (the
+    torch / ONNX runtime kernels release the GIL). `backend="onnx"` uses the ONNX
+    export of the model where sentence-transformers provides one.
+    """
+
+    def __init__(self, model: str, batch_size: int = 64, max_workers: int = 4, backend: str = "torch"):
+        if SentenceTransformer is None:
+            raise ImportError(
+                f"Embedding model 'local:{model}' needs sentence-transformers: pip install sentence-transformers"
+            )
+        self.model = model
+        self.batch_size = batch_size
+        self._encoder = SentenceTransformer(model, device="cpu", backend=backend)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="local-embed")
+
+    def _encode(self, texts: list[str]) -> np.ndarray:
+        return self._encoder.encode(texts, batch_size=self.batch_size, normalize_embeddings=True,
+                                    convert_to_numpy=True, show_progress_bar=False)
+
+    def __call__(self, input: list[str]) -> list[list[float]]:
+        if len(input) <= self.batch_size:
+            return self._encode(input).tolist()
+
+        chunks = [input[i:i + self.batch_size] for i in range(0, len(input), self.batch_size)]
+        return np.concatenate(list(self._executor.map(self._encode, chunks))).tolist()
+
+    def embed_query(self, input: list[str]) -> list[list[float]]:
+        return self(input)
+
+    def name(self) -> str:
+        return f"local={self.model}"
+
+
+_WORD = re.compile(r"\w+")
+
+
+class HashingEmbeddingFunction:
+    """
+    Deterministic feature-hashing embeddings: every word and word bigram is hashed
+    into one of `dims` buckets with a +/-1 sign. No model or network, identical
+    output across processes and machines - for tests and offline runs. Texts that
+    share words score as similar, nothing more.
+    """
+
+    def __init__(self, dims: int = 384):
+        self.dims = dims
+        self.model = f"hashing:{dims}"
+
+    def _embed(self, text: str) -> np.ndarray:
+        words = _WORD.findall(text.lower())
+        vector = np.zeros(self.dims, dtype=np.float32)
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[digest % self.dims] += 1.0 if (digest >> 63) else -1.0
+
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def __call__(self, input: list[str]) -> list[list[float]]:
+        return [self._embed(text).tolist() for text in input]
+
+    def embed_query(self, input: list[str]) -> list[list[float]]:
+        return self(input)
+
+    def name(self) -> str:
+        return self.model
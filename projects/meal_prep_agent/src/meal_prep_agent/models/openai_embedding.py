@@ -1,3 +1,6 @@
+from meal_prep_agent.tracing import span
+
+
 class OpenAIEmbeddingFunction:
     def __init__(self, client, model: str):
         self.client = client
@@ -5,18 +8,17 @@ class OpenAIEmbeddingFunction:
 
     # Chroma uses for embedding for embedding documents when adding to the collection
     def __call__(self, input: list[str]) -> list[list[float]]:     
-        response = self.client.embeddings.create(
-            model=self.model,
-            input=input # whole batch
-        )
+        with span("embedding.openai", model=self.model, inputs=len(input)) as embed_span:
+            response = self.client.embeddings.create(
+                model=self.model,
+                input=input # whole batch
+            )
+            embed_span.set_attribute("total_tokens", response.usage.total_tokens if response.usage else None)
         return [item.embedding for item in response.data]
     
     # Chroma uses for embedding queries when calling collection.query() 
     def embed_query(self, input: list[str]) -> list[list[float]]: 
-        response = self.client.embeddings.create( 
-            model=self.model, 
-            input=input ) 
-        return [item.embedding for item in response.data]
+        return self(input)
     
     # chroma requires `name` for conflict detection
     def name(self) -> str:
@@ -1,7 +1,9 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 # Create Pydantic Recipe model
 class Recipe(BaseModel):
     title: str
-    ingredients: List[str]
\ No newline at end of file
+    ingredients: List[str]
+    # Set when the result is degraded, e.g. "lexical only: dense search TimeoutError"
+    fallback: Optional[str] = None
\ No newline at end of file
@@ -0,0 +1,85 @@
+# processed_store.py
+"""
+Read/write the processed recipe dataset.
+
+The processed data is stored as an uncompressed Arrow IPC file with `ingredients` as
+a native list<string> column, so consumers memory-map it instead of parsing Python
+list reprs back out of `recipes_clean.csv`. The CSV is still written alongside it,
+and is used as the fallback when pyarrow is not installed or the Arrow file is missing.
+"""
+import pandas as pd
+
+from meal_prep_agent.config import PROCESSED_DATA_PATH, PROCESSED_ARROW_PATH
+from meal_prep_agent.stream_ingest import CHUNK_SIZE, parse_ingredient_series, prepare_frame, iter_clean_chunks
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional - CSV only
+    pa = None
+
+
+def arrow_available(arrow_path=PROCESSED_ARROW_PATH) -> bool:
+    return pa is not None and arrow_path.exists()
+
+
+def write_processed(df: pd.DataFrame, arrow_path=PROCESSED_ARROW_PATH, csv_path=PROCESSED_DATA_PATH) -> None:
+    arrow_path.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(csv_path, index=False)
+
+    if pa is None:
+        print("pyarrow not installed - wrote CSV only")
+        return
+
+    table = pa.table({
+        "title": pa.array(df["title"].tolist(), type=pa.string()),
+        "ingredients": pa.array(df["ingredients"].tolist(), type=pa.list_(pa.string())),
+    })
+
+    # Uncompressed IPC file so readers can memory-map it without a decode step
+    with pa.OSFile(str(arrow_path), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def read_processed_table(arrow_path=PROCESSED_ARROW_PATH):
+    """
+    Memory-mapped, zero-copy Arrow table of the processed dataset.
+    """
+    source = pa.memory_map(str(arrow_path), "r")
+    return pa.ipc.open_file(source).read_all()
+
+
+def _table_to_frame(table) -> pd.DataFrame:
+    # `to_pylist` gives real Python lists (`to_pandas` would give numpy arrays)
+    return pd.DataFrame({
+        "title": table.column("title").to_pylist(),
+        "ingredients": table.column("ingredients").to_pylist(),
+    })
+
+
+def read_processed(arrow_path=PROCESSED_ARROW_PATH, csv_path=PROCESSED_DATA_PATH) -> pd.DataFrame:
+    """
+    Processed dataset as a DataFrame with `title` and list-valued `ingredients`.
+    """
+    if arrow_available(arrow_path):
+        return _table_to_frame(read_processed_table(arrow_path))
+
+    print(f"Arrow file not available, reading `{csv_path}`")
+    df = pd.read_csv(csv_path)
+    df["ingredients"] = parse_ingredient_series(df["ingredients"]).set_axis(df.index)
+    return df
+
+
+def iter_processed_chunks(chunksize: int = CHUNK_SIZE, arrow_path=PROCESSED_ARROW_PATH,
+                          csv_path=PROCESSED_DATA_PATH):
+    """
+    Stream the processed dataset as prepared chunks (`doc`, `metadata`, `id` columns
+    added), from the Arrow file's record batches or, failing that, the CSV.
+    """
+    if not arrow_available(arrow_path):
+        yield from iter_clean_chunks(csv_path, chunksize, title_col="title", ingredients_col="ingredients")
+        return
+
+    seen_ids = set()
+    for record_batch in read_processed_table(arrow_path).to_batches(max_chunksize=chunksize):
+        yield prepare_frame(_table_to_frame(record_batch), seen_ids=seen_ids)
@@ -1,28 +1,13 @@
 # query.py
 import sys
-import chromadb
-from openai import OpenAI
-from chromadb.config import Settings
 
-from meal_prep_agent.config import VECTORSTORE_PATH, EMBEDDING_MODEL, API_KEY
-from meal_prep_agent.models.openai_embedding import OpenAIEmbeddingFunction
+from meal_prep_agent import retriever_pool
+from meal_prep_agent.config import EMBEDDING_MODEL
 
 
-def load_vectorstore():
-    db_path = VECTORSTORE_PATH / "chroma_db_rag_recipes"
-    client_settings = Settings(anonymized_telemetry=False)
-    client = chromadb.PersistentClient(path=db_path, settings=client_settings)
-
-    openai_client = OpenAI(api_key=API_KEY)
-    embedding_fn = OpenAIEmbeddingFunction(openai_client, EMBEDDING_MODEL)
-
-    collection = client.get_or_create_collection(
-        name="rag_recipes",
-        embedding_function=embedding_fn,
-        metadata={"hnsw:space": "cosine"}
-    )
-
-    return collection
+def load_vectorstore(embedding_model: str = EMBEDDING_MODEL):
+    # Queries are embedded by the backend `embedding_model` selects (OpenAI or local)
+    return retriever_pool.get_collection(embedding_model=embedding_model)
 
 
 def pretty_print_results(results):
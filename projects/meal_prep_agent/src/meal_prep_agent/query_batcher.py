@@ -0,0 +1,88 @@
+# query_batcher.py
+"""
+Micro-batching front-end for `Retriever.retrieve_many`.
+
+Concurrent single-query callers (e.g. several researcher agents running at once)
+are held for a short window and coalesced into one `retrieve_many` call, so they
+share one embedding request and one chroma query.
+"""
+import asyncio
+import weakref
+
+from meal_prep_agent.config import QUERY_BATCH_WINDOW_SECONDS, QUERY_BATCH_MAX_SIZE
+
+
+class QueryBatcher:
+    def __init__(self, retriever, window_seconds: float = QUERY_BATCH_WINDOW_SECONDS,
+                 max_batch: int = QUERY_BATCH_MAX_SIZE):
+        self.retriever = retriever
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self._pending = {}  # (n, mode) -> list of (query, future)
+        self._flush_tasks = {}      # (n, mode) -> task waiting out the window
+        self._batch_tasks = set()   # running batches - the loop only keeps weak references to tasks
+        self.stats = {"queries": 0, "batches": 0}
+
+    async def retrieve(self, query: str, n: int = 5, mode: str = None):
+        key = (n, mode)
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(key, []).append((query, future))
+        self.stats["queries"] += 1
+
+        if len(self._pending[key]) >= self.max_batch:
+            # Full batch - don't wait out the window
+            self._flush_now(key)
+        elif key not in self._flush_tasks:
+            self._flush_tasks[key] = asyncio.create_task(self._flush_after_window(key))
+
+        return await future
+
+    async def _flush_after_window(self, key) -> None:
+        await asyncio.sleep(self.window_seconds)
+        # Window over - from here this task is a running batch like `_flush_now`'s
+        self._flush_tasks.pop(key, None)
+        task = asyncio.current_task()
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+        await self._run_batch(key, self._pending.pop(key, []))
+
+    def _flush_now(self, key) -> None:
+        task = self._flush_tasks.pop(key, None)
+        if task is not None:
+            task.cancel()
+        task = asyncio.create_task(self._run_batch(key, self._pending.pop(key, [])))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+
+    async def _run_batch(self, key, batch: list) -> None:
+        if not batch:
+            return
+
+        n, mode = key
+        queries = [query for query, _ in batch]
+        self.stats["batches"] += 1
+        try:
+            # Retrieval is blocking (chroma + embedding call) - keep it off the event loop
+            results = await asyncio.to_thread(self.retriever.retrieve_many, queries, n, mode)
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for (_, future), recipes in zip(batch, results):
+            if not future.done():
+                future.set_result(recipes)
+
+
+# One batcher per event loop - futures cannot be shared across loops
+_batchers = weakref.WeakKeyDictionary()
+
+
+def get_batcher(retriever) -> QueryBatcher:
+    loop = asyncio.get_running_loop()
+    batcher = _batchers.get(loop)
+    if batcher is None or batcher.retriever is not retriever:
+        batcher = QueryBatcher(retriever)
+        _batchers[loop] = batcher
+    return batcher
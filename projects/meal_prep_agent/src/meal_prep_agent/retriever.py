@@ -1,52 +1,79 @@
 # Vector search logic
-import chromadb
+import contextvars
 import json
-from openai import OpenAI
-from chromadb.config import Settings
+import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from typing import List
 
-from meal_prep_agent.config import VECTORSTORE_PATH, EMBEDDING_MODEL, API_KEY
-from meal_prep_agent.models.openai_embedding import OpenAIEmbeddingFunction
+from meal_prep_agent import retriever_pool
+from meal_prep_agent.config import EMBEDDING_MODEL, RETRIEVAL_MODE, DENSE_TIMEOUT_SECONDS, RETRIEVER_BACKEND, MATRIX_NPROBE
+from meal_prep_agent.lexical_index import reciprocal_rank_fusion
 from meal_prep_agent.models.pydantic_recipe import Recipe
+from meal_prep_agent.tracing import span
+
+# Hybrid retrieval fetches this many candidates per ranker before fusing
+HYBRID_CANDIDATE_MULTIPLIER = 4
+
+# Dense searches run here so hybrid mode can stop waiting on a slow embedding call
+_dense_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="dense-search")
+
+logger = logging.getLogger(__name__)
+
+
+def is_dense_outage(exc: Exception) -> bool:
+    # Slow or unreachable dense backend - worth falling back to BM25 for. Anything else
+    # (auth, configuration, embedding dimension mismatch) is a bug to surface, not hide
+    import httpx
+    import openai
+
+    return isinstance(exc, (TimeoutError, FutureTimeoutError, ConnectionError,
+                            httpx.TransportError, openai.APIConnectionError))
+
 
 class Retriever:
-    def __init__(self, collection=None):
+    def __init__(self, collection=None, ingredient_index=None, lexical_index=None,
+                 backend: str = RETRIEVER_BACKEND, matrix_index=None, embedding_model: str = EMBEDDING_MODEL):
+        self.embedding_model = embedding_model
+
         # Check if collection past in, if isn't, then load vectorstore
         if collection:
             self.collection = collection
         else:
             self.collection= self.load_vectorstore()
-        
-    # Load chroma DB
-    def load_vectorstore(self):
-        db_path = VECTORSTORE_PATH / "chroma_db_rag_recipes"
-        client_settings = Settings(anonymized_telemetry=False)
-        client = chromadb.PersistentClient(path=db_path, settings=client_settings)
-
-        openai_client = OpenAI(api_key=API_KEY)
-        embedding_fn = OpenAIEmbeddingFunction(openai_client, EMBEDDING_MODEL)
 
-        collection = client.get_or_create_collection(
-            name="rag_recipes",
-            embedding_function=embedding_fn,
-            metadata={"hnsw:space": "cosine"}
-        )
-
-        return collection
+        # Local indexes - loaded lazily on first use
+        self._ingredient_index = ingredient_index
+        self._lexical_index = lexical_index
+        self._matrix_index = matrix_index
 
-    def retrieve(self, query: str, n: int = 5) -> List[Recipe]:
-        """
-        Retrieve the top-n most relevant chunks from ChromaDB. 
-        """
-        recipes = []
+        # Dense search backend: "chroma" or "matrix" (memory-mapped embedding matrix)
+        self.backend = backend
         
-        results = self.collection.query(
-            query_texts=[query],
-            n_results=n
-        )
+    # Load chroma DB (shared, opened once per process)
+    def load_vectorstore(self):
+        return retriever_pool.get_collection(embedding_model=self.embedding_model)
+
+    @property
+    def ingredient_index(self):
+        if self._ingredient_index is None:
+            self._ingredient_index = retriever_pool.get_ingredient_index()
+        return self._ingredient_index
+
+    @property
+    def lexical_index(self):
+        if self._lexical_index is None:
+            self._lexical_index = retriever_pool.get_lexical_index()
+        return self._lexical_index
+
+    @property
+    def matrix_index(self):
+        if self._matrix_index is None:
+            self._matrix_index = retriever_pool.get_matrix_index()
+        return self._matrix_index
+
+    def _to_recipes(self, metadatas: list) -> List[Recipe]:
+        recipes = []
 
-        metadatas = results["metadatas"][0]
-        
         for meta in metadatas:
             # Decode JSON string back into list
             if isinstance(meta.get("ingredients"), str):
@@ -63,80 +90,137 @@ class Retriever:
 
             recipe = Recipe(title=title, ingredients=ingredients)
             recipes.append(recipe)
-        
+
         return recipes
-    
-    ## REVISED RETRIEVER
-    # def retrieve(
-    #     self,
-    #     user_ingredients: List[str],
-    #     query: str = "",
-    #     n: int = 10
-    # ) -> List[Recipe]:
-    #     """
-    #     Retrieve recipes that match as many of the user's on-hand ingredients
-    #     as possible. Embeddings are used only as a secondary reranker.
-    #     """
-
-    #     # Normalize user ingredients
-    #     user_set = {u.lower() for u in user_ingredients}
-
-    #     # 1. Load all recipes from Chroma
-    #     all_results = self.collection.get(include=["metadatas"])
-    #     all_metas = all_results["metadatas"]
-
-    #     scored = []
-
-    #     for meta in all_metas:
-    #         # Decode ingredients
-    #         ingredients = meta.get("ingredients")
-    #         if isinstance(ingredients, str):
-    #             try:
-    #                 ingredients = json.loads(ingredients)
-    #             except Exception:
-    #                 continue
-
-    #         recipe_set = {i.lower() for i in ingredients}
-
-    #         # 2. Compute overlap score
-    #         overlap = len(recipe_set.intersection(user_set))
-
-    #         # Skip recipes with zero overlap
-    #         if overlap == 0:
-    #             continue
-
-    #         scored.append((meta, overlap))
-
-    #     # If nothing matches, fall back to embedding search
-    #     if not scored:
-    #         return self._vector_search(query, n)
-
-    #     # 3. Sort by overlap descending
-    #     scored.sort(key=lambda x: x[1], reverse=True)
-
-    #     # 4. Take top K candidates for embedding reranking
-    #     top_candidates = scored[:50]  # adjustable
-    #     candidate_ids = [meta["id"] for meta, _ in top_candidates]
-
-    #     # 5. Embedding search restricted to candidates
-    #     results = self.collection.query(
-    #         query_texts=[query],
-    #         n_results=n,
-    #         where={"id": {"$in": candidate_ids}}
-    #     )
-
-    #     # 6. Convert to Recipe objects
-    #     recipes = []
-    #     for meta in results["metadatas"][0]:
-    #         ingredients = meta.get("ingredients")
-    #         if isinstance(ingredients, str):
-    #             ingredients = json.loads(ingredients)
-
-    #         recipes.append(Recipe(title=meta["title"], ingredients=ingredients))
-
-    #     return recipes
-
-    
+
+    def _dense_search(self, queries: List[str], n: int) -> tuple[list, list]:
+        matrix = self.matrix_index if self.backend == "matrix" else None
+        if matrix is not None:
+            # In-process search - one embedding request, then one pass over the matrix
+            query_vectors = retriever_pool.get_embedding_function(self.embedding_model)(queries)
+            hits = matrix.search(query_vectors, n, nprobe=MATRIX_NPROBE)
+            ids = [[recipe_id for recipe_id, _ in q_hits] for q_hits in hits]
+            return ids, [matrix.metadatas(q_ids) for q_ids in ids]
+
+        # One chroma query for every query string -> one embedding request
+        results = self.collection.query(
+            query_texts=queries,
+            n_results=n,
+            include=["metadatas"],
+        )
+        return results["ids"], results["metadatas"]
+
+    def retrieve(self, query: str, n: int = 5, mode: str = None) -> List[Recipe]:
+        """
+        Retrieve the top-n most relevant chunks.
+
+        mode (defaults to `config.RETRIEVAL_MODE`):
+        - "dense": ChromaDB vector search only
+        - "lexical": local BM25 only (no embedding call)
+        - "hybrid": BM25 and ChromaDB fused with reciprocal rank fusion; falls back
+          to BM25 alone if the dense search times out, can't connect or exceeds
+          `DENSE_TIMEOUT_SECONDS`, marking those recipes with `fallback`
+        - "ingredients": `retrieve_by_ingredients` - for plain ingredient lists
+        """
+        return self.retrieve_many([query], n, mode)[0]
+
+    def retrieve_many(self, queries: List[str], n: int = 5, mode: str = None) -> List[List[Recipe]]:
+        """
+        Batched `retrieve`: all queries are embedded in a single request and searched
+        with a single chroma query. Returns one Recipe list per query, in order.
+        """
+        if not queries:
+            return []
+
+        mode = mode or RETRIEVAL_MODE
+        with span("retriever.retrieve", queries=len(queries), n=n, mode=mode, backend=self.backend) as retrieve_span:
+            results = self._retrieve_many(queries, n, mode, retrieve_span)
+            retrieve_span.set_attribute("result_count", sum(len(recipes) for recipes in results))
+        return results
+
+    def _retrieve_many(self, queries: List[str], n: int, mode: str, retrieve_span) -> List[List[Recipe]]:
+        if mode == "ingredients":
+            # Candidates differ per query, so each gets its own (restricted) dense search
+            return [self.retrieve_by_ingredients(query, n=n) for query in queries]
+
+        lexical = self.lexical_index
+
+        # No BM25 index built yet - dense is the only option
+        if mode == "dense" or lexical is None:
+            _, metadatas = self._dense_search(queries, n)
+            return [self._to_recipes(metas) for metas in metadatas]
+
+        k = n * HYBRID_CANDIDATE_MULTIPLIER
+        lexical_ids = [[recipe_id for recipe_id, _ in lexical.search(query, k)] for query in queries]
+        lexical_only = [self._to_recipes(lexical.metadatas(ids[:n])) for ids in lexical_ids]
+        if mode == "lexical":
+            return lexical_only
+
+        future = None
+        try:
+            if DENSE_TIMEOUT_SECONDS is None:
+                dense_ids, dense_metadatas = self._dense_search(queries, k)
+            else:
+                # Run in the caller's context so the embedding call's span nests under this retrieval
+                future = _dense_executor.submit(contextvars.copy_context().run, self._dense_search, queries, k)
+                dense_ids, dense_metadatas = future.result(timeout=DENSE_TIMEOUT_SECONDS)
+        except Exception as exc:
+            if not is_dense_outage(exc):
+                raise
+            if future is not None:
+                # A timed-out search can't be interrupted - this only drops it if it never started
+                future.cancel()
+            reason = f"dense search {type(exc).__name__}"
+            logger.warning("Hybrid retrieval degraded to lexical-only results (%s: %s)", reason, exc)
+            retrieve_span.set_attribute("dense_fallback", type(exc).__name__)
+            for recipes in lexical_only:
+                for recipe in recipes:
+                    recipe.fallback = f"lexical only: {reason}"
+            return lexical_only
+
+        results = []
+        for q_lexical_ids, q_dense_ids, q_dense_metas in zip(lexical_ids, dense_ids, dense_metadatas):
+            fused_ids = reciprocal_rank_fusion([q_dense_ids, q_lexical_ids])[:n]
+
+            # Metadata for each fused id, from whichever ranker returned it
+            metadata_by_id = dict(zip(q_lexical_ids, lexical.metadatas(q_lexical_ids)))
+            metadata_by_id.update(zip(q_dense_ids, q_dense_metas))
+            results.append(self._to_recipes([metadata_by_id[recipe_id] for recipe_id in fused_ids]))
+
+        return results
+
+    def retrieve_by_ingredients(
+        self,
+        user_ingredients,
+        query: str = "",
+        n: int = 10,
+        candidates: int = 50,
+    ) -> List[Recipe]:
+        """
+        Retrieve recipes that match as many of the user's on-hand ingredients
+        as possible. Embeddings are used only as a secondary reranker.
+
+        `user_ingredients` is a list of ingredients or a free-text ingredient string.
+        """
+        query = query or (user_ingredients if isinstance(user_ingredients, str) else ", ".join(user_ingredients))
+
+        # 1. Top overlap candidates from the inverted index (posting list intersection)
+        index = self.ingredient_index
+        scored = index.top_overlap(user_ingredients, k=candidates) if index is not None else []
+
+        # If nothing matches (or no index was built), fall back to the default retrieval
+        if not scored:
+            return self.retrieve(query, n, RETRIEVAL_MODE)
+
+        # 2. Embedding search restricted to the candidates
+        candidate_ids = [recipe_id for recipe_id, _ in scored]
+        results = self.collection.query(
+            query_texts=[query],
+            n_results=min(n, len(candidate_ids)),
+            ids=candidate_ids,
+        )
+
+        return self._to_recipes(results["metadatas"][0])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,257 @@
+# retriever_pool.py
+"""
+Process-wide pool of opened Chroma collections and Retriever objects.
+
+Opening `chromadb.PersistentClient`, creating the OpenAI client and resolving the
+`rag_recipes` collection is the largest fixed cost of a retrieval. This module does
+that work once per (vectorstore path, collection name, embedding model) and shares
+the result with every caller (`agents/tools.py`, `query.py`, `Retriever`).
+"""
+import asyncio
+import threading
+import time
+from pathlib import Path
+
+from meal_prep_agent.config import (
+    VECTORSTORE_PATH,
+    CHROMA_DB_NAME,
+    COLLECTION_NAME,
+    EMBEDDING_MODEL,
+    EMBEDDING_CACHE_SIZE,
+    EMBEDDING_CACHE_PATH,
+    EMBEDDING_CACHE_DISK_SIZE,
+    require_api_key,
+)
+from meal_prep_agent.models.embedding_function import create_embedding_function, is_local_model
+from meal_prep_agent.models.cached_embedding import CachedEmbeddingFunction
+from meal_prep_agent.ingredient_index import IngredientIndex, INDEX_FILENAME as INGREDIENT_INDEX_FILENAME
+from meal_prep_agent.lexical_index import LexicalIndex, INDEX_FILENAME as LEXICAL_INDEX_FILENAME
+from meal_prep_agent.matrix_index import MatrixIndex, MATRIX_FILENAME
+
+# Registry state - guarded by `_lock`
+_lock = threading.RLock()
+_clients = {}        # db path -> chromadb.PersistentClient
+_collections = {}    # pool key -> chroma collection
+_retrievers = {}     # pool key -> Retriever
+_embedding_fns = {}  # embedding model -> cached query embedding function
+_local_indexes = {}  # (index file, store path) -> loaded index (or None if not built)
+
+_stats = {
+    "cold_opens": 0,
+    "warm_opens": 0,
+    "cold_open_seconds": 0.0,
+}
+
+
+def pool_key(store_path=VECTORSTORE_PATH, collection_name: str = COLLECTION_NAME,
+             embedding_model: str = EMBEDDING_MODEL) -> tuple:
+    db_path = Path(store_path) / CHROMA_DB_NAME
+    return (str(db_path.resolve()), collection_name, embedding_model)
+
+
+def get_embedding_function(embedding_model: str = EMBEDDING_MODEL):
+    """
+    Shared, cached query embedding function for `embedding_model`.
+    """
+    embedding_fn = _embedding_fns.get(embedding_model)
+    if embedding_fn is not None:
+        return embedding_fn
+
+    with _lock:
+        embedding_fn = _embedding_fns.get(embedding_model)
+        if embedding_fn is None:
+            openai_client = None
+            if not is_local_model(embedding_model):
+                from openai import OpenAI
+                from meal_prep_agent.http_pool import get_http_client
+
+                # Rides the shared connection pool, which outlives this registry
+                openai_client = OpenAI(api_key=require_api_key(), http_client=get_http_client())
+            embedding_fn = CachedEmbeddingFunction(
+                create_embedding_function(embedding_model, openai_client),
+                max_entries=EMBEDDING_CACHE_SIZE,
+                cache_path=EMBEDDING_CACHE_PATH,
+                max_disk_entries=EMBEDDING_CACHE_DISK_SIZE,
+            )
+            _embedding_fns[embedding_model] = embedding_fn
+
+    return embedding_fn
+
+
+def _open_collection(key: tuple):
+    db_path, collection_name, embedding_model = key
+
+    # One PersistentClient per db path, shared across collections
+    client = _clients.get(db_path)
+    if client is None:
+        # chromadb is the heaviest import in the package - only paid on the first open
+        import chromadb
+        from chromadb.config import Settings
+
+        client_settings = Settings(anonymized_telemetry=False)
+        client = chromadb.PersistentClient(path=db_path, settings=client_settings)
+        _clients[db_path] = client
+
+    embedding_fn = get_embedding_function(embedding_model)
+
+    collection = client.get_or_create_collection(
+        name=collection_name,
+        embedding_function=embedding_fn,
+        metadata={"hnsw:space": "cosine"}
+    )
+
+    return collection
+
+
+def get_collection(store_path=VECTORSTORE_PATH, collection_name: str = COLLECTION_NAME,
+                   embedding_model: str = EMBEDDING_MODEL):
+    """
+    Return the shared collection for the given key, opening it on first use.
+    """
+    key = pool_key(store_path, collection_name, embedding_model)
+
+    # Fast path - already opened, no lock needed for a dict read
+    collection = _collections.get(key)
+    if collection is not None:
+        with _lock:
+            _stats["warm_opens"] += 1
+        return collection
+
+    with _lock:
+        # Re-check: another thread may have opened it while we waited
+        collection = _collections.get(key)
+        if collection is not None:
+            _stats["warm_opens"] += 1
+            return collection
+
+        start = time.perf_counter()
+        collection = _open_collection(key)
+        _collections[key] = collection
+        _stats["cold_opens"] += 1
+        _stats["cold_open_seconds"] += time.perf_counter() - start
+
+    return collection
+
+
+def get_retriever(store_path=VECTORSTORE_PATH, collection_name: str = COLLECTION_NAME,
+                  embedding_model: str = EMBEDDING_MODEL):
+    """
+    Return a shared Retriever bound to the pooled collection.
+    """
+    # Imported here as retriever.py uses this module to load its collection
+    from meal_prep_agent.retriever import Retriever
+
+    key = pool_key(store_path, collection_name, embedding_model)
+    retriever = _retrievers.get(key)
+    if retriever is not None:
+        return retriever
+
+    collection = get_collection(store_path, collection_name, embedding_model)
+    with _lock:
+        retriever = _retrievers.get(key)
+        if retriever is None:
+            retriever = Retriever(collection=collection, embedding_model=embedding_model)
+            _retrievers[key] = retriever
+
+    return retriever
+
+
+def _get_local_index(index_cls, filename: str, store_path):
+    # Local (non-chroma) indexes written by `embed.py`, loaded once per store path
+    key = (filename, str(Path(store_path).resolve()))
+    if key in _local_indexes:
+        return _local_indexes[key]
+
+    with _lock:
+        if key not in _local_indexes:
+            index_path = Path(store_path) / filename
+            _local_indexes[key] = index_cls.load(store_path) if index_path.exists() else None
+
+    return _local_indexes[key]
+
+
+def get_ingredient_index(store_path=VECTORSTORE_PATH):
+    """
+    Shared inverted ingredient index for a vectorstore, loaded once.
+    Returns None if `embed.py` has not built one yet.
+    """
+    return _get_local_index(IngredientIndex, INGREDIENT_INDEX_FILENAME, store_path)
+
+
+def get_lexical_index(store_path=VECTORSTORE_PATH):
+    """
+    Shared BM25 index for a vectorstore, loaded once.
+    Returns None if `embed.py` has not built one yet.
+    """
+    return _get_local_index(LexicalIndex, LEXICAL_INDEX_FILENAME, store_path)
+
+
+def get_matrix_index(store_path=VECTORSTORE_PATH):
+    """
+    Shared memory-mapped embedding matrix for a vectorstore, loaded once.
+    Returns None if `embed.py` has not exported one yet.
+    """
+    return _get_local_index(MatrixIndex, MATRIX_FILENAME, store_path)
+
+
+async def aget_retriever(store_path=VECTORSTORE_PATH, collection_name: str = COLLECTION_NAME,
+                         embedding_model: str = EMBEDDING_MODEL):
+    """
+    Async variant of `get_retriever` - a cold open runs in a worker thread so it
+    never blocks the event loop.
+    """
+    retriever = _retrievers.get(pool_key(store_path, collection_name, embedding_model))
+    if retriever is not None:
+        return retriever
+
+    return await asyncio.to_thread(get_retriever, store_path, collection_name, embedding_model)
+
+
+def warm_up(store_path=VECTORSTORE_PATH, collection_name: str = COLLECTION_NAME,
+            embedding_model: str = EMBEDDING_MODEL) -> dict:
+    """
+    Open the collection ahead of the first request. Returns the pool stats.
+    """
+    retriever = get_retriever(store_path, collection_name, embedding_model)
+
+    # Touch the collection so chroma loads its segments now rather than on first query
+    retriever.collection.count()
+
+    return pool_stats()
+
+
+def shutdown() -> None:
+    """
+    Drop every pooled collection and close the underlying clients.
+    The HTTP pool is shared with the agents - `http_pool.close_http_client()` closes it.
+    """
+    with _lock:
+        for embedding_fn in _embedding_fns.values():
+            embedding_fn.close()
+
+        for client in _clients.values():
+            client.clear_system_cache()
+
+        _embedding_fns.clear()
+        _retrievers.clear()
+        _local_indexes.clear()
+        _collections.clear()
+        _clients.clear()
+
+
+def pool_stats() -> dict:
+    with _lock:
+        stats = dict(_stats)
+        stats["open_collections"] = len(_collections)
+
+        # Query embedding cache counters summed over every embedding model
+        cache_stats = {}
+        for embedding_fn in _embedding_fns.values():
+            for name, value in embedding_fn.cache_stats().items():
+                cache_stats[name] = cache_stats.get(name, 0) + value
+        stats["embedding_cache"] = cache_stats
+    from meal_prep_agent.http_pool import http_pool_stats
+
+    stats["http"] = http_pool_stats()
+
+    return stats
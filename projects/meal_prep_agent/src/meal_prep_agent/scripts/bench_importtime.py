@@ -0,0 +1,133 @@
+"""
+Benchmark cold import time of the package's entry points with `python -X importtime`.
+
+Each module is imported in a fresh interpreter (best of --repeat runs), without
+OPENAI_API_KEY, and the report lists its cumulative import time plus the heaviest
+packages it pulled in. Modules in DEFERRED (autogen, chromadb, openai, ...) must
+not be imported eagerly - they belong inside the factories that use them.
+
+Run:
+    python -m meal_prep_agent.scripts.bench_importtime
+    python -m meal_prep_agent.scripts.bench_importtime --save importtime.json
+    python -m meal_prep_agent.scripts.bench_importtime --baseline importtime.json   # exit 1 on regression
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+MODULES = [
+    "meal_prep_agent.config",
+    "meal_prep_agent.agents.orchestrator",
+    "meal_prep_agent.retriever_pool",
+    "meal_prep_agent.query",
+]
+
+# Heavy dependencies only needed once an agent, collection or OpenAI client is built
+DEFERRED = ["autogen_agentchat", "autogen_core", "autogen_ext", "chromadb", "openai", "httpx", "pandas", "pyarrow",
+            "opentelemetry"]
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """
+    (module, depth, cumulative microseconds) for each line of `-X importtime` output.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), depth, int(cumulative)))
+    return rows
+
+
+def measure(module: str) -> list[tuple[str, int, int]]:
+    env = {key: value for key, value in os.environ.items() if key != "OPENAI_API_KEY"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr.splitlines()[-1]}")
+    return parse_importtime(result.stderr)
+
+
+def subtree(rows: list[tuple[str, int, int]], module: str) -> list[tuple[str, int, int]]:
+    # Children are printed before their parent, one level deeper - everything the
+    # import of `module` pulled in, without the interpreter's own startup imports
+    end = next(i for i, (name, depth, _) in enumerate(rows) if name == module and depth == 0)
+    start = end
+    while start > 0 and rows[start - 1][1] > 0:
+        start -= 1
+    return rows[start:end + 1]
+
+
+def bench_module(module: str, repeat: int, top: int) -> dict:
+    runs = [subtree(measure(module), module) for _ in range(repeat)]
+    best = min(runs, key=lambda rows: rows[-1][2])
+    total_us = best[-1][2]
+
+    # Third-party / stdlib packages (first name component) by their largest cumulative time
+    own_package = module.split(".")[0]
+    packages = {}
+    for name, _, us in best:
+        package = name.split(".")[0]
+        if package != own_package:
+            packages[package] = max(packages.get(package, 0), us)
+    heaviest = sorted(packages.items(), key=lambda item: -item[1])[:top]
+
+    imported = {name.split(".")[0] for name, _, _ in best}
+    return {
+        "total_ms": round(total_us / 1000, 1),
+        "heaviest": {package: round(us / 1000, 1) for package, us in heaviest},
+        "eager_deferred": sorted(imported & set(DEFERRED)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold import time of the package entry points")
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per module, best is reported")
+    parser.add_argument("--top", type=int, default=5, help="heaviest imported packages to list")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with a saved JSON file, exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown vs the baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    results = {module: bench_module(module, args.repeat, args.top) for module in args.modules}
+
+    print(f"{'module':<40} {'import ms':>10}  heaviest")
+    for module, result in results.items():
+        heaviest = ", ".join(f"{package} {ms}" for package, ms in result["heaviest"].items())
+        print(f"{module:<40} {result['total_ms']:>10.1f}  {heaviest}")
+
+    failures = []
+    for module, result in results.items():
+        if result["eager_deferred"]:
+            failures.append(f"{module} eagerly imports {', '.join(result['eager_deferred'])}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for module, result in results.items():
+            if module not in baseline:
+                continue
+            limit = baseline[module]["total_ms"] * (1 + args.tolerance)
+            if result["total_ms"] > limit:
+                failures.append(f"{module}: {result['total_ms']} ms vs baseline {baseline[module]['total_ms']} ms")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"++ Saved to {args.save}")
+
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
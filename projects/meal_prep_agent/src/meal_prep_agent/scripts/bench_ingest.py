@@ -0,0 +1,87 @@
+"""
+Benchmark the row-by-row preprocessing path against the vectorised / streaming one.
+
+Run:
+    python -m meal_prep_agent.scripts.bench_ingest
+    python -m meal_prep_agent.scripts.bench_ingest --synthetic 100000
+"""
+import argparse
+import ast
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+from meal_prep_agent.config import RAW_DATA_PATH
+from meal_prep_agent.embed import apply_doc_format, apply_metadata_col, generate_id_col
+from meal_prep_agent.ingest import parse_ingredients
+from meal_prep_agent.stream_ingest import prepare_frame, iter_clean_chunks, CHUNK_SIZE
+
+
+def legacy_path(csv_path) -> int:
+    # ingest.clean_df + embed.load_clean_data / generate_*_col as they were (row by row)
+    df = pd.read_csv(csv_path, usecols=["Title", "Cleaned_Ingredients"])
+    df["ingredients"] = df["Cleaned_Ingredients"].apply(parse_ingredients)
+    df = df.rename(columns={"Title": "title"}).dropna(subset=["title", "ingredients"])
+
+    # Round trip through the processed CSV repr, as embed.py does
+    df["ingredients"] = df["ingredients"].map(repr).apply(ast.literal_eval)
+    df["doc"] = df.apply(apply_doc_format, axis=1)
+    df["metadata"] = df.apply(apply_metadata_col, axis=1)
+    df = generate_id_col(df)
+    return len(df)
+
+
+def vectorised_path(csv_path) -> int:
+    df = pd.read_csv(csv_path, usecols=["Title", "Cleaned_Ingredients"])
+    return len(prepare_frame(df, "Title", "Cleaned_Ingredients"))
+
+
+def streaming_path(csv_path, chunksize: int) -> int:
+    return sum(len(chunk) for chunk in iter_clean_chunks(csv_path, chunksize))
+
+
+def measure(name: str, fn, *args) -> None:
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = fn(*args)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<12} {rows:>8} rows  {seconds:8.3f}s  peak {peak / 1e6:8.1f} MB")
+
+
+def write_synthetic_csv(path: Path, n_rows: int) -> None:
+    words = ["chicken", "broccoli", "garlic", "olive oil", "lemon", "sugar", "flour", "butter",
+             "strawberries", "basil", "salt", "pepper", "cream", "onion", "o'brien potatoes"]
+    rows = []
+    for i in range(n_rows):
+        ingredients = [f"{random.randint(1, 4)} cup {random.choice(words)}" for _ in range(random.randint(3, 15))]
+        rows.append({"Title": f"Recipe {i}", "Cleaned_Ingredients": repr(ingredients)})
+    pd.DataFrame(rows).to_csv(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--csv", default=str(RAW_DATA_PATH))
+    parser.add_argument("--synthetic", type=int, default=0, help="benchmark on N generated rows instead")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(args.csv)
+        if args.synthetic:
+            csv_path = Path(tmp) / "synthetic.csv"
+            write_synthetic_csv(csv_path, args.synthetic)
+
+        print(f"Benchmarking preprocessing of `{csv_path}`")
+        measure("legacy", legacy_path, csv_path)
+        measure("vectorised", vectorised_path, csv_path)
+        measure("streaming", streaming_path, csv_path, args.chunksize)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark compact embedding matrices: size, search latency and recall@k against
+exact full-precision search, for each quantisation and Matryoshka truncation.
+
+Run:
+    python -m meal_prep_agent.scripts.bench_quantization                 # existing vectorstore
+    python -m meal_prep_agent.scripts.bench_quantization --synthetic 20000
+
+Synthetic vectors are clustered (so nearest neighbours are meaningful) with a
+decaying per-dimension variance so that, like real text-embedding-3 vectors,
+most of the signal sits in the leading dimensions.
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from meal_prep_agent.config import VECTORSTORE_PATH, CHROMA_DB_NAME, COLLECTION_NAME
+from meal_prep_agent.matrix_index import MatrixIndex, QUANTIZATIONS, collection_vectors, write_matrix, recall_at_k
+
+
+def load_vectors(store_path: Path):
+    import chromadb
+    from chromadb.config import Settings
+
+    client = chromadb.PersistentClient(path=str(store_path / CHROMA_DB_NAME), settings=Settings(anonymized_telemetry=False))
+    return collection_vectors(client.get_collection(COLLECTION_NAME))
+
+
+def synthetic_vectors(n_rows: int, dim: int):
+    rng = np.random.default_rng(0)
+    centres = rng.standard_normal((max(1, n_rows // 100), dim))
+    vectors = centres[rng.integers(len(centres), size=n_rows)] + 0.7 * rng.standard_normal((n_rows, dim))
+    vectors = (vectors / np.sqrt(1 + np.arange(dim) / 64)).astype(np.float32)
+    ids = [str(i) for i in range(n_rows)]
+    return ids, [f"recipe {i}" for i in ids], ["[]"] * n_rows, vectors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--store", default=str(VECTORSTORE_PATH))
+    parser.add_argument("--synthetic", type=int, default=0, help="benchmark N generated vectors instead")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--dimensions", type=int, nargs="*", default=[0, 512, 256],
+                        help="Matryoshka truncations to try (0 = full width)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        ids, titles, ingredients, vectors = synthetic_vectors(args.synthetic, args.dim)
+    else:
+        ids, titles, ingredients, vectors = load_vectors(Path(args.store))
+
+    print(f"{len(vectors)} vectors x {vectors.shape[1]} dims, {args.queries} queries, k={args.k}")
+    print(f"{'format':<10} {'dims':>5} {'MB':>8} {'p50 ms':>8} {'recall@k':>9}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for dimensions in args.dimensions:
+            for quantization in QUANTIZATIONS:
+                path = write_matrix(tmp, ids, titles, ingredients, vectors, quantization, dimensions or None)
+                index = MatrixIndex.load(tmp)
+
+                queries = vectors[:args.queries]
+                latencies = []
+                for query in queries:
+                    start = time.perf_counter()
+                    index.search(query, args.k)
+                    latencies.append((time.perf_counter() - start) * 1000)
+
+                recall = recall_at_k(vectors, index, k=args.k, n_queries=args.queries)
+                size_mb = path.stat().st_size / 1e6
+                print(f"{quantization:<10} {index.dimensions:>5} {size_mb:8.1f} {np.median(latencies):8.2f} {recall:9.3f}")
+
+
+if __name__ == "__main__":
+    main()
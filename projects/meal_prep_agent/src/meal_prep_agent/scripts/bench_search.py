@@ -0,0 +1,116 @@
+"""
+Benchmark dense search latency and memory: Chroma vs the memory-mapped matrix backend.
+
+Each backend runs in its own process, so the RSS numbers are not polluted by the
+others. Query vectors are perturbed copies of stored embeddings - no API calls.
+
+Run:
+    python -m meal_prep_agent.scripts.bench_search                 # existing vectorstore
+    python -m meal_prep_agent.scripts.bench_search --synthetic 20000
+"""
+import argparse
+import multiprocessing as mp
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from meal_prep_agent.config import VECTORSTORE_PATH, CHROMA_DB_NAME, COLLECTION_NAME
+from meal_prep_agent.matrix_index import MatrixIndex, export_matrix, normalise_rows
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def open_collection(store_path: Path):
+    import chromadb
+    from chromadb.config import Settings
+
+    client = chromadb.PersistentClient(path=str(store_path / CHROMA_DB_NAME), settings=Settings(anonymized_telemetry=False))
+    return client.get_collection(COLLECTION_NAME)
+
+
+def run_backend(name: str, store_path: Path, queries: np.ndarray, k: int, result_queue) -> None:
+    start_rss = rss_mb()
+
+    if name == "chroma":
+        collection = open_collection(store_path)
+        search = lambda q: collection.query(query_embeddings=[q.tolist()], n_results=k, include=["metadatas"])
+    else:
+        index = MatrixIndex.load(store_path / name)
+        nprobe = 8 if name == "ivf" else None
+        search = lambda q: index.search(q, k, nprobe=nprobe)
+
+    search(queries[0])   # warm-up (page in, open segments)
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    result_queue.put((name, np.percentile(latencies, 50), np.percentile(latencies, 95), rss_mb() - start_rss))
+
+
+def build_synthetic_store(store_path: Path, n_rows: int, dim: int) -> None:
+    import chromadb
+    from chromadb.config import Settings
+
+    client = chromadb.PersistentClient(path=str(store_path / CHROMA_DB_NAME), settings=Settings(anonymized_telemetry=False))
+    collection = client.create_collection(COLLECTION_NAME, metadata={"hnsw:space": "cosine"})
+    rng = np.random.default_rng(0)
+    for start in range(0, n_rows, 5000):
+        size = min(5000, n_rows - start)
+        collection.add(
+            ids=[str(i) for i in range(start, start + size)],
+            embeddings=normalise_rows(rng.standard_normal((size, dim))),
+            metadatas=[{"title": f"recipe {i}", "ingredients": "[]"} for i in range(start, start + size)],
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--store", default=str(VECTORSTORE_PATH))
+    parser.add_argument("--synthetic", type=int, default=0, help="benchmark a generated store with N rows")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store_path = Path(args.store)
+        if args.synthetic:
+            store_path = Path(tmp)
+            build_synthetic_store(store_path, args.synthetic, args.dim)
+
+        # Export each matrix variant into its own sub-directory
+        collection = open_collection(store_path)
+        for variant, quantization in [("float32", "float32"), ("float16", "float16"), ("ivf", "float16")]:
+            (store_path / variant).mkdir(exist_ok=True)
+            export_matrix(collection, store_path / variant, quantization=quantization)
+        MatrixIndex.load(store_path / "ivf").build_ivf(store_path / "ivf")
+
+        stored = np.load(store_path / "float32" / "embeddings.npy", mmap_mode="r")
+        rng = np.random.default_rng(1)
+        rows = rng.choice(len(stored), size=args.queries)
+        queries = normalise_rows(stored[rows] + 0.05 * rng.standard_normal((args.queries, stored.shape[1])))
+
+        print(f"{len(stored)} vectors x {stored.shape[1]} dims, {args.queries} queries, k={args.k}")
+        print(f"{'backend':<10} {'p50 ms':>8} {'p95 ms':>8} {'RSS +MB':>9}")
+        ctx = mp.get_context("spawn")
+        result_queue = ctx.Queue()
+        for name in ["chroma", "float32", "float16", "ivf"]:
+            proc = ctx.Process(target=run_backend, args=(name, store_path, queries, args.k, result_queue))
+            proc.start()
+            proc.join()
+            name, p50, p95, rss = result_queue.get()
+            print(f"{name:<10} {p50:8.2f} {p95:8.2f} {rss:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
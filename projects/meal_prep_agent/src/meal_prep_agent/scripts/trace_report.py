@@ -0,0 +1,120 @@
+"""
+Summarise a trace file written by `tracing.py` (TRACE_EXPORTER = "jsonl").
+
+Per span name: count, p50 / p95 / max latency, errors, cancellations, token usage
+and cache outcomes. Then the slow tail: for root spans (`pipeline.run` by default)
+at or above their p95 latency, the share of the run spent in each child stage,
+next to the same share over all runs - the stage whose share grows in the tail is
+the one that dominates p95. Children can overlap (the critic runs alongside the
+grounding check), so shares need not add up to 100%.
+
+Run:
+    python -m meal_prep_agent.scripts.trace_report                     # config.TRACE_PATH
+    python -m meal_prep_agent.scripts.trace_report traces/spans.jsonl --root pipeline.run
+"""
+import argparse
+import json
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from meal_prep_agent.config import TRACE_PATH
+
+TOKEN_ATTRIBUTES = ("prompt_tokens", "completion_tokens", "total_tokens", "tokens_saved")
+CACHE_ATTRIBUTES = ("cache", "response_cache")
+
+
+def load_spans(path) -> list[dict]:
+    spans = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                spans.append(json.loads(line))
+            except ValueError:
+                continue   # partial last line of a trace still being written
+    return spans
+
+
+def span_summary(spans: list[dict]) -> dict:
+    by_name = defaultdict(list)
+    for s in spans:
+        by_name[s["name"]].append(s)
+
+    summary = {}
+    for name, group in by_name.items():
+        durations = np.array([s["duration_ms"] for s in group])
+        tokens = {key: sum(s["attributes"].get(key, 0) for s in group) for key in TOKEN_ATTRIBUTES}
+        cache = Counter(s["attributes"][key] for s in group for key in CACHE_ATTRIBUTES if key in s["attributes"])
+        cache_hits = sum(s["attributes"].get("cache_hits", 0) for s in group)
+        cache_misses = sum(s["attributes"].get("cache_misses", 0) for s in group)
+        if cache_hits or cache_misses:
+            cache.update(hit=cache_hits, miss=cache_misses)
+        summary[name] = {
+            "count": len(group),
+            "p50_ms": round(float(np.percentile(durations, 50)), 1),
+            "p95_ms": round(float(np.percentile(durations, 95)), 1),
+            "max_ms": round(float(durations.max()), 1),
+            "errors": sum(s["status"] == "ERROR" for s in group),
+            "cancelled": sum(bool(s["attributes"].get("cancelled")) for s in group),
+            "tokens": {key: value for key, value in tokens.items() if value},
+            "cache": dict(cache),
+        }
+    return summary
+
+
+def stage_shares(spans: list[dict], root: str) -> tuple[dict, dict, int]:
+    """
+    (share of run time per child stage over all `root` spans, the same over the
+    spans at or above p95, number of spans in that tail)
+    """
+    roots = [s for s in spans if s["name"] == root and s["duration_ms"] > 0]
+    if not roots:
+        return {}, {}, 0
+    children = defaultdict(list)
+    for s in spans:
+        if s["parent_id"] is not None:
+            children[s["parent_id"]].append(s)
+
+    def shares(runs: list[dict]) -> dict:
+        totals = Counter()
+        for run in runs:
+            for child in children[run["span_id"]]:
+                totals[child["name"]] += child["duration_ms"] / run["duration_ms"]
+        return {name: round(total / len(runs), 3) for name, total in totals.most_common()}
+
+    threshold = np.percentile([s["duration_ms"] for s in roots], 95)
+    tail = [s for s in roots if s["duration_ms"] >= threshold]
+    return shares(roots), shares(tail), len(tail)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage latency from a tracing JSONL file")
+    parser.add_argument("path", nargs="?", default=str(TRACE_PATH))
+    parser.add_argument("--root", default="pipeline.run", help="span name of one end-to-end run")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args()
+
+    spans = load_spans(args.path)
+    summary = span_summary(spans)
+    overall, tail, tail_runs = stage_shares(spans, args.root)
+    if args.json:
+        print(json.dumps({"spans": summary, "stage_share": overall, "stage_share_p95": tail}, indent=2))
+        return
+
+    print(f"{len(spans)} spans from {args.path}")
+    print(f"{'span':<32} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'err':>4} {'cxl':>4}  tokens / cache")
+    for name, row in sorted(summary.items(), key=lambda item: -item[1]["p95_ms"]):
+        extras = " ".join(f"{key}={value}" for key, value in {**row["tokens"], **row["cache"]}.items())
+        print(f"{name:<32} {row['count']:>6} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['max_ms']:>9.1f} "
+              f"{row['errors']:>4} {row['cancelled']:>4}  {extras}")
+
+    if not overall:
+        return
+    print("---")
+    print(f"Share of `{args.root}` time per stage: all runs vs the {tail_runs} run(s) at or above p95")
+    for name in sorted(overall, key=lambda stage: -tail.get(stage, 0)):
+        print(f"{name:<32} {overall[name]:>8.1%} {tail.get(name, 0):>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
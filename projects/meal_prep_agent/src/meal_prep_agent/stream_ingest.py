@@ -0,0 +1,169 @@
+# stream_ingest.py
+"""
+Vectorised, chunked preprocessing for recipe CSVs.
+
+The row-by-row path (`ast.literal_eval` through `DataFrame.apply`, then
+`df.apply(axis=1)` for the doc/metadata columns) builds a Python object per row and
+dominates preprocessing on larger corpora. Here:
+- ingredient lists are parsed with a single `json.loads` per chunk, after one
+  normalisation pass that turns the Python list repr into JSON
+- `doc` and `metadata` are built with vectorised string ops / plain comprehensions
+- the CSV is read in chunks, so the full frame is never materialised
+"""
+import ast
+import json
+import re
+
+import pandas as pd
+
+from meal_prep_agent.config import RAW_DATA_PATH
+from meal_prep_agent.index_manifest import recipe_id
+from meal_prep_agent.batching import token_batches
+
+CHUNK_SIZE = 2000
+
+
+def _clean_list(value) -> list:
+    return [i.strip() for i in value if isinstance(i, str) and i.strip()]
+
+
+def _literal_eval_list(value):
+    # Slow path, same semantics as `ingest.parse_ingredients`
+    if isinstance(value, list):
+        return _clean_list(value)
+    if isinstance(value, str):
+        try:
+            parsed = ast.literal_eval(value)
+        except Exception:
+            return []
+        if isinstance(parsed, list):
+            return _clean_list(parsed)
+    return None
+
+
+# A double-quoted or single-quoted string literal inside a list repr
+_REPR_STRING = re.compile(r""""[^"]*"|'[^']*'""")
+
+
+def _requote(match) -> str:
+    token = match.group(0)
+    if token[0] == '"':
+        return token
+    return '"' + token[1:-1] + '"'
+
+
+def _json_parse_all(texts: list[str]):
+    # One json.loads for many rows; None if any row is not valid JSON
+    try:
+        return json.loads("[" + ",".join(texts) + "]")
+    except json.JSONDecodeError:
+        return None
+
+
+def parse_ingredient_series(values: pd.Series) -> pd.Series:
+    """
+    Parse a column of Python list reprs (e.g. "['1 cup sugar', '2 eggs']") into lists.
+
+    Without backslash escapes, a repr only quotes with `'` (string has no `'`) or
+    `"` (string has a `'` but no `"`), so it converts to JSON by re-quoting the
+    single-quoted strings:
+    - rows with no `"` at all: a plain vectorised quote swap
+    - rows with `"`: one regex pass that only re-quotes the single-quoted strings
+    Each group is then parsed with a single `json.loads`; rows with escapes (or that
+    fail to parse) fall back to `ast.literal_eval`.
+    """
+    values = values.reset_index(drop=True)
+    strings = values[values.map(lambda v: isinstance(v, str))].astype(str)
+    strings = strings[strings.str.startswith("[") & ~strings.str.contains("\\", regex=False)]
+    has_double = strings.str.contains('"', regex=False)
+
+    plain = strings[~has_double]
+    quoted = strings[has_double]
+    groups = [
+        (plain.index, plain.str.replace("'", '"', regex=False).tolist()),
+        (quoted.index, [_REPR_STRING.sub(_requote, v) for v in quoted]),
+    ]
+
+    parsed = [None] * len(values)
+    done = set()
+    for positions, texts in groups:
+        lists = _json_parse_all(texts)
+        if lists is None:
+            continue
+        for pos, value in zip(positions, lists):
+            parsed[pos] = _clean_list(value)
+            done.add(pos)
+
+    # Slow path for escaped strings, non-list values and anything json rejected
+    for pos in values.index:
+        if pos not in done:
+            parsed[pos] = _literal_eval_list(values[pos])
+
+    return pd.Series(parsed, dtype=object)
+
+
+def build_doc_series(titles: pd.Series, ingredients: pd.Series) -> pd.Series:
+    # Vectorised equivalent of `embed.apply_doc_format`
+    joined = pd.Series([",".join(i) for i in ingredients], index=titles.index)
+    return "title: " + titles.str.lower() + "\n\ningredients: " + joined.str.lower()
+
+
+def build_metadata_list(titles: pd.Series, ingredients: pd.Series) -> list:
+    # Equivalent of `embed.apply_metadata_col`, without building a Series per row
+    return [
+        {"title": title, "ingredients": json.dumps(ingr)}
+        for title, ingr in zip(titles, ingredients)
+    ]
+
+
+def prepare_frame(df: pd.DataFrame, title_col: str = "title", ingredients_col: str = "ingredients",
+                  seen_ids: set = None) -> pd.DataFrame:
+    """
+    Clean one frame/chunk and add the `doc`, `metadata` and `id` columns.
+
+    `seen_ids` is shared across chunks so duplicates are dropped corpus-wide.
+    """
+    out = pd.DataFrame({
+        "title": df[title_col].reset_index(drop=True),
+        "ingredients": parse_ingredient_series(df[ingredients_col]),
+    })
+    out = out.dropna(subset=["title", "ingredients"]).reset_index(drop=True)
+
+    out["doc"] = build_doc_series(out["title"], out["ingredients"])
+    out["metadata"] = build_metadata_list(out["title"], out["ingredients"])
+    out["id"] = [recipe_id(t, i) for t, i in zip(out["title"], out["ingredients"])]
+
+    if seen_ids is None:
+        seen_ids = set()
+    keep = []
+    for id_ in out["id"]:
+        keep.append(id_ not in seen_ids)
+        seen_ids.add(id_)
+
+    return out[keep].reset_index(drop=True)
+
+
+def iter_clean_chunks(csv_path=RAW_DATA_PATH, chunksize: int = CHUNK_SIZE,
+                      title_col: str = "Title", ingredients_col: str = "Cleaned_Ingredients"):
+    """
+    Stream a recipe CSV as cleaned chunks with `title`, `ingredients`, `doc`,
+    `metadata` and `id` columns. Defaults read the raw dataset; pass
+    `title_col="title", ingredients_col="ingredients"` for the processed CSV.
+    """
+    seen_ids = set()
+    reader = pd.read_csv(csv_path, usecols=[title_col, ingredients_col], chunksize=chunksize)
+    for chunk in reader:
+        yield prepare_frame(chunk, title_col, ingredients_col, seen_ids)
+
+
+def iter_ready_batches(csv_path=RAW_DATA_PATH, chunksize: int = CHUNK_SIZE, **columns):
+    """
+    Yield ready-to-embed (docs, ids, metadatas, n_tokens) batches, packed by token
+    count within each chunk.
+    """
+    for df in iter_clean_chunks(csv_path, chunksize, **columns):
+        docs = df["doc"].tolist()
+        ids = df["id"].tolist()
+        metas = df["metadata"].tolist()
+        for start, end, n_tokens in token_batches(docs):
+            yield docs[start:end], ids[start:end], metas[start:end], n_tokens
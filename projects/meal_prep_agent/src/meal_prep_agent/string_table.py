@@ -0,0 +1,43 @@
+# string_table.py
+"""
+Compact string column for the local indexes (ids, titles, ingredient JSON, vocab).
+
+NumPy `dtype=str` arrays are fixed-width UCS4: every entry is padded to the
+longest one at 4 bytes per character. A `StringTable` is one UTF-8 byte blob plus
+row offsets, so an entry costs its encoded length, and is decoded only when read.
+
+Saved into the index's .npz as two arrays, `<name>_utf8` and `<name>_offsets`.
+"""
+import numpy as np
+
+
+class StringTable:
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob        # uint8, every entry's UTF-8 bytes back to back
+        self.offsets = offsets  # int64, entry i is blob[offsets[i]:offsets[i + 1]]
+
+    @classmethod
+    def from_strings(cls, strings) -> "StringTable":
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> str:
+        return self.blob[self.offsets[row]:self.offsets[row + 1]].tobytes().decode("utf-8")
+
+    def tolist(self) -> list[str]:
+        data = self.blob.tobytes()
+        bounds = self.offsets.tolist()
+        return [data[start:end].decode("utf-8") for start, end in zip(bounds, bounds[1:])]
+
+    def arrays(self, name: str) -> dict:
+        # Entries for np.savez: `np.savez(path, **table.arrays("ids"), ...)`
+        return {f"{name}_utf8": self.blob, f"{name}_offsets": self.offsets}
+
+    @classmethod
+    def from_npz(cls, data, name: str) -> "StringTable":
+        return cls(data[f"{name}_utf8"], data[f"{name}_offsets"])
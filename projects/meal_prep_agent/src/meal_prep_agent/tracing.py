@@ -0,0 +1,185 @@
+"""
+Tracing for the pipeline: OpenTelemetry-compatible spans around retrieval,
+embeddings, LLM calls, tool calls and each agent stage, recording latency plus
+token usage, cache hits and result counts as span attributes.
+
+`config.TRACE_EXPORTER` picks where finished spans go:
+- None (default): tracing off, `span` does nothing
+- "jsonl": one JSON line per span appended to `TRACE_PATH` (trace / span / parent
+  ids in OpenTelemetry's hex format, start and end in unix nanoseconds, status and
+  attributes), rotated at `TRACE_MAX_BYTES`; `scripts/trace_report.py` turns it
+  into per-stage p50 / p95
+- "console": the same JSON lines on stderr
+- "otel": through the OpenTelemetry API (`pip install meal_prep_agent[tracing]`), to
+  whatever tracer provider and exporter the application set up (OTLP, console, ...)
+
+Query text is user input, so spans carry only its length and a hash
+(`text_attributes`) unless `TRACE_QUERY_TEXT` is on.
+
+Spans nest through a context variable, so a span opened inside another - across
+`await`, `asyncio.create_task` and `asyncio.to_thread` too - becomes its child.
+"""
+import asyncio
+import contextvars
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from meal_prep_agent.config import TRACE_EXPORTER, TRACE_MAX_BYTES, TRACE_PATH, TRACE_QUERY_TEXT
+
+_current_span = contextvars.ContextVar("meal_prep_span", default=None)
+_export_lock = threading.Lock()
+_trace_file = None
+
+
+class Span:
+    def __init__(self, name: str, parent, attributes: dict):
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.status = "UNSET"
+        self.attributes = {}
+        self.set_attributes(attributes)
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    def set_attribute(self, key: str, value) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, attributes: dict) -> None:
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.status = "ERROR"
+        self.attributes["exception.type"] = type(exc).__name__
+        self.attributes["exception.message"] = str(exc)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class _OtelSpan:
+    # `Span`'s interface over an OpenTelemetry span, which rejects None attribute values
+    def __init__(self, span):
+        self._span = span
+
+    def set_attribute(self, key: str, value) -> None:
+        if value is not None:
+            self._span.set_attribute(key, value)
+
+    def set_attributes(self, attributes: dict) -> None:
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+
+class _NoopSpan:
+    def set_attribute(self, key: str, value) -> None:
+        pass
+
+    def set_attributes(self, attributes: dict) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def _export(finished: Span) -> None:
+    global _trace_file
+    line = json.dumps(finished.to_dict(), default=str)
+    with _export_lock:
+        if TRACE_EXPORTER == "console":
+            print(line, file=sys.stderr)
+            return
+        if _trace_file is None:
+            Path(TRACE_PATH).parent.mkdir(parents=True, exist_ok=True)
+            _trace_file = open(TRACE_PATH, "a", encoding="utf-8", buffering=1)   # line buffered
+        _trace_file.write(line + "\n")
+        if _trace_file.tell() > TRACE_MAX_BYTES:
+            # Keep a single previous file, so traces stay under ~2x TRACE_MAX_BYTES on disk
+            _trace_file.close()
+            os.replace(TRACE_PATH, f"{TRACE_PATH}.1")
+            _trace_file = None
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Time the block as a span named `name`, a child of the span it runs in.
+    Yields the span, so results known only at the end (token counts, result
+    counts, cache hits) can be added with `set_attribute`.
+    """
+    if TRACE_EXPORTER is None:
+        yield NOOP_SPAN
+        return
+
+    if TRACE_EXPORTER == "otel":
+        # Imported on first use, so the other exporters don't pay for it at import time
+        try:
+            from opentelemetry import trace as otel_trace
+        except ImportError as exc:
+            raise ImportError("TRACE_EXPORTER = 'otel' needs opentelemetry-api "
+                              "(pip install meal_prep_agent[tracing])") from exc
+        with otel_trace.get_tracer("meal_prep_agent").start_as_current_span(name) as otel_span:
+            # start_as_current_span records exceptions and sets the error status itself
+            current = _OtelSpan(otel_span)
+            current.set_attributes(attributes)
+            yield current
+        return
+
+    current = Span(name, _current_span.get(), attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except (asyncio.CancelledError, GeneratorExit):
+        # Cancelled (e.g. the critic once the grounding check decided) - not a failure
+        current.set_attribute("cancelled", True)
+        raise
+    except Exception as exc:
+        current.record_exception(exc)
+        raise
+    else:
+        current.status = "OK"
+    finally:
+        current.end_ns = time.time_ns()
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # Closed from another context, e.g. an async generator finalised by the event loop
+            pass
+        _export(current)
+
+
+def text_attributes(name: str, text: str) -> dict:
+    # `name` = the text itself with TRACE_QUERY_TEXT, else its length and a short hash
+    # (enough to group repeats of the same query without storing it)
+    if TRACE_QUERY_TEXT:
+        return {name: text}
+    return {f"{name}_chars": len(text), f"{name}_hash": hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]}
+
+
+def usage_attributes(messages) -> dict:
+    # Token usage over an agent run's messages, as reported by the model client
+    usages = [m.models_usage for m in messages if getattr(m, "models_usage", None) is not None]
+    return {
+        "llm_calls": len(usages),
+        "prompt_tokens": sum(u.prompt_tokens for u in usages),
+        "completion_tokens": sum(u.completion_tokens for u in usages),
+    }
@@ -0,0 +1,211 @@
+"""
+arxiv_client.py
+===============
+
+Pooled, cached arXiv search for the Literature Review Assistant.
+
+- one process-wide `arxiv.Client` (one HTTP session, kept-alive connections)
+  instead of a new client per tool call
+- result pages of a search are fetched concurrently, and `search_many` fans
+  several sub-queries out in parallel; a shared rate limiter still spaces request
+  *starts* by ARXIV_DELAY_SECONDS, as arXiv's API terms ask, so the overlap comes
+  from arXiv's slow responses rather than from more requests per second
+- query -> paper metadata is cached in SQLite with a TTL, so repeated reviews
+  make no request at all
+
+Offline runs: point ARXIV_QUERY_URL at `arxiv_stub.py`, which replays recorded
+responses (or serves deterministic synthetic ones).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import arxiv
+
+try:
+    from autogen_lab.projects.research_assistant_agent.tracing import span, text_attributes
+except ImportError:  # run directly as a script
+    from tracing import span, text_attributes
+
+# Endpoint format string; e.g. "http://127.0.0.1:8765/api/query?{}" for the stub server
+ARXIV_QUERY_URL = os.getenv("ARXIV_QUERY_URL", arxiv.Client.query_url_format)
+ARXIV_PAGE_SIZE = int(os.getenv("ARXIV_PAGE_SIZE", "50"))
+ARXIV_DELAY_SECONDS = float(os.getenv("ARXIV_DELAY_SECONDS", "3.0"))   # between request starts
+ARXIV_MAX_CONCURRENCY = int(os.getenv("ARXIV_MAX_CONCURRENCY", "4"))
+ARXIV_NUM_RETRIES = 3
+# SQLite cache file ("" disables it) and how long entries stay fresh
+ARXIV_CACHE_PATH = os.getenv("ARXIV_CACHE_PATH", str(Path(__file__).parent / ".cache" / "arxiv_cache.sqlite"))
+ARXIV_CACHE_TTL_SECONDS = float(os.getenv("ARXIV_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+
+def paper_record(result: arxiv.Result) -> Dict:
+    """
+    The compact dict the agents see for one paper.
+    """
+    return {
+        "title": result.title,
+        "authors": [a.name for a in result.authors],
+        "published": result.published.strftime("%Y-%m-%d"),
+        "summary": result.summary,
+        "pdf_url": result.pdf_url,
+    }
+
+
+class RateLimiter:
+    """
+    Spaces request starts at least `interval` seconds apart across threads.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class PooledArxivClient(arxiv.Client):
+    """
+    `arxiv.Client` whose requests (retries included) go through a shared
+    `RateLimiter` instead of the client's own per-instance delay, so it can be
+    used from several threads at once.
+    """
+
+    def __init__(self, limiter: RateLimiter, page_size: int = ARXIV_PAGE_SIZE,
+                 num_retries: int = ARXIV_NUM_RETRIES, query_url_format: str = ARXIV_QUERY_URL):
+        super().__init__(page_size=page_size, delay_seconds=0, num_retries=num_retries)
+        self.limiter = limiter
+        self.query_url_format = query_url_format
+
+    def _parse_feed(self, url: str, first_page: bool = True, _try_index: int = 0):
+        self.limiter.wait()
+        return super()._parse_feed(url, first_page=first_page, _try_index=_try_index)
+
+
+class ArxivCache:
+    """
+    query -> list of paper records, in SQLite, with a TTL.
+    """
+
+    def __init__(self, cache_path: Optional[str], ttl_seconds: float = ARXIV_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.stats = {"hits": 0, "misses": 0, "expired": 0}
+        self._lock = threading.Lock()
+        self._db = None
+        if cache_path:
+            Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(cache_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS searches (key TEXT PRIMARY KEY, papers TEXT, created REAL)")
+            self._db.commit()
+
+    @staticmethod
+    def key(query: str, max_results: int, sort_by: str) -> str:
+        normalised = " ".join(query.lower().split())
+        return hashlib.sha256(f"{normalised}\0{max_results}\0{sort_by}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        if self._db is None:
+            return None
+        with self._lock:
+            row = self._db.execute("SELECT papers, created FROM searches WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            if time.time() - row[1] > self.ttl_seconds:
+                self.stats["expired"] += 1
+                return None
+            self.stats["hits"] += 1
+            return json.loads(row[0])
+
+    def put(self, key: str, papers: List[Dict]) -> None:
+        if self._db is None:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO searches (key, papers, created) VALUES (?, ?, ?)",
+                (key, json.dumps(papers), time.time()),
+            )
+            self._db.commit()
+
+
+_client: Optional[PooledArxivClient] = None
+_cache: Optional[ArxivCache] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_init_lock = threading.Lock()
+
+
+def _shared():
+    # Client, cache and page-fetch threads, created once per process
+    global _client, _cache, _executor
+    if _client is None:
+        with _init_lock:
+            if _client is None:
+                _cache = ArxivCache(ARXIV_CACHE_PATH or None)
+                _executor = ThreadPoolExecutor(max_workers=ARXIV_MAX_CONCURRENCY, thread_name_prefix="arxiv")
+                _client = PooledArxivClient(RateLimiter(ARXIV_DELAY_SECONDS))
+    return _client, _cache, _executor
+
+
+def _fetch_page(client: PooledArxivClient, query: str, start: int, size: int, sort_by) -> List[Dict]:
+    # One request: results [start, start + size) - page_size >= size, so no further paging
+    search = arxiv.Search(query=query, max_results=start + size, sort_by=sort_by)
+    return [paper_record(result) for result in client.results(search, offset=start)]
+
+
+def search_papers(query: str, max_results: int = 5,
+                  sort_by: arxiv.SortCriterion = arxiv.SortCriterion.Relevance) -> List[Dict]:
+    """
+    Up to `max_results` paper records for `query`, from the cache when fresh.
+    Pages of ARXIV_PAGE_SIZE results are requested concurrently.
+    """
+    client, cache, executor = _shared()
+    with span("arxiv.search", **text_attributes("query", query), max_results=max_results) as search_span:
+        key = cache.key(query, max_results, sort_by.value)
+        papers = cache.get(key)
+        if papers is not None:
+            search_span.set_attributes({"cache": "hit", "result_count": len(papers)})
+            return papers
+
+        starts = range(0, max_results, client.page_size)
+        futures = [
+            executor.submit(_fetch_page, client, query, start, min(client.page_size, max_results - start), sort_by)
+            for start in starts
+        ]
+        papers = [paper for future in futures for paper in future.result()]
+        cache.put(key, papers)
+        search_span.set_attributes({"cache": "miss", "pages": len(starts), "result_count": len(papers)})
+    return papers
+
+
+async def search_papers_async(query: str, max_results: int = 5) -> List[Dict]:
+    return await asyncio.to_thread(search_papers, query, max_results)
+
+
+async def search_many(queries: List[str], max_results: int = 5) -> Dict[str, List[Dict]]:
+    """
+    Several sub-queries in parallel, returned per query.
+    """
+    results = await asyncio.gather(*(search_papers_async(query, max_results) for query in queries))
+    return dict(zip(queries, results))
+
+
+def cache_stats() -> Dict:
+    _, cache, _ = _shared()
+    with cache._lock:
+        return dict(cache.stats)
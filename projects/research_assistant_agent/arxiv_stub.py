@@ -0,0 +1,145 @@
+"""
+arxiv_stub.py
+=============
+
+Local stand-in for the arXiv query API, for offline runs and load tests of the
+search tool.
+
+Responses are stored under `fixtures/arxiv/`, one Atom file per
+(search_query, sortBy, start, max_results). Three modes:
+
+- replay (default): serve the recorded file; unknown requests get an empty feed
+- --record: forward unknown requests to arXiv once and save the response
+- --synthetic: answer unknown requests with deterministic made-up papers
+  (titles say "Synthetic paper"), e.g. for load tests
+
+Run:
+    python arxiv_stub.py --port 8765 [--record | --synthetic] [--latency 0.5]
+    ARXIV_QUERY_URL="http://127.0.0.1:8765/api/query?{}" python autogen_backend.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+
+ARXIV_URL = "https://export.arxiv.org/api/query?{}"
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "arxiv"
+
+FEED_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/" '
+    'xmlns:arxiv="http://arxiv.org/schemas/atom">\n'
+    "<title>arXiv Query</title>\n"
+    "<opensearch:totalResults>{total}</opensearch:totalResults>\n"
+    "<opensearch:startIndex>{start}</opensearch:startIndex>\n"
+    "<opensearch:itemsPerPage>{size}</opensearch:itemsPerPage>\n"
+)
+
+ENTRY = """<entry>
+<id>http://arxiv.org/abs/{arxiv_id}v1</id>
+<updated>2024-01-{day:02d}T00:00:00Z</updated>
+<published>2024-01-{day:02d}T00:00:00Z</published>
+<title>{title}</title>
+<summary>{summary}</summary>
+<author><name>Author {a}</name></author>
+<author><name>Author {b}</name></author>
+<link href="http://arxiv.org/abs/{arxiv_id}v1" rel="alternate" type="text/html"/>
+<link title="pdf" href="http://arxiv.org/pdf/{arxiv_id}v1" rel="related" type="application/pdf"/>
+<arxiv:primary_category term="cs.LG"/>
+<category term="cs.LG"/>
+</entry>
+"""
+
+
+def fixture_path(params: dict) -> Path:
+    key = "\0".join(params.get(name, [""])[0] for name in ("search_query", "sortBy", "start", "max_results"))
+    return FIXTURES_DIR / f"{hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]}.xml"
+
+
+def synthetic_feed(query: str, start: int, size: int, total: int = 200) -> bytes:
+    # Deterministic per (query, position) so repeated runs see the same papers
+    entries = []
+    for i in range(start, min(start + size, total)):
+        digest = int(hashlib.sha256(f"{query}\0{i}".encode("utf-8")).hexdigest(), 16)
+        topic = query.replace("all:", "").strip('"')
+        entries.append(ENTRY.format(
+            arxiv_id=f"2401.{digest % 100000:05d}",
+            day=digest % 28 + 1,
+            title=escape(f"Synthetic paper {i} on {topic}"),
+            summary=escape(f"A deterministic stand-in abstract about {topic} (result {i})."),
+            a=digest % 97,
+            b=digest % 89,
+        ))
+    head = FEED_HEAD.format(total=total, start=start, size=len(entries))
+    return (head + "".join(entries) + "</feed>\n").encode("utf-8")
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    mode = "replay"
+    latency = 0.0
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        path = fixture_path(params)
+
+        if path.exists():
+            body = path.read_bytes()
+        elif self.mode == "record":
+            with urllib.request.urlopen(ARXIV_URL.format(url.query)) as response:
+                body = response.read()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(body)
+        elif self.mode == "synthetic":
+            start = int(params.get("start", ["0"])[0])
+            size = int(params.get("max_results", ["10"])[0])
+            body = synthetic_feed(params.get("search_query", [""])[0], start, size)
+        else:
+            body = FEED_HEAD.format(total=0, start=0, size=0).encode("utf-8") + b"</feed>\n"
+
+        time.sleep(self.latency)   # simulate arXiv's response time
+        self.send_response(200)
+        self.send_header("Content-Type", "application/atom+xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port: int = 8765, mode: str = "replay", latency: float = 0.0) -> ThreadingHTTPServer:
+    """
+    Start the stub in a background thread and return the server (`.shutdown()` to stop).
+    """
+    handler = type("Handler", (StubHandler,), {"mode": mode, "latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the arXiv query API")
+    parser.add_argument("--port", type=int, default=8765)
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--record", action="store_true", help="fetch and save unknown requests from arXiv")
+    group.add_argument("--synthetic", action="store_true", help="serve made-up papers for unknown requests")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before each response")
+    args = parser.parse_args()
+
+    mode = "record" if args.record else "synthetic" if args.synthetic else "replay"
+    server = serve(args.port, mode, args.latency)
+    print(f"arXiv stub ({mode}) on http://127.0.0.1:{server.server_address[1]}/api/query")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -21,9 +21,9 @@ from __future__ import annotations
 import asyncio
 from typing import AsyncGenerator, Dict, List
 
-import arxiv
 from autogen_core.tools import FunctionTool
 from autogen_agentchat.agents import AssistantAgent
+from autogen_agentchat.base import TaskResult
 from autogen_agentchat.messages import (
     TextMessage
 )
@@ -32,6 +32,21 @@ from autogen_ext.models.openai import OpenAIChatCompletionClient
 from dotenv import load_dotenv
 import os
 
+try:
+    from autogen_lab.projects.research_assistant_agent.llm_cache import (
+        LLM_CACHE_ENABLED,
+        CachedChatCompletionClient,
+        get_completion_cache,
+    )
+    from autogen_lab.projects.research_assistant_agent.arxiv_client import search_papers_async, search_many
+    from autogen_lab.projects.research_assistant_agent.rerank import rerank, CANDIDATE_MULTIPLIER
+    from autogen_lab.projects.research_assistant_agent.tracing import span, text_attributes, usage_attributes
+except ImportError:  # run directly as a script
+    from llm_cache import LLM_CACHE_ENABLED, CachedChatCompletionClient, get_completion_cache
+    from arxiv_client import search_papers_async, search_many
+    from rerank import rerank, CANDIDATE_MULTIPLIER
+    from tracing import span, text_attributes, usage_attributes
+
 # Load API Key
 load_dotenv()
 api_key = os.getenv('OPENAI_API_KEY')
@@ -43,57 +58,94 @@ if not api_key:
 # ---
 
 # Arxiv - wrapper to help search for papers in arxiv database
-def arxiv_search(query: str, max_results: int = 5) -> List[Dict]:
+async def arxiv_search(query: str, max_results: int = 5, topic: str = "") -> List[Dict]:
     """
-    Query the arXiv API and return a compact list of papers.
+    Query the arXiv API and return the most relevant papers, compactly.
 
     Parameters
     ----------
     query : str
         Search query string (e.g., "graph neural networks chemistry").
     max_results : int, optional
-        Maximum number of papers to retrieve before filtering.
+        Number of papers to return.
+    topic : str, optional
+        The user's topic, used to rank the candidates (defaults to `query`).
 
     Returns
     -------
     List[Dict]
         Each dictionary contains:
         - title : str
-        - authors : List[str]
+        - authors : List[str] (first three, then "et al.")
         - published : str (YYYY-MM-DD)
-        - summary : str
+        - summary : str (abstract, trimmed)
         - pdf_url : str
+        - relevance : float (cosine similarity to the topic)
 
     Notes
     -----
     This function is wrapped as an AutoGen FunctionTool so that
-    agents can invoke it during tool-use steps.
+    agents can invoke it during tool-use steps. Requests share one pooled
+    client and result pages are fetched concurrently; repeated queries are
+    answered from a local cache (see `arxiv_client.py`).
+
+    CANDIDATE_MULTIPLIER times `max_results` candidates are fetched and
+    reranked locally (see `rerank.py`), so only the top `max_results`
+    deduplicated papers reach the prompt.
+
+    It is a coroutine (blocking work runs in threads) so that its tracing span
+    stays inside the review's trace - FunctionTool runs plain functions in an
+    executor, outside the caller's context.
     """
-    client = arxiv.Client()
-    search = arxiv.Search(
-        query=query,
-        max_results=max_results,
-        sort_by=arxiv.SortCriterion.Relevance,
-    )
-    papers: List[Dict] = []
-    for result in client.results(search):
-        papers.append(
-            {
-                "title": result.title,
-                "authors": [a.name for a in result.authors],
-                "published": result.published.strftime("%Y-%m-%d"),
-                "summary": result.summary,
-                "pdf_url": result.pdf_url,
-            }
-        )
+    with span("tool.arxiv_search", **text_attributes("query", query), max_results=max_results) as tool_span:
+        candidates = await search_papers_async(query, max_results * CANDIDATE_MULTIPLIER)
+        papers = await asyncio.to_thread(rerank, topic or query, candidates, max_results)
+        tool_span.set_attributes({"candidates": len(candidates), "result_count": len(papers)})
+    return papers
+
+
+async def arxiv_search_many(queries: List[str], max_results: int = 5, topic: str = "") -> List[Dict]:
+    """
+    Run several arXiv queries in parallel and rank their papers together.
+
+    Parameters
+    ----------
+    queries : List[str]
+        Sub-queries, e.g. one per facet of the topic.
+    max_results : int, optional
+        Number of papers to return in total.
+    topic : str, optional
+        The user's topic, used to rank the candidates (defaults to the queries).
+
+    Returns
+    -------
+    List[Dict]
+        The top `max_results` papers across all queries, deduplicated
+        (same fields as `arxiv_search`).
+    """
+    per_query = -(-max_results * CANDIDATE_MULTIPLIER // max(len(queries), 1))
+    with span("tool.arxiv_search_many", queries=len(queries), max_results=max_results) as tool_span:
+        results = await search_many(queries, per_query)
+        candidates = [paper for papers in results.values() for paper in papers]
+        papers = await asyncio.to_thread(rerank, topic or " ".join(queries), candidates, max_results)
+        tool_span.set_attributes({"candidates": len(candidates), "result_count": len(papers)})
     return papers
 
 # Wrap arxiv search into FunctionTool
 arxiv_tool = FunctionTool(
     arxiv_search,
     description=(
-        "Searches arXiv and returs up to *max_results* papers, each containing"
-        "title, authors, publication date, abstract, and pdf_url."
+        "Searches arXiv and returns the *max_results* papers most relevant to *topic*, "
+        "deduplicated, each containing title, authors, publication date, abstract, "
+        "pdf_url and a relevance score."
+    )
+)
+
+arxiv_many_tool = FunctionTool(
+    arxiv_search_many,
+    description=(
+        "Searches arXiv for several queries in parallel and returns the "
+        "*max_results* papers most relevant to *topic* across all of them, deduplicated."
     )
 )
 
@@ -117,6 +169,9 @@ def build_team(model: str = 'gpt-4o-mini') -> RoundRobinGroupChat:
         - summarizer : produces a Markdown literature review
     """
     llm_client = OpenAIChatCompletionClient(model=model, api_key=api_key)
+    if LLM_CACHE_ENABLED:
+        # Completions are cached across reviews; identical concurrent requests share one call
+        llm_client = CachedChatCompletionClient(llm_client, model, get_completion_cache())
 
     # Agent that **only** calls the arXiv tool and forwards top-N papers
     search_agent = AssistantAgent(
@@ -124,12 +179,14 @@ def build_team(model: str = 'gpt-4o-mini') -> RoundRobinGroupChat:
         description="Crafts arXiv queries and retrieves candidate papers.",
         system_message=(
             "Given a user topic, think of the best arXiv query and call the "
-            "provided tool. Always fetch five-times the papers requested so "
-            " that you can down-select the most relevant ones. When the tool "
-            " returns, choose exactly the number of papers requested and pass "
-            " them as concise JSON to the summarizer."
+            "provided tool with max_results set to the number of papers requested "
+            "and topic set to the user's topic. The tool already ranks and "
+            "deduplicates the papers, so pass what it returns as concise JSON to "
+            "the summarizer without re-selecting. If the topic has several "
+            "distinct facets, call arxiv_search_many ONCE with one query per facet "
+            "instead of calling arxiv_search repeatedly."
         ),
-        tools=[arxiv_tool],
+        tools=[arxiv_tool, arxiv_many_tool],
         model_client=llm_client,
         reflect_on_tool_use=True,
     )
@@ -175,6 +232,11 @@ async def run_litrev(topic: str, num_papers: int = 5, model: str = 'gpt-4o-mini'
     ------
     str
         Streaming messages in the format: "agent_name: content"
+
+    Notes
+    -----
+    The run is traced as a `litrev.run` span (see `tracing.py`) with the team's
+    total token usage; tool calls, arXiv searches and LLM calls are its children.
     """
 
     team = build_team(model=model)
@@ -182,9 +244,13 @@ async def run_litrev(topic: str, num_papers: int = 5, model: str = 'gpt-4o-mini'
         f"Conduct a literature review on **{topic}** and return exactly {num_papers} papers."
     )
 
-    async for msg in team.run_stream(task=task_prompt):
-        if isinstance(msg, TextMessage):
-            yield f"{msg.source}: {msg.content}"
+    with span("litrev.run", **text_attributes("topic", topic), num_papers=num_papers, model=model) as run_span:
+        async for msg in team.run_stream(task=task_prompt):
+            if isinstance(msg, TaskResult):
+                run_span.set_attributes(usage_attributes(msg.messages))
+                run_span.set_attribute("messages", len(msg.messages))
+            elif isinstance(msg, TextMessage):
+                yield f"{msg.source}: {msg.content}"
 
 
 # ---
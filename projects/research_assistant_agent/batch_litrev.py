@@ -0,0 +1,205 @@
+"""
+batch_litrev.py
+===============
+
+Batch mode for the Literature Review Assistant: run `run_litrev` over a file of
+topics, several at a time.
+
+- at most `concurrency` reviews run at once (semaphore), and new runs start no
+  faster than `runs_per_minute`
+- each run has a timeout; a timed-out or failed run is recorded and the batch
+  carries on
+- results are appended to a JSONL file as each run finishes (flushed and
+  fsynced), so a crash loses at most the runs in flight
+- re-running with the same output file resumes: topics already reviewed
+  successfully are skipped, failed ones are retried
+
+Topics file: one topic per line, or JSONL with {"topic": ..., "num_papers": ...}.
+
+Run:
+    python batch_litrev.py topics.txt --out reviews.jsonl --concurrency 4 --timeout 600
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+try:
+    from autogen_lab.projects.research_assistant_agent.autogen_backend import run_litrev
+except ImportError:  # run directly as a script
+    from autogen_backend import run_litrev
+
+
+def topic_id(topic: str, num_papers: int, model: str) -> str:
+    normalised = " ".join(topic.lower().split())
+    return hashlib.sha1(f"{normalised}\0{num_papers}\0{model}".encode("utf-8")).hexdigest()[:16]
+
+
+def read_topics(path: str, num_papers: int) -> List[Dict]:
+    """
+    [{"topic", "num_papers"}, ...] from a text file (one topic per line) or JSONL.
+    """
+    topics = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("{"):
+            record = json.loads(line)
+            topics.append({"topic": record["topic"], "num_papers": int(record.get("num_papers", num_papers))})
+        else:
+            topics.append({"topic": line, "num_papers": num_papers})
+    return topics
+
+
+def completed_ids(out_path: str) -> Set[str]:
+    """
+    Ids of runs that already succeeded in `out_path` - a line cut short by a crash is ignored.
+    """
+    done = set()
+    if not os.path.exists(out_path):
+        return done
+    with open(out_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("status") == "ok":
+                done.add(record["id"])
+    return done
+
+
+class StartLimiter:
+    """
+    Lets at most `per_minute` runs start per minute, evenly spaced.
+    """
+
+    def __init__(self, per_minute: Optional[float]):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        async with self._lock:
+            delay = self._next - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next = time.monotonic() + self.interval
+
+
+async def _review(topic: str, num_papers: int, model: str) -> List[str]:
+    return [line async for line in run_litrev(topic, num_papers=num_papers, model=model)]
+
+
+async def run_batch(
+    topics: Iterable[Dict],
+    out_path: str,
+    model: str = "gpt-4o-mini",
+    concurrency: int = 4,
+    timeout: float = 600.0,
+    runs_per_minute: Optional[float] = None,
+) -> Dict:
+    """
+    Review every topic not already done in `out_path`, appending one JSON record
+    per run: id, topic, num_papers, model, status ("ok", "timeout" or "error"),
+    review (the summarizer's last message), messages, seconds and error.
+
+    Returns a summary: counts per status, skipped, wall seconds and reviews/minute.
+    """
+    topics = list(topics)
+    done = completed_ids(out_path)
+    pending = []
+    for item in topics:
+        run_id = topic_id(item["topic"], item["num_papers"], model)
+        if run_id not in done:
+            done.add(run_id)   # also de-duplicates repeated topics within the file
+            pending.append(dict(item, id=run_id))
+    skipped = len(topics) - len(pending)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = StartLimiter(runs_per_minute)
+    counts = {"ok": 0, "timeout": 0, "error": 0}
+    start = time.perf_counter()
+
+    Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(out_path, "a+b") as tail:
+        # A crash mid-write leaves a partial last line - end it so the next record starts cleanly
+        if tail.tell() and (tail.seek(-1, os.SEEK_END), tail.read(1))[1] != b"\n":
+            tail.write(b"\n")
+
+    with open(out_path, "a", encoding="utf-8") as out:
+
+        def write(record: Dict) -> None:
+            # Called from the event loop only, so lines never interleave
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            os.fsync(out.fileno())
+
+        async def run_one(item: Dict) -> None:
+            async with semaphore:
+                await limiter.wait()
+                run_start = time.perf_counter()
+                record = {"id": item["id"], "topic": item["topic"], "num_papers": item["num_papers"],
+                          "model": model, "status": "ok", "review": None, "messages": [], "error": None}
+                try:
+                    messages = await asyncio.wait_for(_review(item["topic"], item["num_papers"], model), timeout)
+                    record["messages"] = messages
+                    reviews = [m for m in messages if m.startswith("summarizer:")]
+                    record["review"] = reviews[-1][len("summarizer:"):].strip() if reviews else None
+                except asyncio.TimeoutError:
+                    record["status"], record["error"] = "timeout", f"no result after {timeout}s"
+                except Exception as exc:
+                    record["status"], record["error"] = "error", f"{type(exc).__name__}: {exc}"
+                record["seconds"] = round(time.perf_counter() - run_start, 2)
+
+            write(record)
+            counts[record["status"]] += 1
+            finished = sum(counts.values())
+            print(f"[{finished}/{len(pending)}] {record['status']:<7} {record['seconds']:>7.1f}s  {item['topic']}")
+
+        await asyncio.gather(*(run_one(item) for item in pending))
+
+    wall = time.perf_counter() - start
+    return {
+        **counts,
+        "skipped": skipped,
+        "wall_seconds": round(wall, 1),
+        "reviews_per_minute": round(counts["ok"] / wall * 60, 2) if wall else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run literature reviews for a file of topics")
+    parser.add_argument("topics", help="text file with one topic per line, or JSONL with topic / num_papers")
+    parser.add_argument("--out", default="reviews.jsonl", help="JSONL results file (appended to, and resumed from)")
+    parser.add_argument("--num-papers", type=int, default=5, help="papers per review unless the topic sets it")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--concurrency", type=int, default=4, help="reviews running at once")
+    parser.add_argument("--timeout", type=float, default=600.0, help="seconds before a review is abandoned")
+    parser.add_argument("--runs-per-minute", type=float, default=None, help="limit on review starts per minute")
+    args = parser.parse_args()
+
+    topics = read_topics(args.topics, args.num_papers)
+    summary = asyncio.run(run_batch(
+        topics,
+        args.out,
+        model=args.model,
+        concurrency=args.concurrency,
+        timeout=args.timeout,
+        runs_per_minute=args.runs_per_minute,
+    ))
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
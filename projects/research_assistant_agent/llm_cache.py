@@ -0,0 +1,278 @@
+"""
+llm_cache.py
+============
+
+Completion cache for the Literature Review Assistant's model clients.
+
+`CachedChatCompletionClient` wraps an `OpenAIChatCompletionClient` and looks every
+`create` up in a `CompletionCache` keyed on model + messages + tools, so a repeated
+review (same topic, same papers) costs no tokens. Concurrent identical requests
+share one in-flight call, and the SQLite file lets a recorded run replay offline.
+
+Off unless LITREV_LLM_CACHE_ENABLED=1 - a hit replays an earlier review even if
+arXiv has new papers since - and entries expire after LITREV_LLM_CACHE_TTL_SECONDS
+(default 7 days, as for arXiv searches).
+
+`build_team` creates new clients per review, so the cache is a separate object
+shared by all of them (see `get_completion_cache`).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+from autogen_core.models import ChatCompletionClient, CreateResult
+
+try:
+    from autogen_lab.projects.research_assistant_agent.tracing import span
+except ImportError:  # run directly as a script
+    from tracing import span
+
+LLM_CACHE_ENABLED = os.getenv("LITREV_LLM_CACHE_ENABLED", "0") == "1"
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LITREV_LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+# SQLite file for the shared cache; set LITREV_LLM_CACHE="" to keep it in memory only
+DEFAULT_CACHE_PATH = os.getenv("LITREV_LLM_CACHE", str(Path(__file__).parent / ".cache" / "llm_cache.sqlite"))
+
+
+class CompletionCache:
+    """
+    Model completions in a bounded in-memory LRU, backed by an optional SQLite file,
+    with a TTL.
+
+    Parameters
+    ----------
+    max_entries : int
+        In-memory LRU size.
+    cache_path : str, optional
+        SQLite file; None keeps the cache in memory only.
+    ttl_seconds : float
+        Age after which an entry is a miss.
+    """
+
+    def __init__(self, max_entries: int = 1024, cache_path: Optional[str] = None,
+                 ttl_seconds: float = LLM_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.inflight: Dict[str, dict] = {}   # key -> {"task", "waiters"} for requests in progress
+        self._lru: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "expired": 0,
+                      "tokens_saved": 0}
+
+        self._db = None
+        if cache_path:
+            Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(cache_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS completions (key TEXT PRIMARY KEY, result TEXT, created REAL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def key(model: str, messages, tools=(), tool_choice="auto", json_output=None, extra_create_args=None) -> str:
+        payload = {
+            "model": model,
+            "messages": [message.model_dump(mode="json") for message in messages],
+            "tools": [tool if isinstance(tool, dict) else tool.schema for tool in tools],
+            "tool_choice": tool_choice if isinstance(tool_choice, str) else tool_choice.name,
+            "json_output": json_output if json_output in (None, True, False) else json_output.__name__,
+            "extra_create_args": dict(extra_create_args or {}),
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def _lru_put(self, key: str, result: CreateResult, created: float) -> None:
+        self._lru[key] = (result, created)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def get(self, key: str) -> Optional[CreateResult]:
+        with self._lock:
+            result, expired = None, False
+            entry = self._lru.get(key)
+            if entry is not None and self._expired(entry[1]):
+                del self._lru[key]
+                entry, expired = None, True
+            if entry is not None:
+                result = entry[0]
+                self._lru.move_to_end(key)
+                self.stats["hits"] += 1
+            elif self._db is not None:
+                row = self._db.execute("SELECT result, created FROM completions WHERE key = ?", (key,)).fetchone()
+                if row is not None and self._expired(row[1]):
+                    expired = True
+                elif row is not None:
+                    result = CreateResult.model_validate_json(row[0])
+                    self._lru_put(key, result, row[1])
+                    self.stats["disk_hits"] += 1
+
+            if result is None:
+                self.stats["expired"] += expired
+                return None
+            self.stats["tokens_saved"] += result.usage.prompt_tokens + result.usage.completion_tokens
+            return result.model_copy(update={"cached": True})
+
+    def _expired(self, created: float) -> bool:
+        return time.time() - created > self.ttl_seconds
+
+    def put(self, key: str, result: CreateResult) -> None:
+        created = time.time()
+        with self._lock:
+            self._lru_put(key, result, created)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO completions (key, result, created) VALUES (?, ?, ?)",
+                    (key, result.model_dump_json(), created),
+                )
+                self._db.commit()
+
+    def cache_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_entries"] = len(self._lru)
+        return stats
+
+
+def _total_tokens(result: CreateResult) -> int:
+    return result.usage.prompt_tokens + result.usage.completion_tokens
+
+
+class CachedChatCompletionClient(ChatCompletionClient):
+    """
+    Chat completion client that answers from a `CompletionCache` when it can.
+
+    Parameters
+    ----------
+    client : ChatCompletionClient
+        Client that makes the actual requests.
+    model : str
+        Model name, part of every cache key.
+    cache : CompletionCache
+        Shared cache.
+    """
+
+    def __init__(self, client: ChatCompletionClient, model: str, cache: CompletionCache):
+        self.client = client
+        self.model = model
+        self.cache = cache
+
+    async def _fetch(self, key: str, messages, **kwargs) -> CreateResult:
+        try:
+            result = await self.client.create(messages, **kwargs)
+        finally:
+            self.cache.inflight.pop(key, None)
+        self.cache.put(key, result)
+        return result
+
+    async def create(self, messages, *, tools=[], tool_choice="auto", json_output=None,
+                     extra_create_args={}, cancellation_token=None) -> CreateResult:
+        with span("llm.create", model=self.model) as llm_span:
+            return await self._create(
+                llm_span, messages, tools=tools, tool_choice=tool_choice, json_output=json_output,
+                extra_create_args=extra_create_args, cancellation_token=cancellation_token,
+            )
+
+    async def _create(self, llm_span, messages, *, tools, tool_choice, json_output, extra_create_args,
+                      cancellation_token) -> CreateResult:
+        key = self.cache.key(self.model, messages, tools, tool_choice, json_output, extra_create_args)
+        cached = self.cache.get(key)
+        if cached is not None:
+            llm_span.set_attributes({"cache": "hit", "tokens_saved": _total_tokens(cached)})
+            return cached
+
+        # Identical callers on this loop await one request task, cancelled only once all of them
+        # are (by task cancellation or their own cancellation token)
+        loop = asyncio.get_running_loop()
+        inflight = self.cache.inflight.get(key)
+        made_request = False
+        if inflight is not None and inflight["task"].get_loop() is loop:
+            self.cache.stats["coalesced"] += 1
+            llm_span.set_attribute("cache", "coalesced")
+        else:
+            self.cache.stats["misses"] += 1
+            llm_span.set_attribute("cache", "miss")
+            made_request = True
+            # No caller's cancellation token - one caller cancelling must not fail the others
+            task = loop.create_task(self._fetch(
+                key, messages, tools=tools, tool_choice=tool_choice, json_output=json_output,
+                extra_create_args=extra_create_args,
+            ))
+            inflight = self.cache.inflight[key] = {"task": task, "waiters": 0}
+
+        inflight["waiters"] += 1
+        waiter = asyncio.shield(inflight["task"])
+        if cancellation_token is not None:
+            cancellation_token.link_future(waiter)
+        try:
+            result = await waiter
+        except asyncio.CancelledError:
+            if inflight["waiters"] == 1:
+                inflight["task"].cancel()
+            raise
+        finally:
+            inflight["waiters"] -= 1
+
+        # Only the caller that made the request spent the tokens
+        if made_request:
+            llm_span.set_attributes({"prompt_tokens": result.usage.prompt_tokens,
+                                     "completion_tokens": result.usage.completion_tokens})
+        else:
+            llm_span.set_attribute("tokens_saved", _total_tokens(result))
+        return result
+
+    def create_stream(self, messages, *, tools=[], tool_choice="auto", json_output=None,
+                      extra_create_args={}, cancellation_token=None):
+        # The review team doesn't stream - streamed requests go to the wrapped client uncached
+        return self.client.create_stream(
+            messages, tools=tools, tool_choice=tool_choice, json_output=json_output,
+            extra_create_args=extra_create_args, cancellation_token=cancellation_token,
+        )
+
+    async def close(self) -> None:
+        await self.client.close()
+
+    def actual_usage(self):
+        return self.client.actual_usage()
+
+    def total_usage(self):
+        return self.client.total_usage()
+
+    def count_tokens(self, messages, *, tools=[]) -> int:
+        return self.client.count_tokens(messages, tools=tools)
+
+    def remaining_tokens(self, messages, *, tools=[]) -> int:
+        return self.client.remaining_tokens(messages, tools=tools)
+
+    @property
+    def capabilities(self):
+        return self.client.capabilities
+
+    @property
+    def model_info(self):
+        return self.client.model_info
+
+
+_cache: Optional[CompletionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_completion_cache() -> CompletionCache:
+    """
+    Process-wide cache, created on first use.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = CompletionCache(cache_path=DEFAULT_CACHE_PATH or None)
+    return _cache
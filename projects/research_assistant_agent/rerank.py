@@ -0,0 +1,160 @@
+"""
+rerank.py
+=========
+
+Local reranking of arXiv candidates for the Literature Review Assistant.
+
+The search tool fetches more candidates than requested; instead of pushing every
+abstract into the prompt for the LLM to down-select, `rerank` embeds the topic and
+the candidates locally, scores them by cosine similarity (one matrix-vector
+product), drops near-duplicates and returns only the top-N compact records.
+
+Embeddings come from sentence-transformers when it is installed
+(LITREV_EMBEDDING_MODEL, default all-MiniLM-L6-v2); otherwise from hashed word
+and bigram features - no extra dependency, purely lexical, but enough to rank a
+few dozen abstracts against a topic.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import threading
+from typing import Dict, List
+
+import numpy as np
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # optional - falls back to hashed features
+    SentenceTransformer = None
+
+try:
+    from autogen_lab.projects.research_assistant_agent.tracing import span
+except ImportError:  # run directly as a script
+    from tracing import span
+
+EMBEDDING_MODEL = os.getenv("LITREV_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+HASHING_DIMS = 2048
+CANDIDATE_MULTIPLIER = 5        # candidates fetched per requested paper
+# Cosine above which two papers count as the same work - lexical features score
+# reworded duplicates lower than sentence embeddings do
+DUPLICATE_SIMILARITY = 0.92 if SentenceTransformer is not None else 0.8
+SUMMARY_CHARS = 600             # abstract length passed on to the agents
+MAX_AUTHORS = 3
+
+_WORD = re.compile(r"[a-z0-9]+")
+# arXiv query syntax the search agent may use, e.g. 'all:"graph networks" AND cat:cs.LG'
+_QUERY_SYNTAX = re.compile(r"\b(?:all|ti|abs|au|cat|co|jr|rn|id):|\b(?:AND|OR|ANDNOT)\b|[()\"]")
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def _hashed_features(texts: List[str]) -> np.ndarray:
+    # Log term frequency of hashed unigrams + bigrams, idf-weighted over this batch
+    rows = np.zeros((len(texts), HASHING_DIMS), dtype=np.float32)
+    for i, text in enumerate(texts):
+        words = _WORD.findall(text.lower())
+        for term in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            digest = hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest()
+            rows[i, int.from_bytes(digest, "little") % HASHING_DIMS] += 1.0
+    np.log1p(rows, out=rows)
+    document_frequency = np.count_nonzero(rows, axis=0)
+    rows *= np.log((1 + len(texts)) / (1 + document_frequency)) + 1
+    return rows
+
+
+def embed_texts(texts: List[str]) -> np.ndarray:
+    """
+    L2-normalised embeddings, one row per text.
+    """
+    global _model
+    if SentenceTransformer is not None:
+        if _model is None:
+            with _model_lock:
+                if _model is None:
+                    _model = SentenceTransformer(EMBEDDING_MODEL)
+        vectors = np.asarray(_model.encode(texts, batch_size=64), dtype=np.float32)
+    else:
+        vectors = _hashed_features(texts)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _normalise_title(title: str) -> str:
+    return " ".join(_WORD.findall(title.lower()))
+
+
+def compact_record(paper: Dict, score: float) -> Dict:
+    summary = " ".join(paper["summary"].split())
+    if len(summary) > SUMMARY_CHARS:
+        summary = summary[:SUMMARY_CHARS].rsplit(" ", 1)[0] + " ..."
+    authors = paper["authors"][:MAX_AUTHORS] + (["et al."] if len(paper["authors"]) > MAX_AUTHORS else [])
+    return {
+        "title": paper["title"],
+        "authors": authors,
+        "published": paper["published"],
+        "summary": summary,
+        "pdf_url": paper["pdf_url"],
+        "relevance": round(score, 3),
+    }
+
+
+def rerank(topic: str, papers: List[Dict], top_n: int,
+           duplicate_similarity: float = DUPLICATE_SIMILARITY) -> List[Dict]:
+    """
+    The `top_n` papers most similar to `topic`, without near-duplicates, as
+    compact records (trimmed abstract and author list, plus a relevance score).
+
+    Parameters
+    ----------
+    topic : str
+        The user's topic (arXiv query syntax is stripped).
+    papers : List[Dict]
+        Candidates from `arxiv_client.search_papers` - may repeat across sub-queries.
+    top_n : int
+        Number of papers to return.
+    duplicate_similarity : float
+        Papers whose embeddings are at least this similar to an already selected
+        paper (or that share its normalised title / pdf_url) are dropped.
+    """
+    with span("rerank", candidates=len(papers), top_n=top_n,
+              backend="sentence-transformers" if SentenceTransformer is not None else "hashing") as rerank_span:
+        selected, papers, scores = _select(topic, papers, top_n, duplicate_similarity)
+        rerank_span.set_attributes({"unique": len(papers), "result_count": len(selected)})
+    return [compact_record(papers[i], float(scores[i])) for i in selected]
+
+
+def _select(topic: str, papers: List[Dict], top_n: int, duplicate_similarity: float):
+    # (indices of the chosen papers, de-duplicated papers, their scores)
+    # Exact repeats (the same paper found by several sub-queries) first
+    unique: Dict[str, Dict] = {}
+    for paper in papers:
+        # ".../2401.01234v2" and "...v1" are the same paper
+        key = re.sub(r"v\d+$", "", paper["pdf_url"] or "") or _normalise_title(paper["title"])
+        unique.setdefault(key, paper)
+    papers = list(unique.values())
+    if not papers or top_n <= 0:
+        return [], papers, []
+
+    query = _QUERY_SYNTAX.sub(" ", topic)
+    vectors = embed_texts([query] + [f"{paper['title']}. {paper['summary']}" for paper in papers])
+    scores = vectors[1:] @ vectors[0]
+
+    selected: List[int] = []
+    seen_titles = set()
+    for i in np.argsort(-scores, kind="stable"):
+        title = _normalise_title(papers[i]["title"])
+        if title in seen_titles:
+            continue
+        if selected and float(np.max(vectors[1:][selected] @ vectors[1 + i])) >= duplicate_similarity:
+            continue
+        selected.append(int(i))
+        seen_titles.add(title)
+        if len(selected) == top_n:
+            break
+
+    return selected, papers, scores
+
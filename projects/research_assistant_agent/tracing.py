@@ -0,0 +1,172 @@
+"""
+tracing.py
+==========
+
+OpenTelemetry-compatible spans for the Literature Review Assistant: each review
+(`litrev.run`), tool call, arXiv search, rerank and LLM call, with latency, token
+usage, cache hits and result counts as attributes.
+
+LITREV_TRACE picks where finished spans go:
+- "off" (default): `span` does nothing
+- "jsonl": one JSON line per span appended to LITREV_TRACE_PATH
+  (default .cache/traces.jsonl) - trace / span / parent ids in OpenTelemetry's
+  hex format, start and end in unix nanoseconds, status and attributes; the file
+  moves to LITREV_TRACE_PATH.1 past LITREV_TRACE_MAX_BYTES (default 50 MB)
+- "console": the same JSON lines on stderr
+
+Queries and topics are recorded as a length and a short hash unless
+LITREV_TRACE_QUERIES=1.
+
+Spans nest through a context variable, so a span opened inside another - across
+`await`, `asyncio.create_task` and `asyncio.to_thread` too - becomes its child.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+TRACE_EXPORTER = os.getenv("LITREV_TRACE", "off")
+TRACE_PATH = os.getenv("LITREV_TRACE_PATH", str(Path(__file__).parent / ".cache" / "traces.jsonl"))
+TRACE_MAX_BYTES = int(os.getenv("LITREV_TRACE_MAX_BYTES", str(50 * 1024 * 1024)))
+TRACE_QUERY_TEXT = os.getenv("LITREV_TRACE_QUERIES", "0") == "1"
+
+_current_span = contextvars.ContextVar("litrev_span", default=None)
+_export_lock = threading.Lock()
+_trace_file = None
+
+
+class Span:
+    """
+    One timed operation; `to_dict` gives the exported JSON record.
+    """
+
+    def __init__(self, name: str, parent: Optional[Span], attributes: Dict):
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.status = "UNSET"
+        self.attributes: Dict = {}
+        self.set_attributes(attributes)
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+
+    def set_attribute(self, key: str, value) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict) -> None:
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.status = "ERROR"
+        self.attributes["exception.type"] = type(exc).__name__
+        self.attributes["exception.message"] = str(exc)
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    def set_attribute(self, key: str, value) -> None:
+        pass
+
+    def set_attributes(self, attributes: Dict) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def _export(finished: Span) -> None:
+    global _trace_file
+    line = json.dumps(finished.to_dict(), default=str)
+    with _export_lock:
+        if TRACE_EXPORTER == "console":
+            print(line, file=sys.stderr)
+            return
+        if _trace_file is None:
+            Path(TRACE_PATH).parent.mkdir(parents=True, exist_ok=True)
+            _trace_file = open(TRACE_PATH, "a", encoding="utf-8", buffering=1)   # line buffered
+        _trace_file.write(line + "\n")
+        if _trace_file.tell() > TRACE_MAX_BYTES:
+            # Keep a single previous file, so traces stay under ~2x TRACE_MAX_BYTES on disk
+            _trace_file.close()
+            os.replace(TRACE_PATH, f"{TRACE_PATH}.1")
+            _trace_file = None
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Time the block as a span named `name`, a child of the span it runs in.
+    Yields the span, so results known only at the end (token counts, result
+    counts, cache hits) can be added with `set_attribute`.
+    """
+    if TRACE_EXPORTER == "off":
+        yield NOOP_SPAN
+        return
+
+    current = Span(name, _current_span.get(), attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except (asyncio.CancelledError, GeneratorExit):
+        current.set_attribute("cancelled", True)
+        raise
+    except Exception as exc:
+        current.record_exception(exc)
+        raise
+    else:
+        current.status = "OK"
+    finally:
+        current.end_ns = time.time_ns()
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # Closed from another context, e.g. an async generator finalised by the event loop
+            pass
+        _export(current)
+
+
+def text_attributes(name: str, text: str) -> Dict:
+    """
+    `name` = the text itself with LITREV_TRACE_QUERIES=1, else its length and a
+    short hash (enough to group repeats without storing the text).
+    """
+    if TRACE_QUERY_TEXT:
+        return {name: text}
+    return {f"{name}_chars": len(text), f"{name}_hash": hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]}
+
+
+def usage_attributes(messages) -> Dict:
+    """
+    Token usage over a team run's messages, as reported by the model clients.
+    """
+    usages = [m.models_usage for m in messages if getattr(m, "models_usage", None) is not None]
+    return {
+        "llm_calls": len(usages),
+        "prompt_tokens": sum(u.prompt_tokens for u in usages),
+        "completion_tokens": sum(u.completion_tokens for u in usages),
+    }